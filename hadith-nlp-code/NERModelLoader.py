@@ -1,4 +1,8 @@
-import spacy
+from model_registry import get_ner_model
 
-# Load the saved model
-nlp = spacy.load("trained_models/finetune/camel/10_caner_customized_ner_model")
\ No newline at end of file
+
+# The model is loaded on first access of NERModelLoader.nlp instead of at import time
+def __getattr__(name):
+    if name == "nlp":
+        return get_ner_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,7 +6,7 @@ import random
 import json
 #from spacy_transformers import TransformersLanguage, TransformersWordPiecer, TransformersTok2Vec
 
-from seqeval.metrics import classification_report, accuracy_score, f1_score
+from ner_evaluation import load_ner_dataset, split_ner_dataset, evaluate_model
 
 # Initialize a list to store metrics for each epoch
 metrics_log = []
@@ -14,13 +14,10 @@ metrics_log = []
 PRE_TRAINED_MODEL = "CAMeL-Lab/bert-base-arabic-camelbert-ca-ner"
 
 # Load preprocessed training data
-with open("training_dataset/customized-caner.json", "r", encoding="utf-8") as f:
-    train_data = json.load(f)
+train_data = load_ner_dataset()
 
-# Split data into training and validation sets
-train_size = int(0.8 * len(train_data))  # 80% for training
-train_dataset = train_data[:train_size]
-val_dataset = train_data[train_size:]  # 20% for validation
+# Split data into training and validation sets (80% for training, 20% for validation)
+train_dataset, val_dataset = split_ner_dataset(train_data)
 
 # Create a blank Arabic pipeline
 nlp = spacy.blank("ar")
@@ -56,49 +53,6 @@ n_iter = 20  # Number of training iterations
 batch_size = 32  # Adjust based on memory capacity
 
 
-def evaluate_model(nlp, val_dataset):
-    """
-    Evaluate the SpaCy NER model on a validation set.
-    Args:
-        nlp: Trained SpaCy NER model.
-        val_dataset: Validation data in SpaCy format.
-    Returns:
-        metrics: Dictionary with accuracy, precision, recall, and F1-score.
-    """
-    true_labels = []
-    pred_labels = []
-
-    for text, annotations in val_dataset:
-        # True entities
-        entities = annotations["entities"]
-        true = ['O'] * len(text)  # Default to "O" (non-entity)
-        for start, end, label in entities:
-            for i in range(start, end):
-                true[i] = label
-
-        # Predicted entities
-        doc = nlp(text)
-        pred = ['O'] * len(text)  # Default to "O" (non-entity)
-        for ent in doc.ents:
-            for i in range(ent.start_char, ent.end_char):
-                pred[i] = ent.label_
-
-        # Align lengths
-        min_len = min(len(true), len(pred))
-        true_labels.append(true[:min_len])
-        pred_labels.append(pred[:min_len])
-
-    # Calculate metrics
-    accuracy = accuracy_score(true_labels, pred_labels)
-    f1 = f1_score(true_labels, pred_labels)
-    report = classification_report(true_labels, pred_labels)
-    return {
-        "accuracy": accuracy,
-        "f1": f1,
-        "classification_report": report,
-    }
-
-
 print("Metrics before training:")
 metrics = evaluate_model(nlp, val_dataset)
 print(f"Epoch 0: Accuracy: {metrics['accuracy']:.4f}, F1-Score: {metrics['f1']:.4f}")
@@ -1,34 +1,41 @@
 import pandas as pd
 import tqdm
-from pyarabic.araby import strip_tashkeel
-from NERModelLoader import nlp
-from utility import strip_punctuation, Resolve_Entities, tarabic_name, hadith_number_name
-
-# Function to find mentions of heaven and hell in a single hadith
-def find_heaven_and_hell_in_one_hadith(arabic_text):
+from ner_annotations import normalize_for_ner
+from model_registry import get_ner_model
+from ner_engine import resolve_doc_entities, stream_resolved_entities, DEFAULT_BATCH_SIZE, DEFAULT_N_PROCESS
+from utility import tarabic_name, hadith_number_name
+from profiling import timed, NORMALIZATION, INFERENCE, ENTITY_RESOLUTION, SERIALIZATION
+
+# Function to preprocess the Arabic text before Heaven and Hell extraction
+@timed(NORMALIZATION)
+def preprocess_heaven_and_hell_text(arabic_text):
     """
-    Identifies mentions of Heaven and Hell in a single hadith.
+    Prepares the Arabic text of a hadith for Heaven and Hell extraction.
 
     Args:
         arabic_text (str): The Arabic text of the hadith.
 
     Returns:
-        tuple: Sets containing mentions of "Heaven" and "Hell".
+        str: The text as sent to the NER model by the pipeline (see normalize_for_ner).
     """
-    # Preprocess the Arabic text
-    arabic_text = strip_punctuation(arabic_text)
-    arabic_text = strip_tashkeel(arabic_text)
+    return normalize_for_ner(arabic_text)
 
-    # Extract entities using the NER model
-    doc = nlp(arabic_text)
-    entities = [(ent.text, ent.label_) for ent in doc.ents]
-    resolved_entities = Resolve_Entities(entities)
 
-    # Initialize mention sets
+# Function to map resolved entities to Heaven and Hell mentions
+@timed(ENTITY_RESOLUTION)
+def heaven_and_hell_from_entities(resolved_entities):
+    """
+    Collects Heaven and Hell mentions from the resolved entities of a hadith.
+
+    Args:
+        resolved_entities (list): List of resolved entities as tuples (entity, label).
+
+    Returns:
+        tuple: Sets containing mentions of "Heaven" and "Hell".
+    """
     p_mentions = set()  # Heaven mentions
     h_mentions = set()  # Hell mentions
 
-    # Process resolved entities
     for entity, label in resolved_entities:
         if label == "PARA":
             p_mentions.add("Heaven")
@@ -38,8 +45,33 @@ def find_heaven_and_hell_in_one_hadith(arabic_text):
     return p_mentions, h_mentions
 
 
+# Function to find mentions of heaven and hell in a single hadith
+def find_heaven_and_hell_in_one_hadith(arabic_text):
+    """
+    Identifies mentions of Heaven and Hell in a single hadith.
+
+    Args:
+        arabic_text (str): The Arabic text of the hadith.
+
+    Returns:
+        tuple: Sets containing mentions of "Heaven" and "Hell".
+    """
+    # Preprocess the Arabic text
+    arabic_text = preprocess_heaven_and_hell_text(arabic_text)
+
+    # Extract entities using the NER model
+    with timed(INFERENCE):
+        doc = get_ner_model()(arabic_text)
+    resolved_entities = resolve_doc_entities(doc)
+
+    # Process resolved entities
+    return heaven_and_hell_from_entities(resolved_entities)
+
+
 # Function to find mentions of Heaven and Hell in all hadith
-def find_heaven_and_hell_mentioned_in_all_hadith(hadith_df, save_result=False, collection="sb"):
+def find_heaven_and_hell_mentioned_in_all_hadith(hadith_df, save_result=False, collection="sb",
+                                                 batch_size=DEFAULT_BATCH_SIZE, n_process=DEFAULT_N_PROCESS,
+                                                 annotation_store=None):
     """
     Identifies mentions of Heaven and Hell in all hadith within a dataset.
 
@@ -47,6 +79,10 @@ def find_heaven_and_hell_mentioned_in_all_hadith(hadith_df, save_result=False, c
         hadith_df (pd.DataFrame): DataFrame containing hadith texts.
         save_result (bool, optional): Whether to save the results to an Excel file. Defaults to False.
         collection (str, optional): The collection name to use for saving results. Defaults to "sb".
+        batch_size (int, optional): Number of hadith per NER batch. Defaults to DEFAULT_BATCH_SIZE.
+        n_process (int, optional): Number of NER worker processes. Defaults to DEFAULT_N_PROCESS.
+        annotation_store (NERAnnotationStore, optional): Store of cached NER annotations. When given,
+            entities are read from the store and the model only runs on hadith missing from it.
 
     Returns:
         pd.DataFrame: DataFrame with hadith numbers and corresponding Heaven and Hell mentions.
@@ -55,14 +91,18 @@ def find_heaven_and_hell_mentioned_in_all_hadith(hadith_df, save_result=False, c
     all_hell_mentions = []
     all_hadith_numbers = []
 
-    # Iterate through the hadith dataset with a progress bar
-    with tqdm.tqdm(total=len(hadith_df), desc="Extracting Heaven and Hell mentions") as pbar:
-        for _, row in hadith_df.iterrows():
-            arabic_text = row[tarabic_name]  # Extract Arabic text column
-            hadith_number = row[hadith_number_name]  # Extract hadith number
+    if annotation_store is not None:
+        # Reuse the annotations of a single shared NER pass
+        entity_stream = annotation_store.annotate(hadith_df, batch_size=batch_size, n_process=n_process)
+    else:
+        # Stream the preprocessed texts through the NER model in batches
+        texts = (preprocess_heaven_and_hell_text(text) for text in hadith_df[tarabic_name])
+        entity_stream = stream_resolved_entities(texts, batch_size=batch_size, n_process=n_process)
 
+    with tqdm.tqdm(total=len(hadith_df), desc="Extracting Heaven and Hell mentions") as pbar:
+        for hadith_number, resolved_entities in zip(hadith_df[hadith_number_name], entity_stream):
             # Find Heaven and Hell mentions for the current hadith
-            p_mentions, h_mentions = find_heaven_and_hell_in_one_hadith(arabic_text)
+            p_mentions, h_mentions = heaven_and_hell_from_entities(resolved_entities)
 
             # Append results
             all_heaven_mentions.append(p_mentions)
@@ -81,7 +121,8 @@ def find_heaven_and_hell_mentioned_in_all_hadith(hadith_df, save_result=False, c
     # Save results to an Excel file if requested
     if save_result:
         save_path = f"results/{collection}/afterlife.xlsx"
-        result_df.to_excel(save_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_path, index=False)
         print(f"Results saved to {save_path}")
 
     return result_df
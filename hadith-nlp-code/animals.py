@@ -1,42 +1,52 @@
+from functools import lru_cache
 import pandas as pd
 import tqdm
-from pyarabic.araby import strip_tashkeel
+from normalization import strip_tashkeel
+from dictionary_matcher import DictionaryMatcher, load_dictionary, MATCH_EN
 from utility import tarabic_name, hadith_number_name, strip_punctuation, english_name
+from profiling import timed, NORMALIZATION, SERIALIZATION
 
 # Load the dictionary of animals from a CSV file
 ANIMALS_DICTIONARY_PATH = 'dictionaries/animals.csv'
-df_animals = pd.read_csv(ANIMALS_DICTIONARY_PATH)
+
+# Function to load the compiled dictionary of animals on first use
+@lru_cache(maxsize=None)
+def get_animals_dictionary():
+    """
+    Loads the compiled dictionary of animals once per process, so that importing the module reads no file.
+
+    Returns:
+        CompiledDictionary: The animals dictionary.
+    """
+    return load_dictionary(ANIMALS_DICTIONARY_PATH, policy=MATCH_EN, separator='-')
 
 # Function to find animals mentioned in a single hadith
-def find_animals_in_one_hadith(ar_text, en_text, df=df_animals):
+def find_animals_in_one_hadith(ar_text, en_text, df=None):
     """
     Identifies animals mentioned in a single hadith using Arabic and English patterns.
 
     Args:
         ar_text (str): The Arabic text of the hadith.
         en_text (str): The English translation of the hadith.
-        df (pd.DataFrame): The DataFrame containing animal patterns and IDs.
+        df (pd.DataFrame, optional): The DataFrame containing animal patterns and IDs.
+            Defaults to the compiled animals dictionary.
 
     Returns:
         list: A list of IDs corresponding to animals mentioned in the hadith.
     """
     # Preprocess Arabic and English texts
-    ar_text = strip_punctuation(ar_text)
-    en_text = strip_punctuation(en_text)
-    ar_text = strip_tashkeel(ar_text)
-
-    animals_list = []
-
-    # Iterate through the animal dictionary to find matches
-    for _, row in df.iterrows():
-        # Check for matches in the English text
-        en_patterns = row['en'].split('-')  # Split patterns for matching
-        is_match_en = any(pattern.lower() in en_text.lower() for pattern in en_patterns)
+    with timed(NORMALIZATION):
+        ar_text = strip_punctuation(ar_text)
+        en_text = strip_punctuation(en_text)
+        ar_text = strip_tashkeel(ar_text)
 
-        if is_match_en:
-            animals_list.append(row['ID'])
+    if df is None:
+        matcher = get_animals_dictionary().matcher()
+    else:
+        matcher = DictionaryMatcher.from_dataframe(df, policy=MATCH_EN, separator='-')
 
-    return animals_list
+    # Check for matches in the English text
+    return matcher.match(en_text=en_text)
 
 # Function to find animals mentioned in all hadith
 def find_animals_mentioned_in_all_hadith(hadith_df, save_result=False, save_file_path=""):
@@ -85,7 +95,8 @@ def find_animals_mentioned_in_all_hadith(hadith_df, save_result=False, save_file
 
     # Save results to an Excel file if requested
     if save_result and save_file_path:
-        result_df.to_excel(save_file_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_file_path, index=False)
         print(f"Results saved to {save_file_path}")
 
     return result_df
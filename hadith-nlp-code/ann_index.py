@@ -0,0 +1,275 @@
+import os
+import re
+import numpy as np
+from generate_rdf import LABEL_MAPPING
+from model_registry import get_model
+from normalization import normalize_arabic, clean_english_text
+from vector_store import load_vector_store
+
+# Default location of the approximate nearest neighbour index
+ANN_INDEX_DIR = "results/ann_index"
+
+# Form of the hadith IDs of the index, e.g. "SB-HD0001"
+HADITH_ID_PATTERN = re.compile(r"[A-Z]+-HD\d+")
+
+# Normalization applied to a text query before encoding it, as encoding_texts does for the corpus
+QUERY_NORMALIZATION = {"ar": normalize_arabic, "en": clean_english_text}
+
+
+def _normalize_rows(vectors):
+    """
+    Scales vectors to unit length so that dot products are cosine similarities.
+
+    Args:
+        vectors (np.ndarray): Vectors, one per row.
+
+    Returns:
+        np.ndarray: The normalized float32 vectors.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class IVFIndex:
+    """
+    Inverted-file index for approximate cosine nearest neighbour search over hadith embeddings.
+
+    The embeddings are clustered with spherical k-means; a query only scores the vectors of
+    the n_probe clusters whose centroids are closest to it.
+    """
+
+    def __init__(self, centroids, list_offsets, list_rows, vectors, hadith_ids, n_probe=8, language=None):
+        """
+        Args:
+            centroids (np.ndarray): Unit-length cluster centroids.
+            list_offsets (np.ndarray): Start of each cluster in list_rows, plus the total length.
+            list_rows (np.ndarray): Row indices of the vectors, grouped by cluster.
+            vectors (np.ndarray): Unit-length embeddings, one row per hadith.
+            hadith_ids (np.ndarray): ID of each hadith.
+            n_probe (int, optional): Default number of clusters scanned per query. Defaults to 8.
+            language (str, optional): "ar" or "en", the sentence model of the embeddings, used to
+                encode text queries. Defaults to None.
+        """
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.vectors = vectors
+        self.hadith_ids = hadith_ids
+        self.n_probe = n_probe
+        self.language = language
+        self.row_of_id = {hadith_id: row for row, hadith_id in enumerate(hadith_ids.tolist())}
+
+    @classmethod
+    def build(cls, vectors, hadith_ids, n_lists=None, n_iter=20, n_probe=8, seed=0, language=None):
+        """
+        Clusters the embeddings and builds the inverted lists.
+
+        Args:
+            vectors (array-like): Embeddings, one row per hadith.
+            hadith_ids (array-like): ID of each hadith.
+            n_lists (int, optional): Number of clusters. Defaults to 4 * sqrt(number of hadith).
+            n_iter (int, optional): Number of k-means iterations. Defaults to 20.
+            n_probe (int, optional): Default number of clusters scanned per query. Defaults to 8.
+            seed (int, optional): Seed of the centroid initialization. Defaults to 0.
+            language (str, optional): "ar" or "en", the sentence model of the embeddings. Defaults to None.
+
+        Returns:
+            IVFIndex: The built index.
+        """
+        vectors = _normalize_rows(vectors)
+        n = len(vectors)
+        n_lists = min(n, n_lists or max(1, int(4 * np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+
+        # Spherical k-means
+        centroids = vectors[rng.choice(n, size=n_lists, replace=False)]
+        for _ in range(n_iter):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            counts = np.bincount(assignment, minlength=n_lists)
+            # Re-seed empty clusters with random hadith
+            empty = counts == 0
+            sums[empty] = vectors[rng.choice(n, size=int(empty.sum()), replace=False)]
+            centroids = _normalize_rows(sums)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+
+        # Group the rows by cluster
+        list_rows = np.argsort(assignment, kind="stable")
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        return cls(centroids, list_offsets, list_rows, vectors, np.asarray(hadith_ids), n_probe, language)
+
+    def save(self, index_dir=ANN_INDEX_DIR):
+        """
+        Saves the index as .npy files.
+
+        Args:
+            index_dir (str, optional): Directory of the index. Defaults to ANN_INDEX_DIR.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        np.save(os.path.join(index_dir, "centroids.npy"), self.centroids)
+        np.save(os.path.join(index_dir, "list_offsets.npy"), self.list_offsets)
+        np.save(os.path.join(index_dir, "list_rows.npy"), self.list_rows)
+        np.save(os.path.join(index_dir, "vectors.npy"), self.vectors)
+        np.save(os.path.join(index_dir, "hadith_ids.npy"), self.hadith_ids)
+        np.save(os.path.join(index_dir, "n_probe.npy"), np.array(self.n_probe))
+        if self.language:
+            np.save(os.path.join(index_dir, "language.npy"), np.array(self.language))
+        print(f"Index saved to {index_dir}")
+
+    @classmethod
+    def load(cls, index_dir=ANN_INDEX_DIR):
+        """
+        Loads an index saved with save, memory-mapping the embeddings.
+
+        Args:
+            index_dir (str, optional): Directory of the index. Defaults to ANN_INDEX_DIR.
+
+        Returns:
+            IVFIndex: The loaded index.
+        """
+        # Indexes saved without a language only answer hadith ID queries or queries with an encoder
+        language_path = os.path.join(index_dir, "language.npy")
+        language = str(np.load(language_path)) if os.path.exists(language_path) else None
+        return cls(np.load(os.path.join(index_dir, "centroids.npy")),
+                   np.load(os.path.join(index_dir, "list_offsets.npy")),
+                   np.load(os.path.join(index_dir, "list_rows.npy")),
+                   np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r"),
+                   np.load(os.path.join(index_dir, "hadith_ids.npy")),
+                   int(np.load(os.path.join(index_dir, "n_probe.npy"))), language)
+
+    def search_vector(self, vector, k=10, n_probe=None, exclude_row=None):
+        """
+        Finds the approximate nearest neighbours of an embedding.
+
+        Args:
+            vector (array-like): The query embedding.
+            k (int, optional): Number of neighbours. Defaults to 10.
+            n_probe (int, optional): Number of clusters scanned. Defaults to the index default.
+            exclude_row (int, optional): Row left out of the results, e.g. the query hadith. Defaults to None.
+
+        Returns:
+            tuple: Row indices and cosine similarities of the neighbours, most similar first.
+        """
+        query = _normalize_rows(np.asarray(vector).reshape(1, -1))[0]
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+
+        # Gather the rows of the closest clusters
+        probed = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        candidates = np.concatenate([self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]]
+                                     for c in probed])
+        if exclude_row is not None:
+            candidates = candidates[candidates != exclude_row]
+
+        # Sorted rows keep reads of memory-mapped vectors sequential
+        candidates = np.sort(candidates)
+        scores = np.asarray(self.vectors[candidates]) @ query
+        top = np.argsort(-scores, kind="stable")[:k]
+        return candidates[top], scores[top]
+
+    def default_encoder(self):
+        """
+        Returns the encoder of text queries: the sentence model of the index language, loaded from the model registry.
+
+        Returns:
+            callable: Function turning a text into an embedding.
+        """
+        if self.language not in QUERY_NORMALIZATION:
+            raise ValueError("The index has no language; pass an encoder to query it with a text")
+        model = get_model(self.language)
+        normalize = QUERY_NORMALIZATION[self.language]
+        return lambda text: model.encode(normalize(text))
+
+    def query(self, hadith, k=10, n_probe=None, encoder=None):
+        """
+        Finds the hadith most similar to a hadith of the index or to a free text.
+
+        Args:
+            hadith: ID of a hadith of the index, or a text to encode.
+            k (int, optional): Number of neighbours. Defaults to 10.
+            n_probe (int, optional): Number of clusters scanned. Defaults to the index default.
+            encoder (callable, optional): Function turning a text into an embedding. Defaults to the
+                sentence model of the index language, after normalizing the text as the corpus was.
+
+        Returns:
+            list: Tuples (hadith ID, cosine similarity), most similar first.
+        """
+        if hadith in self.row_of_id:
+            row = self.row_of_id[hadith]
+            rows, scores = self.search_vector(self.vectors[row], k, n_probe, exclude_row=row)
+        elif isinstance(hadith, str) and not HADITH_ID_PATTERN.fullmatch(hadith):
+            encoder = encoder or self.default_encoder()
+            rows, scores = self.search_vector(np.asarray(encoder(hadith)), k, n_probe)
+        else:
+            # Including mistyped IDs, e.g. "SB-HD001", which must not be encoded as text
+            raise KeyError(f"Hadith {hadith} is not in the index")
+        return list(zip(self.hadith_ids[rows].tolist(), scores.tolist()))
+
+
+def build_ann_index(collections=("sb",), language="ar", store_dir="results/{collection}/encodings",
+                    index_dir=ANN_INDEX_DIR, n_lists=None, n_iter=20, n_probe=8):
+    """
+    Builds and saves an index over the vector stores of one or more collections.
+
+    Hadith are identified as in the knowledge graph, e.g. "SB-HD0001".
+
+    Args:
+        collections (iterable, optional): Collection names. Defaults to ("sb",).
+        language (str, optional): "ar" or "en". Defaults to "ar".
+        store_dir (str, optional): Vector store directory pattern. Defaults to "results/{collection}/encodings".
+        index_dir (str, optional): Directory of the index. Defaults to ANN_INDEX_DIR.
+        n_lists (int, optional): Number of clusters. Defaults to 4 * sqrt(number of hadith).
+        n_iter (int, optional): Number of k-means iterations. Defaults to 20.
+        n_probe (int, optional): Default number of clusters scanned per query. Defaults to 8.
+
+    Returns:
+        IVFIndex: The built index.
+    """
+    all_vectors = []
+    all_ids = []
+    for collection in collections:
+        ar_vectors, eng_vectors, hadith_numbers = load_vector_store(store_dir.format(collection=collection))
+        all_vectors.append(ar_vectors if language == "ar" else eng_vectors)
+        label = LABEL_MAPPING.get(collection, collection.upper())
+        all_ids.extend(f"{label}-HD{int(hnum):04d}" for hnum in hadith_numbers)
+
+    index = IVFIndex.build(np.concatenate(all_vectors), np.array(all_ids), n_lists=n_lists, n_iter=n_iter,
+                           n_probe=n_probe, language=language)
+    index.save(index_dir)
+    return index
+
+
+def measure_recall(index, k=10, n_queries=200, n_probe=None, seed=0):
+    """
+    Measures the recall@k of the index against exact brute-force cosine similarity.
+
+    Args:
+        index (IVFIndex): The index to evaluate.
+        k (int, optional): Number of neighbours. Defaults to 10.
+        n_queries (int, optional): Number of hadith sampled as queries. Defaults to 200.
+        n_probe (int, optional): Number of clusters scanned. Defaults to the index default.
+        seed (int, optional): Seed of the query sample. Defaults to 0.
+
+    Returns:
+        float: Mean fraction of the exact top-k neighbours found by the index.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(index.vectors)
+    query_rows = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+
+    # Exact neighbours, computed as in calculate_cosine_similarity
+    exact_scores = cosine_similarity(vectors[query_rows], vectors)
+    exact_scores[np.arange(len(query_rows)), query_rows] = -np.inf
+
+    recalls = []
+    for i, row in enumerate(query_rows):
+        exact = set(np.argsort(-exact_scores[i], kind="stable")[:k].tolist())
+        approximate, _ = index.search_vector(vectors[row], k, n_probe, exclude_row=row)
+        recalls.append(len(exact & set(approximate.tolist())) / k)
+
+    recall = float(np.mean(recalls))
+    print(f"Recall@{k} with n_probe={n_probe or index.n_probe}: {recall:.4f}")
+    return recall
@@ -2,6 +2,7 @@ import re
 import pandas as pd
 import tqdm
 from utility import english_name, hadith_number_name
+from profiling import timed, SERIALIZATION
 
 def extract_coordinates_values(text):
     """
@@ -88,7 +89,8 @@ def find_ayat_mentioned_in_all_hadith(hadith_df, save_result=False, collection="
     # Save results to an Excel file if requested
     if save_result:
         save_path = f"results/{collection}/verses.xlsx"
-        result_df.to_excel(save_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_path, index=False)
         print(f"Results saved to {save_path}")
 
     return result_df
@@ -0,0 +1,468 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from afterlife import find_heaven_and_hell_in_one_hadith
+from animals import find_animals_in_one_hadith
+from ayat import extract_coordinates_values
+from caliphs import find_caliphs_in_one_hadith
+from concepts import find_concepts_in_one_hadith
+from corpus import load_corpus
+from crimes import find_crime_in_one_hadith
+from generate_rdf import turtlfy_collection, SIMILARITY_LIST_COLUMNS
+from groupofpeople import find_clans_in_one_hadith
+from holybooks import find_holybooks_in_one_hadith
+from locations import find_location_in_one_hadith
+from model_registry import set_model
+from persons import find_persons_in_one_hadith
+from pillarsofislam import find_pillars_in_one_hadith
+from pipeline import STAGES
+from plants import find_plants_in_one_hadith
+from prophets import find_prophets_in_one_hadith
+from similarities import encode_all_hadith, calculate_cosine_similarity, calculate_euclidean_similarity, \
+    calculate_manhattan_similarity, find_similar_hadith, load_similarity_matrix
+from utility import tarabic_name, english_name, hadith_number_name, SIMILARITY_MEASURES_DIR
+from vector_store import save_vector_store
+
+# Deterministic sample the benchmarks run on
+BENCHMARK_COLLECTION = "maj"
+BENCHMARK_SOURCE_PATH = "data/simplified_maj_db.xlsx"
+BENCHMARK_SAMPLE_SIZE = 500
+BENCHMARK_SEED = 0
+
+# Report file; {commit} is replaced by the current git commit so that runs of different commits can be compared
+BENCHMARK_RESULTS_PATH = "results/benchmarks/{commit}.json"
+
+# Input directories linked into the scratch directory the benchmarks write their results to
+SHARED_DIRS = ["data", "dictionaries", "mappings", "trained_models"]
+
+# Per-hadith extractors, by pipeline stage name; each returns the values of the columns of its stage
+EXTRACTORS = {
+    "locations": lambda ar_text, en_text, collection: (find_location_in_one_hadith(ar_text),),
+    "persons": lambda ar_text, en_text, collection: (find_persons_in_one_hadith(ar_text),),
+    "crimes": lambda ar_text, en_text, collection: (find_crime_in_one_hadith(ar_text),),
+    "afterlife": lambda ar_text, en_text, collection: find_heaven_and_hell_in_one_hadith(ar_text),
+    "prophets": lambda ar_text, en_text, collection: (find_prophets_in_one_hadith(ar_text, en_text, collection),),
+    "clans": lambda ar_text, en_text, collection: (find_clans_in_one_hadith(ar_text, en_text),),
+    "caliphs": lambda ar_text, en_text, collection: (find_caliphs_in_one_hadith(ar_text, en_text),),
+    "holybooks": lambda ar_text, en_text, collection: (find_holybooks_in_one_hadith(ar_text),),
+    "pillarsofislam": lambda ar_text, en_text, collection: (find_pillars_in_one_hadith(ar_text, en_text),),
+    "concepts": lambda ar_text, en_text, collection: (find_concepts_in_one_hadith(ar_text, en_text),),
+    "animals": lambda ar_text, en_text, collection: (find_animals_in_one_hadith(ar_text, en_text),),
+    "plants": lambda ar_text, en_text, collection: (find_plants_in_one_hadith(ar_text, en_text),),
+    "ayat": lambda ar_text, en_text, collection: (extract_coordinates_values(en_text),),
+}
+
+# Labels the stub NER model assigns, by token hash
+STUB_NER_LABELS = {0: "B-PERS", 1: "B-LOC", 2: "B-CRIME", 3: "B-PARA", 4: "B-HELL"}
+
+# Embedding sizes of the stub sentence models (those of the real models)
+STUB_EMBEDDING_SIZES = {"en": 384, "ar": 768}
+
+StubEntity = namedtuple("StubEntity", ["text", "label_"])
+
+
+class StubDoc:
+    """
+    Document returned by StubNERModel, with the ents attribute of a spaCy Doc.
+    """
+
+    def __init__(self, ents):
+        self.ents = ents
+
+
+class StubNERModel:
+    """
+    Deterministic stand-in for the spaCy NER pipeline, so that the benchmarks run without the
+    trained weights. Tokens are labeled from a hash of their text.
+    """
+
+    def __call__(self, text):
+        ents = []
+        for token in text.split():
+            label = STUB_NER_LABELS.get(zlib.crc32(token.encode("utf-8")) % 16)
+            if label:
+                ents.append(StubEntity(token, label))
+        return StubDoc(ents)
+
+    def pipe(self, texts, batch_size=None, n_process=1):
+        for text in texts:
+            yield self(text)
+
+
+class StubSentenceModel:
+    """
+    Deterministic stand-in for a sentence transformer: every text is encoded as a random unit
+    vector seeded by a hash of the text.
+    """
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+
+    def _encode_one(self, sentence):
+        vector = np.random.default_rng(zlib.crc32(sentence.encode("utf-8"))).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, convert_to_numpy=True,
+               show_progress_bar=False):
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        return np.array([self._encode_one(sentence) for sentence in sentences])
+
+
+# Function to replace the models with stubs
+def use_stub_models():
+    """
+    Registers the stub NER and sentence models in the model registry.
+    """
+    set_model("ner", StubNERModel(), version="stub")
+    for language, dimension in STUB_EMBEDDING_SIZES.items():
+        set_model(language, StubSentenceModel(dimension), version="stub")
+
+
+# Function to read the peak memory of the process
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the process so far.
+
+    Returns:
+        float: Peak RSS in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# Function to summarize the timings of a benchmark
+def summarize(name, durations, items, unit):
+    """
+    Computes the throughput and latency percentiles of a benchmark.
+
+    Args:
+        name (str): Name of the benchmark.
+        durations (list): Duration of each timed call, in seconds.
+        items (int): Number of hadith processed over all calls.
+        unit (str): What a timed call processes: "hadith" or "run".
+
+    Returns:
+        dict: Throughput in hadith per second, p50 and p95 latency of a call in milliseconds, and
+            the peak RSS of the process so far.
+    """
+    total = float(np.sum(durations))
+    return {
+        "name": name,
+        "unit": unit,
+        "calls": len(durations),
+        "items": items,
+        "total_seconds": round(total, 6),
+        "throughput_per_second": round(items / total, 3) if total else None,
+        "p50_ms": round(float(np.percentile(durations, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(durations, 95)) * 1000, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+# Function to time a call
+def timed_call(function, *args, **kwargs):
+    """
+    Calls a function and measures its duration.
+
+    Returns:
+        tuple: The result of the call and its duration in seconds.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# Function to take the deterministic sample of hadith
+def load_sample(collection=BENCHMARK_COLLECTION, source_path=BENCHMARK_SOURCE_PATH, sample_size=BENCHMARK_SAMPLE_SIZE,
+                seed=BENCHMARK_SEED):
+    """
+    Draws the same random sample of hadith on every run.
+
+    Args:
+        collection (str, optional): The collection name. Defaults to BENCHMARK_COLLECTION.
+        source_path (str, optional): Source spreadsheet. Defaults to BENCHMARK_SOURCE_PATH.
+        sample_size (int, optional): Number of hadith. Defaults to BENCHMARK_SAMPLE_SIZE.
+        seed (int, optional): Seed of the sample. Defaults to BENCHMARK_SEED.
+
+    Returns:
+        pd.DataFrame: The sampled hadith, in collection order.
+    """
+    hadith_df = load_corpus(collection, source_path)
+    sample_size = min(sample_size, len(hadith_df))
+    return hadith_df.sample(n=sample_size, random_state=seed).sort_index().reset_index(drop=True)
+
+
+# Function to benchmark the per-hadith extractors
+def benchmark_extractors(sample_df, collection=BENCHMARK_COLLECTION):
+    """
+    Runs each find_*_in_one_hadith function over the sample, timing every call.
+
+    Args:
+        sample_df (pd.DataFrame): The sampled hadith.
+        collection (str, optional): The collection name. Defaults to BENCHMARK_COLLECTION.
+
+    Returns:
+        tuple: The summary of each extractor, and the result table of each extractor.
+    """
+    texts = list(zip(sample_df[hadith_number_name], sample_df[tarabic_name], sample_df[english_name]))
+    summaries = []
+    tables = {}
+    for name, extractor in EXTRACTORS.items():
+        rows = []
+        durations = []
+        for hadith_number, ar_text, en_text in texts:
+            values, duration = timed_call(extractor, ar_text, en_text, collection)
+            rows.append((hadith_number,) + tuple(values))
+            durations.append(duration)
+        tables[name] = pd.DataFrame(rows, columns=["hadith_number"] + STAGES[name]["columns"])
+        summaries.append(summarize(f"extract_{name}", durations, len(texts), "hadith"))
+    return summaries, tables
+
+
+# Function to write the similarity table read by generate_rdf from a similarity matrix
+def save_similarity_table(matrix, file_path):
+    """
+    Buckets the hadith similar to each hadith by similarity, in the layout of mukarrat_similarity.csv.
+
+    Args:
+        matrix (np.ndarray): Square similarity matrix.
+        file_path (str): Path of the CSV file.
+    """
+    rows = []
+    for i, similarities in enumerate(matrix):
+        others = [j for j in range(len(similarities)) if j != i]
+        rows.append([i + 1, [],
+                     [j + 1 for j in others if similarities[j] >= 0.9],
+                     [j + 1 for j in others if 0.8 <= similarities[j] < 0.9],
+                     [j + 1 for j in others if 0.7 <= similarities[j] < 0.8],
+                     []])
+    pd.DataFrame(rows, columns=["hadith_number", "similarityvalues"] + SIMILARITY_LIST_COLUMNS).to_csv(
+        file_path, index=False)
+
+
+# Function to benchmark the similarity pipeline
+def benchmark_similarity(sample_df, collection=BENCHMARK_COLLECTION, repeat=1):
+    """
+    Runs encode_all_hadith, the three distance calculators and find_similar_hadith over the sample.
+
+    Must run in the scratch directory, as the calculators write their matrices to SIMILARITY_MEASURES_DIR.
+
+    Args:
+        sample_df (pd.DataFrame): The sampled hadith.
+        collection (str, optional): The collection name. Defaults to BENCHMARK_COLLECTION.
+        repeat (int, optional): Number of runs of each step. Defaults to 1.
+
+    Returns:
+        list: The summary of each step.
+    """
+    items = len(sample_df) * repeat
+    summaries = []
+
+    durations = []
+    for _ in range(repeat):
+        encodings_df, duration = timed_call(encode_all_hadith, sample_df)
+        durations.append(duration)
+    summaries.append(summarize("encode_all_hadith", durations, items, "run"))
+
+    store_dir = f"results/{collection}/encodings"
+    save_vector_store(store_dir, encodings_df["hadith_number"], encodings_df["ar_encodings"].tolist(),
+                      encodings_df["eng_encodings"].tolist())
+
+    os.makedirs(SIMILARITY_MEASURES_DIR, exist_ok=True)
+    for name, calculator in [("calculate_cosine_similarity", calculate_cosine_similarity),
+                             ("calculate_euclidean_similarity", calculate_euclidean_similarity),
+                             ("calculate_manhattan_similarity", calculate_manhattan_similarity)]:
+        durations = [timed_call(calculator, store_dir)[1] for _ in range(repeat)]
+        summaries.append(summarize(name, durations, items, "run"))
+
+    durations = [timed_call(find_similar_hadith, "cosine")[1] for _ in range(repeat)]
+    summaries.append(summarize("find_similar_hadith", durations, items, "run"))
+
+    save_similarity_table(load_similarity_matrix("cosine", "arabic"), f"results/{collection}/mukarrat_similarity.csv")
+    return summaries
+
+
+# Function to benchmark the RDF generation
+def benchmark_rdf(tables, collection=BENCHMARK_COLLECTION, repeat=1):
+    """
+    Saves the extractor results where generate_rdf reads them, then times turtlfy_collection.
+
+    Must run in the scratch directory, after benchmark_similarity.
+
+    Args:
+        tables (dict): Result table of each extractor, as returned by benchmark_extractors.
+        collection (str, optional): The collection name. Defaults to BENCHMARK_COLLECTION.
+        repeat (int, optional): Number of runs. Defaults to 1.
+
+    Returns:
+        list: The summary of the RDF generation.
+    """
+    output_dir = f"results/{collection}/identified_entities"
+    os.makedirs(output_dir, exist_ok=True)
+    for name, table in tables.items():
+        table.to_excel(os.path.join(output_dir, STAGES[name]["output_file"]), index=False)
+    # There is no angel extractor; generate_rdf still reads an angels table
+    pd.DataFrame({"hadith_number": tables["locations"]["hadith_number"], "angels": [[]] * len(tables["locations"])}
+                 ).to_excel(os.path.join(output_dir, "angels.xlsx"), index=False)
+
+    os.makedirs("results/ttl", exist_ok=True)
+    durations = [timed_call(turtlfy_collection, collection, "results/ttl")[1] for _ in range(repeat)]
+    return [summarize("turtlfy_collection", durations, len(tables["locations"]) * repeat, "run")]
+
+
+# Function to get the current git commit
+def current_commit():
+    """
+    Returns the git commit of the working tree.
+
+    Returns:
+        str: The short commit hash, or "unversioned" outside a git repository.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unversioned"
+
+
+# Function to run all benchmarks
+def run_benchmark(collection=BENCHMARK_COLLECTION, source_path=BENCHMARK_SOURCE_PATH,
+                  sample_size=BENCHMARK_SAMPLE_SIZE, seed=BENCHMARK_SEED, stub_models=False, repeat=1,
+                  output_path=BENCHMARK_RESULTS_PATH):
+    """
+    Benchmarks the extractors, the similarity pipeline and the RDF generation on a sample of hadith
+    and saves the report as JSON.
+
+    The benchmarks write their outputs to a scratch directory, so the results of the repository are
+    left untouched.
+
+    Args:
+        collection (str, optional): The collection name. Defaults to BENCHMARK_COLLECTION.
+        source_path (str, optional): Source spreadsheet. Defaults to BENCHMARK_SOURCE_PATH.
+        sample_size (int, optional): Number of hadith. Defaults to BENCHMARK_SAMPLE_SIZE.
+        seed (int, optional): Seed of the sample. Defaults to BENCHMARK_SEED.
+        stub_models (bool, optional): Use stub models instead of the trained ones. Defaults to False.
+        repeat (int, optional): Number of runs of the whole-sample steps. Defaults to 1.
+        output_path (str, optional): Path of the report. Defaults to BENCHMARK_RESULTS_PATH.
+
+    Returns:
+        dict: The report.
+    """
+    commit = current_commit()
+    output_path = os.path.abspath(output_path.format(commit=commit))
+    if stub_models:
+        use_stub_models()
+    sample_df = load_sample(collection, source_path, sample_size, seed)
+
+    working_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        for directory in SHARED_DIRS:
+            if os.path.exists(directory):
+                os.symlink(os.path.abspath(directory), os.path.join(scratch_dir, directory))
+        os.chdir(scratch_dir)
+        try:
+            summaries, tables = benchmark_extractors(sample_df, collection)
+            summaries += benchmark_similarity(sample_df, collection, repeat)
+            summaries += benchmark_rdf(tables, collection, repeat)
+        finally:
+            os.chdir(working_dir)
+
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "collection": collection,
+        "sample_size": len(sample_df),
+        "seed": seed,
+        "stub_models": stub_models,
+        "repeat": repeat,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "benchmarks": summaries,
+    }
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved to {output_path}")
+    return report
+
+
+# Function to compare a report with a baseline report
+def compare_benchmarks(baseline_path, report_path):
+    """
+    Prints the throughput and p95 latency of each benchmark of a report relative to a baseline.
+
+    Args:
+        baseline_path (str): Path of the baseline report.
+        report_path (str): Path of the report to compare.
+
+    Returns:
+        pd.DataFrame: Throughput and p95 latency of both reports, with their ratios.
+    """
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = pd.DataFrame(json.load(file)["benchmarks"]).set_index("name")
+    with open(report_path, encoding="utf-8") as file:
+        report = pd.DataFrame(json.load(file)["benchmarks"]).set_index("name")
+    comparison = baseline[["throughput_per_second", "p95_ms"]].join(
+        report[["throughput_per_second", "p95_ms"]], lsuffix="_baseline", rsuffix="_current", how="outer")
+    comparison["throughput_ratio"] = (comparison["throughput_per_second_current"] /
+                                      comparison["throughput_per_second_baseline"]).round(3)
+    comparison["p95_ratio"] = (comparison["p95_ms_current"] / comparison["p95_ms_baseline"]).round(3)
+    print(comparison.to_string())
+    return comparison
+
+
+# Function to parse the command line of the benchmarks
+def parse_benchmark_arguments(argv=None):
+    """
+    Parses the command line options of the benchmarks.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the extractors, similarity pipeline and RDF generation.")
+    parser.add_argument("--collection", default=BENCHMARK_COLLECTION,
+                        help="collection of the sample (default: %(default)s)")
+    parser.add_argument("--source", default=BENCHMARK_SOURCE_PATH,
+                        help="source spreadsheet of the sample (default: %(default)s)")
+    parser.add_argument("--sample-size", type=int, default=BENCHMARK_SAMPLE_SIZE,
+                        help="number of hadith in the sample (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=BENCHMARK_SEED,
+                        help="seed of the sample (default: %(default)s)")
+    parser.add_argument("--stub-models", action="store_true",
+                        help="use deterministic stub models instead of the trained NER and sentence models")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="number of runs of the whole-sample steps (default: %(default)s)")
+    parser.add_argument("--output", default=BENCHMARK_RESULTS_PATH,
+                        help="path of the JSON report (default: %(default)s)")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="JSON report of a previous run to compare the results with")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_benchmark_arguments(argv)
+    report = run_benchmark(args.collection, args.source, args.sample_size, args.seed, args.stub_models, args.repeat,
+                           args.output)
+    if args.compare:
+        compare_benchmarks(args.compare, args.output.format(commit=report["commit"]))
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,51 @@
+from functools import lru_cache
 import pandas as pd
 import tqdm
-from pyarabic.araby import strip_tashkeel
+from normalization import strip_tashkeel
+from dictionary_matcher import DictionaryMatcher, load_dictionary, MATCH_AR_AND_EN
 from utility import tarabic_name, hadith_number_name, strip_punctuation, english_name
+from profiling import timed, NORMALIZATION, SERIALIZATION
 
 # Load the dictionary of caliphs from an Excel file
 CALIPHS_DICTIONARY_PATH = 'dictionaries/caliphs.xlsx'
-df_caliphs = pd.read_excel(CALIPHS_DICTIONARY_PATH)
+
+# Function to load the compiled dictionary of caliphs on first use
+@lru_cache(maxsize=None)
+def get_caliphs_dictionary():
+    """
+    Loads the compiled dictionary of caliphs once per process, so that importing the module reads no file.
+
+    Returns:
+        CompiledDictionary: The caliphs dictionary.
+    """
+    return load_dictionary(CALIPHS_DICTIONARY_PATH, policy=MATCH_AR_AND_EN)
 
 # Function to find caliphs mentioned in a single hadith
-def find_caliphs_in_one_hadith(ar_text, en_text, df=df_caliphs):
+def find_caliphs_in_one_hadith(ar_text, en_text, df=None):
     """
     Identifies caliphs mentioned in a single hadith using Arabic and English patterns.
 
     Args:
         ar_text (str): The Arabic text of the hadith.
         en_text (str): The English translation of the hadith.
-        df (pd.DataFrame): The DataFrame containing caliph patterns and IDs.
+        df (pd.DataFrame, optional): The DataFrame containing caliph patterns and IDs.
+            Defaults to the compiled caliphs dictionary.
 
     Returns:
         list: A list of IDs corresponding to caliphs mentioned in the hadith.
     """
     # Preprocess the Arabic text
-    ar_text = strip_punctuation(ar_text)
-    ar_text = strip_tashkeel(ar_text)
-
-    caliphs_list = []
-
-    # Iterate through the caliph dictionary to find matches
-    for _, row in df.iterrows():
-        # Extract and process patterns from the dictionary
-        ar_patterns = strip_tashkeel(row['ar']).split(',')  # Arabic patterns
-        en_patterns = row['en'].split(',')  # English patterns
-
-        # Check for matches in both Arabic and English texts
-        is_match_en = any(pattern.lower() in en_text.lower() for pattern in en_patterns)
-        is_match_ar = any(pattern in ar_text for pattern in ar_patterns)
+    with timed(NORMALIZATION):
+        ar_text = strip_punctuation(ar_text)
+        ar_text = strip_tashkeel(ar_text)
 
-        if is_match_en and is_match_ar:
-            caliphs_list.append(row['ID'])
+    if df is None:
+        matcher = get_caliphs_dictionary().matcher()
+    else:
+        matcher = DictionaryMatcher.from_dataframe(df, policy=MATCH_AR_AND_EN)
 
-    return caliphs_list
+    # Both the Arabic and the English patterns must match
+    return matcher.match(ar_text, en_text)
 
 # Function to find caliphs mentioned in all hadith
 def find_caliphs_mentioned_in_all_hadith(hadith_df, save_result=False, save_file_path=""):
@@ -88,7 +94,8 @@ def find_caliphs_mentioned_in_all_hadith(hadith_df, save_result=False, save_file
 
     # Save results to an Excel file if requested
     if save_result and save_file_path:
-        result_df.to_excel(save_file_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_file_path, index=False)
         print(f"Results saved to {save_file_path}")
 
     return result_df
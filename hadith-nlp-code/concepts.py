@@ -1,51 +1,53 @@
+from functools import lru_cache
 import pandas as pd
 import tqdm
-from pyarabic.araby import strip_tashkeel
+from normalization import strip_tashkeel
+from dictionary_matcher import DictionaryMatcher, load_dictionary, MATCH_AR_OR_EN
 from utility import tarabic_name, hadith_number_name, strip_punctuation, english_name
+from profiling import timed, NORMALIZATION, SERIALIZATION
 
 # Load the dictionary of concepts from an Excel file
 CONCEPTS_DICTIONARY_PATH = 'dictionaries/concepts.xlsx'
-df_concepts = pd.read_excel(CONCEPTS_DICTIONARY_PATH)
+# Rows with '-' in the 'ar' column only have English patterns
+
+# Function to load the compiled dictionary of concepts on first use
+@lru_cache(maxsize=None)
+def get_concepts_dictionary():
+    """
+    Loads the compiled dictionary of concepts once per process, so that importing the module reads no file.
+
+    Returns:
+        CompiledDictionary: The concepts dictionary.
+    """
+    return load_dictionary(CONCEPTS_DICTIONARY_PATH, policy=MATCH_AR_OR_EN)
 
 # Function to find concepts mentioned in a single hadith
-def find_concepts_in_one_hadith(ar_text, en_text, df=df_concepts):
+def find_concepts_in_one_hadith(ar_text, en_text, df=None):
     """
     Identifies concepts mentioned in a single hadith using Arabic and English patterns.
 
     Args:
         ar_text (str): The Arabic text of the hadith.
         en_text (str): The English translation of the hadith.
-        df (pd.DataFrame): The DataFrame containing concept patterns and IDs.
+        df (pd.DataFrame, optional): The DataFrame containing concept patterns and IDs.
+            Defaults to the compiled concepts dictionary.
 
     Returns:
         list: A list of IDs corresponding to concepts mentioned in the hadith.
     """
     # Preprocess Arabic and English texts
-    ar_text = strip_punctuation(ar_text)
-    en_text = strip_punctuation(en_text)
-    ar_text = strip_tashkeel(ar_text)
-
-    concepts_list = []
-
-    # Iterate through the concepts dictionary to find matches
-    for _, row in df.iterrows():
-        # Handle English-only patterns
-        if row['ar'] == '-':  # Indicates no Arabic pattern available
-            en_patterns = row['en'].split(',')
-            is_match_en = any(pattern.lower() in en_text.lower() for pattern in en_patterns)
-        else:
-            # Handle Arabic patterns
-            ar_patterns = strip_tashkeel(row['ar']).split(',')
-            is_match_ar = any(pattern in ar_text for pattern in ar_patterns)
-
-            en_patterns = row['en'].split(',')
-            is_match_en = any(pattern.lower() in en_text.lower() for pattern in en_patterns)
+    with timed(NORMALIZATION):
+        ar_text = strip_punctuation(ar_text)
+        en_text = strip_punctuation(en_text)
+        ar_text = strip_tashkeel(ar_text)
 
-        # If either Arabic or English patterns match, append the ID
-        if is_match_ar or is_match_en:
-            concepts_list.append(row['ID'])
+    if df is None:
+        matcher = get_concepts_dictionary().matcher()
+    else:
+        matcher = DictionaryMatcher.from_dataframe(df, policy=MATCH_AR_OR_EN)
 
-    return concepts_list
+    # If either Arabic or English patterns match, the ID is reported
+    return matcher.match(ar_text, en_text)
 
 # Function to find concepts mentioned in all hadith
 def find_concepts_mentioned_in_all_hadith(hadith_df, save_result=False, save_file_path=""):
@@ -94,7 +96,8 @@ def find_concepts_mentioned_in_all_hadith(hadith_df, save_result=False, save_fil
 
     # Save results to an Excel file if requested
     if save_result and save_file_path:
-        result_df.to_excel(save_file_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_file_path, index=False)
         print(f"Results saved to {save_file_path}")
 
     return result_df
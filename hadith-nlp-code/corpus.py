@@ -0,0 +1,150 @@
+import json
+import os
+import pandas as pd
+from normalization import normalize_series
+from utility import arabic_to_int, tarabic_name, english_name, hadith_number_name
+from profiling import timed, NORMALIZATION, SERIALIZATION
+
+# Source spreadsheet and columnar cache of each collection
+CORPUS_SOURCE_PATH = "data/simplified_{collection}_db.xlsx"
+CORPUS_CACHE_DIR = "data/cache"
+
+# Columns precomputed in the cache
+AR_NORMALIZED_NAME = "ar_normalized"
+AR_CLEAN_NAME = "ar_clean"
+EN_NORMALIZED_NAME = "en_normalized"
+HADITH_NUM_NAME = "hadith_num"
+
+# Bumped whenever the cached columns change, so that old caches are rebuilt
+CACHE_VERSION = 2
+
+
+# Function to pick the cache format supported by the installed libraries
+def cache_format():
+    """
+    Returns the format of the corpus cache: Parquet when pyarrow or fastparquet is
+    installed, pickle otherwise.
+
+    Returns:
+        str: "parquet" or "pickle".
+    """
+    for engine in ("pyarrow", "fastparquet"):
+        try:
+            __import__(engine)
+            return "parquet"
+        except ImportError:
+            pass
+    return "pickle"
+
+
+# Function to write a file under a temporary name and move it into place
+def _write_atomically(path, write):
+    """
+    Writes a file under a temporary name and renames it to its path, so that concurrent
+    readers, e.g. pipeline workers, never see a partial file.
+
+    Args:
+        path (str): Path of the file.
+        write (callable): Function writing the content to the path it is given.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    write(temporary_path)
+    os.replace(temporary_path, path)
+
+
+# Function to convert a hadith number cell to an integer
+def parse_hadith_number(value):
+    """
+    Converts the hadith number of a row to an integer.
+
+    Args:
+        value (int or str): Hadith number, either numeric or in Eastern Arabic numerals (e.g. '~۴~').
+
+    Returns:
+        int: The hadith number, or -1 when it cannot be read.
+    """
+    if isinstance(value, str):
+        return arabic_to_int(value)
+    return int(value)
+
+
+# Function to add the normalized columns to a collection
+@timed(NORMALIZATION)
+def normalize_corpus(hadith_df):
+    """
+    Adds the normalized Arabic text (with and without English characters and extra spaces),
+    normalized English text and numeric hadith number columns.
+
+    Args:
+        hadith_df (pd.DataFrame): The collection as read from its spreadsheet.
+
+    Returns:
+        pd.DataFrame: The collection with the AR_NORMALIZED_NAME, AR_CLEAN_NAME, EN_NORMALIZED_NAME and
+            HADITH_NUM_NAME columns.
+    """
+    hadith_df = hadith_df.copy()
+    hadith_df[AR_NORMALIZED_NAME] = normalize_series(hadith_df[tarabic_name], "ar")
+    hadith_df[AR_CLEAN_NAME] = normalize_series(hadith_df[tarabic_name], "ar_clean")
+    hadith_df[EN_NORMALIZED_NAME] = normalize_series(hadith_df[english_name], "en")
+    hadith_df[HADITH_NUM_NAME] = [parse_hadith_number(value) for value in hadith_df[hadith_number_name]]
+    return hadith_df
+
+
+def _source_signature(source_path):
+    """
+    Describes the source spreadsheet so that a stale cache can be detected.
+
+    Args:
+        source_path (str): Path of the source spreadsheet.
+
+    Returns:
+        dict: Size and modification time of the source, and the cache version.
+    """
+    stat = os.stat(source_path)
+    return {"source": os.path.abspath(source_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "version": CACHE_VERSION}
+
+
+@timed(SERIALIZATION)
+def load_corpus(collection="sb", source_path="", cache_dir=CORPUS_CACHE_DIR, refresh=False):
+    """
+    Loads a collection from its columnar cache, converting the source spreadsheet on first use
+    or whenever the spreadsheet has changed.
+
+    Args:
+        collection (str, optional): The collection name. Defaults to "sb".
+        source_path (str, optional): Source spreadsheet. Defaults to CORPUS_SOURCE_PATH.
+        cache_dir (str, optional): Directory of the cache. Defaults to CORPUS_CACHE_DIR.
+        refresh (bool, optional): Rebuild the cache even if it is up to date. Defaults to False.
+
+    Returns:
+        pd.DataFrame: The collection with its original and normalized columns.
+    """
+    source_path = source_path or CORPUS_SOURCE_PATH.format(collection=collection)
+    file_format = cache_format()
+    cache_path = os.path.join(cache_dir, f"{collection}.{'parquet' if file_format == 'parquet' else 'pkl'}")
+    meta_path = os.path.join(cache_dir, f"{collection}.meta.json")
+    signature = _source_signature(source_path)
+
+    if not refresh and os.path.exists(cache_path) and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as file:
+            if json.load(file) == signature:
+                if file_format == "parquet":
+                    return pd.read_parquet(cache_path)
+                return pd.read_pickle(cache_path)
+
+    hadith_df = normalize_corpus(pd.read_excel(source_path))
+    os.makedirs(cache_dir, exist_ok=True)
+    if file_format == "parquet":
+        _write_atomically(cache_path, lambda path: hadith_df.to_parquet(path, index=False))
+    else:
+        print("Neither pyarrow nor fastparquet is installed, the corpus cache is written as a pickle file")
+        _write_atomically(cache_path, hadith_df.to_pickle)
+
+    # The signature is written last, so that it never describes a cache that is not in place yet
+    def write_signature(path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(signature, file)
+    _write_atomically(meta_path, write_signature)
+    print(f"Corpus cache saved to {cache_path}")
+    return hadith_df
@@ -1,12 +1,28 @@
+from functools import lru_cache
 import pandas as pd
 import tqdm
-from pyarabic.araby import strip_tashkeel
-from NERModelLoader import nlp
-from utility import strip_punctuation, Resolve_Entities, tarabic_name, hadith_number_name
-
-# Load the dictionary of crimes
+from ner_annotations import normalize_for_ner
+from model_registry import get_ner_model
+from entity_resolver import EntityIdResolver
+from ner_engine import resolve_doc_entities, stream_resolved_entities, DEFAULT_BATCH_SIZE, DEFAULT_N_PROCESS
+from utility import tarabic_name, hadith_number_name
+from profiling import timed, NORMALIZATION, INFERENCE, ENTITY_RESOLUTION, SERIALIZATION
+
+# Dictionary of crimes
 CRIMES_DICTIONARY_PATH = "dictionaries/crimes.csv"
-crime_id_df = pd.read_csv(CRIMES_DICTIONARY_PATH)
+
+
+# Function to load the indexed dictionary of crimes on first use
+@lru_cache(maxsize=None)
+def get_crime_resolver():
+    """
+    Loads and indexes the dictionary of crimes once per process, so that importing the module reads no file.
+
+    Returns:
+        EntityIdResolver: The crimes resolver.
+    """
+    return EntityIdResolver.from_csv(CRIMES_DICTIONARY_PATH)
+
 
 # Function to get the crime ID based on Arabic name
 def get_crime_id(arabic_name):
@@ -19,35 +35,35 @@ def get_crime_id(arabic_name):
     Returns:
         int or None: The crime ID if found; otherwise, None.
     """
-    for _, row in crime_id_df.iterrows():
-        # Split the 'alternatives' column into a list of possible names
-        string_list = row["alternatives"].split('-')
-        # Check if any alternative matches the Arabic name
-        if any(substring in arabic_name for substring in string_list):
-            return row["id"]
-    return None
+    # The first crime with an alternative contained in the name is returned
+    return get_crime_resolver().resolve(arabic_name)
 
-# Function to find crimes mentioned in a single hadith
-def find_crime_in_one_hadith(arabic_text):
+# Function to preprocess the Arabic text before crime extraction
+@timed(NORMALIZATION)
+def preprocess_crime_text(arabic_text):
     """
-    Identifies crimes mentioned in a single hadith using NER and a crimes dictionary.
+    Prepares the Arabic text of a hadith for crime extraction.
 
     Args:
         arabic_text (str): The text of the hadith in Arabic.
 
     Returns:
-        set: A set of unique crime IDs mentioned in the hadith.
+        str: The text as sent to the NER model by the pipeline (see normalize_for_ner).
     """
-    # Preprocess Arabic text
-    arabic_text = strip_punctuation(arabic_text)
-    arabic_text = strip_tashkeel(arabic_text)
+    return normalize_for_ner(arabic_text)
 
-    # Extract entities using the NER model
-    doc = nlp(arabic_text)
-    entities = [(ent.text, ent.label_) for ent in doc.ents]
-    resolved_entities = Resolve_Entities(entities)
+# Function to map resolved entities to crime IDs
+@timed(ENTITY_RESOLUTION)
+def crimes_from_entities(resolved_entities):
+    """
+    Collects crime IDs from the resolved entities of a hadith.
 
-    # Identify and collect crime IDs
+    Args:
+        resolved_entities (list): List of resolved entities as tuples (entity, label).
+
+    Returns:
+        set: A set of unique crime IDs.
+    """
     crimes = set()
     for entity, label in resolved_entities:
         if label == "CRIME":
@@ -57,8 +73,32 @@ def find_crime_in_one_hadith(arabic_text):
 
     return crimes
 
+# Function to find crimes mentioned in a single hadith
+def find_crime_in_one_hadith(arabic_text):
+    """
+    Identifies crimes mentioned in a single hadith using NER and a crimes dictionary.
+
+    Args:
+        arabic_text (str): The text of the hadith in Arabic.
+
+    Returns:
+        set: A set of unique crime IDs mentioned in the hadith.
+    """
+    # Preprocess Arabic text
+    arabic_text = preprocess_crime_text(arabic_text)
+
+    # Extract entities using the NER model
+    with timed(INFERENCE):
+        doc = get_ner_model()(arabic_text)
+    resolved_entities = resolve_doc_entities(doc)
+
+    # Identify and collect crime IDs
+    return crimes_from_entities(resolved_entities)
+
 # Function to find crimes mentioned in all hadith
-def find_crimes_mentioned_in_all_hadith(hadith_df, save_result=False, collection="maj"):
+def find_crimes_mentioned_in_all_hadith(hadith_df, save_result=False, collection="maj",
+                                        batch_size=DEFAULT_BATCH_SIZE, n_process=DEFAULT_N_PROCESS,
+                                        annotation_store=None):
     """
     Identifies crimes mentioned in all hadith within the dataset.
 
@@ -66,6 +106,10 @@ def find_crimes_mentioned_in_all_hadith(hadith_df, save_result=False, collection
         hadith_df (pd.DataFrame): DataFrame containing hadith texts in Arabic.
         save_result (bool, optional): Whether to save the results to an Excel file. Defaults to False.
         collection (str, optional): The collection name to use for saving results. Defaults to "maj".
+        batch_size (int, optional): Number of hadith per NER batch. Defaults to DEFAULT_BATCH_SIZE.
+        n_process (int, optional): Number of NER worker processes. Defaults to DEFAULT_N_PROCESS.
+        annotation_store (NERAnnotationStore, optional): Store of cached NER annotations. When given,
+            entities are read from the store and the model only runs on hadith missing from it.
 
     Returns:
         pd.DataFrame: DataFrame with hadith numbers and corresponding crime mentions.
@@ -74,19 +118,23 @@ def find_crimes_mentioned_in_all_hadith(hadith_df, save_result=False, collection
     all_mentioned_crimes = []
     all_hadith_numbers = []
 
-    # Iterate through the hadith dataset with a progress bar
-    with tqdm.tqdm(total=len(hadith_df), desc="Extracting crimes") as pbar:
-        for _, row in hadith_df.iterrows():
-            # Extract Arabic text
-            arabic_text = row[tarabic_name]
+    if annotation_store is not None:
+        # Reuse the annotations of a single shared NER pass
+        entity_stream = annotation_store.annotate(hadith_df, batch_size=batch_size, n_process=n_process)
+    else:
+        # Stream the preprocessed texts through the NER model in batches
+        texts = (preprocess_crime_text(text) for text in hadith_df[tarabic_name])
+        entity_stream = stream_resolved_entities(texts, batch_size=batch_size, n_process=n_process)
 
+    with tqdm.tqdm(total=len(hadith_df), desc="Extracting crimes") as pbar:
+        for hadith_number, resolved_entities in zip(hadith_df[hadith_number_name], entity_stream):
             # Find crimes mentioned in the current hadith
-            crimes_in_hadith = find_crime_in_one_hadith(arabic_text)
+            crimes_in_hadith = crimes_from_entities(resolved_entities)
 
             # Append results
             all_crimes.append(crimes_in_hadith)
             all_mentioned_crimes.extend(crimes_in_hadith)
-            all_hadith_numbers.append(row[hadith_number_name])
+            all_hadith_numbers.append(hadith_number)
 
             pbar.update(1)
 
@@ -104,7 +152,8 @@ def find_crimes_mentioned_in_all_hadith(hadith_df, save_result=False, collection
     # Save results to an Excel file if requested
     if save_result:
         save_path = f"results/{collection}/crimes.xlsx"
-        result_df.to_excel(save_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_path, index=False)
         print(f"Results saved to {save_path}")
 
     return result_df
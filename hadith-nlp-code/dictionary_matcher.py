@@ -0,0 +1,519 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+from collections import deque
+import pandas as pd
+from normalization import strip_tashkeel
+from profiling import timed, DICTIONARY_MATCHING, SERIALIZATION
+
+# Match policies of the dictionary based extractors
+MATCH_AR_AND_EN = "ar_and_en"  # Arabic and English patterns must both match
+MATCH_AR_OR_EN = "ar_or_en"    # Either the Arabic or the English patterns match
+MATCH_AR = "ar"                # Only the Arabic patterns are checked
+MATCH_EN = "en"                # Only the English patterns are checked
+
+# Match modes of the pipeline
+MATCH_SUBSTRINGS = "substrings"  # A pattern matches anywhere in the text, even inside a longer word
+MATCH_TOKENS = "tokens"          # A pattern matches whole words only, through a TokenIndex
+MATCH_MODES = (MATCH_SUBSTRINGS, MATCH_TOKENS)
+
+# Words of Arabic and English texts and patterns
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Pickle cache of the compiled dictionaries
+DICTIONARY_CACHE_DIR = "data/cache/dictionaries"
+
+# Bumped whenever the pickled dictionaries change, so that old caches are rebuilt
+DICTIONARY_CACHE_VERSION = 2
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton reporting which of a set of patterns occur in a text.
+
+    The automaton is built once from the patterns and then scans each text a single
+    time, which gives the same answers as checking `pattern in text` for every pattern.
+    """
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns (list of str): The patterns to search for.
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+        self.always = set()  # Empty patterns are contained in every text
+
+        # Build the trie of the patterns
+        for index, pattern in enumerate(patterns):
+            if not pattern:
+                self.always.add(index)
+                continue
+            node = 0
+            for ch in pattern:
+                child = self.goto[node].get(ch)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                    self.goto[node][ch] = child
+                node = child
+            self.output[node].add(index)
+
+        # Compute failure links breadth first and merge the outputs along them
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] |= self.output[self.fail[child]]
+
+    def find(self, text):
+        """
+        Finds the patterns occurring in a text.
+
+        Args:
+            text (str): The text to scan.
+
+        Returns:
+            set: Indices of the patterns that occur in the text.
+        """
+        goto, fail, output = self.goto, self.fail, self.output
+        matched = set(self.always)
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                matched |= output[node]
+        return matched
+
+
+# Function to get the key of a pattern in a TokenIndex
+def token_key(text):
+    """
+    Splits a pattern into its words, e.g. "Abu  Bakr," -> ("Abu", "Bakr").
+
+    Args:
+        text (str): The pattern.
+
+    Returns:
+        tuple: The words of the pattern, empty when it has none.
+    """
+    return tuple(TOKEN_PATTERN.findall(text))
+
+
+class TokenIndex:
+    """
+    Word level inverted index of a hadith text, for matching dictionary patterns on word boundaries.
+
+    The index maps each word of the text to its positions, so checking a pattern is a hash probe
+    of its first word, followed for a pattern of several words by a comparison of the n-gram at
+    each position of that word. An index can be shared by all the dictionaries matched against
+    the same text.
+    """
+
+    def __init__(self, text, lowercase=False):
+        """
+        Args:
+            text (str): The preprocessed text of the hadith.
+            lowercase (bool, optional): Whether to lowercase the text, as done for English. Defaults to False.
+        """
+        self.tokens = tuple(TOKEN_PATTERN.findall(text.lower() if lowercase else text))
+        self.positions = {}
+        for position, token in enumerate(self.tokens):
+            self.positions.setdefault(token, []).append(position)
+
+    def __contains__(self, key):
+        """
+        Args:
+            key (tuple): Words of a pattern, as returned by token_key.
+
+        Returns:
+            bool: Whether the words occur consecutively in the text.
+        """
+        positions = self.positions.get(key[0])
+        if positions is None:
+            return False
+        n = len(key)
+        if n == 1:
+            return True
+        tokens = self.tokens
+        return any(tokens[position:position + n] == key for position in positions)
+
+
+# Function to split the pattern cells of a dictionary
+def split_patterns(df, separator=",", missing_ar="-", uses_ar=True, uses_en=True):
+    """
+    Splits the 'ar' and 'en' cells of a dictionary into normalized patterns.
+
+    Args:
+        df (pd.DataFrame): The dictionary of patterns and IDs.
+        separator (str, optional): Separator between the alternatives of a pattern cell. Defaults to ",".
+        missing_ar (str, optional): Cell value marking a row without Arabic patterns. Defaults to "-".
+        uses_ar (bool, optional): Whether the Arabic patterns are needed. Defaults to True.
+        uses_en (bool, optional): Whether the English patterns are needed. Defaults to True.
+
+    Returns:
+        tuple: Arabic patterns without diacritics and lowercased English patterns of each row,
+            None for a row without patterns or a language that is not needed.
+    """
+    ar_patterns = []
+    en_patterns = []
+    for ar_cell, en_cell in zip(df['ar'], df['en']):
+        if uses_ar and ar_cell != missing_ar:
+            ar_patterns.append(strip_tashkeel(ar_cell).split(separator))
+        else:
+            ar_patterns.append(None)
+        if uses_en:
+            en_patterns.append([pattern.lower() for pattern in en_cell.split(separator)])
+        else:
+            en_patterns.append(None)
+    return ar_patterns, en_patterns
+
+
+class DictionaryMatcher:
+    """
+    Compiled form of an entity dictionary with Arabic and English patterns.
+
+    Each dictionary row contributes its patterns to one Arabic and one English automaton,
+    so a hadith is scanned once per language instead of once per pattern. When a TokenIndex is
+    given instead of a text, patterns only match whole words and are looked up in the index.
+    """
+
+    def __init__(self, ids, ar_patterns, en_patterns, policy=MATCH_AR_AND_EN):
+        """
+        Args:
+            ids (list): The ID of each dictionary row.
+            ar_patterns (list): Normalized Arabic patterns of each row, or None if the row has none.
+            en_patterns (list): Lowercased English patterns of each row, or None if the row has none.
+            policy (str, optional): How Arabic and English matches are combined. Defaults to MATCH_AR_AND_EN.
+        """
+        self.ids = list(ids)
+        self.policy = policy
+        self.ar_automaton, self.ar_owners = self._compile(ar_patterns)
+        self.en_automaton, self.en_owners = self._compile(en_patterns)
+        self.ar_keys = self._token_keys(ar_patterns)
+        self.en_keys = self._token_keys(en_patterns)
+
+    @staticmethod
+    def _compile(row_patterns):
+        """
+        Builds the automaton of a list of per-row patterns.
+
+        Args:
+            row_patterns (list): Patterns of each row, or None if the row has none.
+
+        Returns:
+            tuple: The automaton and the row index owning each pattern.
+        """
+        patterns = []
+        owners = []
+        for row_index, patterns_of_row in enumerate(row_patterns):
+            for pattern in patterns_of_row or []:
+                patterns.append(pattern)
+                owners.append(row_index)
+        return AhoCorasick(patterns), owners
+
+    @staticmethod
+    def _token_keys(row_patterns):
+        """
+        Maps the TokenIndex key of each pattern to the rows owning it.
+
+        Args:
+            row_patterns (list): Patterns of each row, or None if the row has none.
+
+        Returns:
+            dict: Row indices of each key. Patterns without any word are left out.
+        """
+        keys = {}
+        for row_index, patterns_of_row in enumerate(row_patterns):
+            for pattern in patterns_of_row or []:
+                key = token_key(pattern)
+                if key:
+                    keys.setdefault(key, set()).add(row_index)
+        return keys
+
+    @staticmethod
+    def _find_rows(text, automaton, owners, keys, lowercase=False):
+        """
+        Finds the rows with a pattern occurring in a text or a TokenIndex.
+
+        Args:
+            text (str or TokenIndex): The text, or the index of its words.
+            automaton (AhoCorasick): Automaton of the patterns, for texts.
+            owners (list): Row index owning each pattern of the automaton.
+            keys (dict): Row indices of each TokenIndex key, for indexes.
+            lowercase (bool, optional): Whether to lowercase a text. Defaults to False.
+
+        Returns:
+            set: Indices of the matching rows.
+        """
+        if isinstance(text, TokenIndex):
+            rows = set()
+            for key, key_rows in keys.items():
+                if key in text:
+                    rows |= key_rows
+            return rows
+        return {owners[i] for i in automaton.find(text.lower() if lowercase else text)}
+
+    @classmethod
+    def from_dataframe(cls, df, policy=MATCH_AR_AND_EN, separator=",", exclude_ids=(), missing_ar="-"):
+        """
+        Compiles a dictionary DataFrame with 'ID', 'ar' and 'en' columns.
+
+        Args:
+            df (pd.DataFrame): The dictionary of patterns and IDs.
+            policy (str, optional): How Arabic and English matches are combined. Defaults to MATCH_AR_AND_EN.
+            separator (str, optional): Separator between the alternatives of a pattern cell. Defaults to ",".
+            exclude_ids (iterable, optional): IDs that are never reported. Defaults to ().
+            missing_ar (str, optional): Cell value marking a row without Arabic patterns. Defaults to "-".
+
+        Returns:
+            DictionaryMatcher: The compiled dictionary.
+        """
+        df = df[~df['ID'].isin(list(exclude_ids))]
+        ar_patterns, en_patterns = split_patterns(df, separator, missing_ar,
+                                                  uses_ar=policy != MATCH_EN, uses_en=policy != MATCH_AR)
+        return cls(df['ID'].tolist(), ar_patterns, en_patterns, policy)
+
+    def match_rows(self, ar_text="", en_text=""):
+        """
+        Finds the dictionary rows matching a hadith.
+
+        Args:
+            ar_text (str or TokenIndex, optional): The preprocessed Arabic text of the hadith,
+                or its TokenIndex. Defaults to "".
+            en_text (str or TokenIndex, optional): The preprocessed English text of the hadith,
+                or its lowercased TokenIndex. Defaults to "".
+
+        Returns:
+            list: Indices of the matching rows, in dictionary order.
+        """
+        ar_rows = set()
+        en_rows = set()
+        if self.policy != MATCH_EN:
+            ar_rows = self._find_rows(ar_text, self.ar_automaton, self.ar_owners, self.ar_keys)
+        if self.policy != MATCH_AR:
+            en_rows = self._find_rows(en_text, self.en_automaton, self.en_owners, self.en_keys, lowercase=True)
+
+        if self.policy == MATCH_AR_AND_EN:
+            rows = ar_rows & en_rows
+        elif self.policy == MATCH_AR_OR_EN:
+            rows = ar_rows | en_rows
+        elif self.policy == MATCH_AR:
+            rows = ar_rows
+        else:
+            rows = en_rows
+        return sorted(rows)
+
+    @timed(DICTIONARY_MATCHING)
+    def match(self, ar_text="", en_text=""):
+        """
+        Finds the IDs of the dictionary entries mentioned in a hadith.
+
+        Args:
+            ar_text (str or TokenIndex, optional): The preprocessed Arabic text of the hadith,
+                or its TokenIndex. Defaults to "".
+            en_text (str or TokenIndex, optional): The preprocessed English text of the hadith,
+                or its lowercased TokenIndex. Defaults to "".
+
+        Returns:
+            list: IDs of the matching rows, in dictionary order.
+        """
+        return [self.ids[row] for row in self.match_rows(ar_text, en_text)]
+
+
+class CompiledDictionary:
+    """
+    Entity dictionary read from dictionaries/ with its patterns split and normalized once.
+
+    A dictionary holds the IDs and patterns of its rows and the match policy of each
+    collection, e.g. the prophets are matched on Arabic and English in "sb" and on Arabic
+    only elsewhere. The compiled matchers are pickled by load_dictionary, so later runs
+    skip reading the spreadsheets and building the automata.
+    """
+
+    def __init__(self, ids, ar_patterns, en_patterns, policy=MATCH_AR_AND_EN, exclude_ids=(),
+                 collection_policies=None):
+        """
+        Args:
+            ids (list): The ID of each dictionary row.
+            ar_patterns (list): Normalized Arabic patterns of each row, or None if the row has none.
+            en_patterns (list): Lowercased English patterns of each row, or None if the row has none.
+            policy (str, optional): Match policy of the collections without their own. Defaults to MATCH_AR_AND_EN.
+            exclude_ids (iterable, optional): IDs never reported under policy. Defaults to ().
+            collection_policies (dict, optional): (policy, exclude_ids) of the collections matched
+                differently. Defaults to None.
+        """
+        self.ids = list(ids)
+        self.ar_patterns = ar_patterns
+        self.en_patterns = en_patterns
+        self.rules = {None: (policy, tuple(exclude_ids))}
+        for collection, (collection_policy, collection_exclude_ids) in (collection_policies or {}).items():
+            self.rules[collection] = (collection_policy, tuple(collection_exclude_ids))
+        self.matchers = {collection: self._compile(*rule) for collection, rule in self.rules.items()}
+
+    def _compile(self, policy, exclude_ids):
+        """
+        Builds the matcher of a match policy.
+
+        Args:
+            policy (str): How Arabic and English matches are combined.
+            exclude_ids (tuple): IDs that are never reported.
+
+        Returns:
+            DictionaryMatcher: The matcher.
+        """
+        rows = [row for row, entity_id in enumerate(self.ids) if entity_id not in exclude_ids]
+        uses_ar = policy != MATCH_EN
+        uses_en = policy != MATCH_AR
+        return DictionaryMatcher([self.ids[row] for row in rows],
+                                 [self.ar_patterns[row] if uses_ar else None for row in rows],
+                                 [self.en_patterns[row] if uses_en else None for row in rows],
+                                 policy)
+
+    @classmethod
+    def from_dataframe(cls, df, policy=MATCH_AR_AND_EN, separator=",", exclude_ids=(), collection_policies=None,
+                       missing_ar="-"):
+        """
+        Compiles a dictionary DataFrame with 'ID', 'ar' and 'en' columns.
+
+        Args:
+            df (pd.DataFrame): The dictionary of patterns and IDs.
+            policy (str, optional): Match policy of the collections without their own. Defaults to MATCH_AR_AND_EN.
+            separator (str, optional): Separator between the alternatives of a pattern cell. Defaults to ",".
+            exclude_ids (iterable, optional): IDs never reported under policy. Defaults to ().
+            collection_policies (dict, optional): (policy, exclude_ids) of the collections matched
+                differently. Defaults to None.
+            missing_ar (str, optional): Cell value marking a row without Arabic patterns. Defaults to "-".
+
+        Returns:
+            CompiledDictionary: The compiled dictionary.
+        """
+        policies = {policy} | {rule[0] for rule in (collection_policies or {}).values()}
+        ar_patterns, en_patterns = split_patterns(df, separator, missing_ar,
+                                                  uses_ar=policies != {MATCH_EN}, uses_en=policies != {MATCH_AR})
+        return cls(df['ID'].tolist(), ar_patterns, en_patterns, policy, exclude_ids, collection_policies)
+
+    def matcher(self, collection=None):
+        """
+        Returns the matcher of a collection.
+
+        Args:
+            collection (str, optional): The collection name. Defaults to the default policy.
+
+        Returns:
+            DictionaryMatcher: The matcher applying the policy of the collection.
+        """
+        return self.matchers.get(collection, self.matchers[None])
+
+    def match(self, ar_text="", en_text="", collection=None):
+        """
+        Finds the IDs of the dictionary entries mentioned in a hadith.
+
+        Args:
+            ar_text (str or TokenIndex, optional): The preprocessed Arabic text of the hadith,
+                or its TokenIndex. Defaults to "".
+            en_text (str or TokenIndex, optional): The preprocessed English text of the hadith,
+                or its lowercased TokenIndex. Defaults to "".
+            collection (str, optional): The collection of the hadith. Defaults to the default policy.
+
+        Returns:
+            list: IDs of the matching rows, in dictionary order.
+        """
+        return self.matcher(collection).match(ar_text, en_text)
+
+
+# Function to read a dictionary spreadsheet
+def read_dictionary(file_path):
+    """
+    Reads a dictionary from an Excel or CSV file.
+
+    Args:
+        file_path (str): Path of the .xlsx or .csv file.
+
+    Returns:
+        pd.DataFrame: The dictionary.
+    """
+    if file_path.endswith(".csv"):
+        return pd.read_csv(file_path)
+    return pd.read_excel(file_path)
+
+
+def _dictionary_signature(file_paths, options):
+    """
+    Describes the source files and compile options of a dictionary so that a stale cache can be detected.
+
+    Args:
+        file_paths (list): Paths of the source files.
+        options (dict): Options the dictionary is compiled with.
+
+    Returns:
+        dict: Size and modification time of each source, the options and the cache version.
+    """
+    sources = []
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        sources.append([os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns])
+    return {"sources": sources, "options": options, "version": DICTIONARY_CACHE_VERSION}
+
+
+# Function to load a compiled dictionary
+@timed(SERIALIZATION)
+def load_dictionary(file_paths, policy=MATCH_AR_AND_EN, separator=",", exclude_ids=(), collection_policies=None,
+                    cache_dir=DICTIONARY_CACHE_DIR, refresh=False):
+    """
+    Loads a compiled dictionary from its pickle cache, compiling the source files on first use
+    or whenever a source file or an option has changed.
+
+    Args:
+        file_paths (str or list): Path of the .xlsx or .csv dictionary, or paths of dictionaries
+            concatenated in order.
+        policy (str, optional): Match policy of the collections without their own. Defaults to MATCH_AR_AND_EN.
+        separator (str, optional): Separator between the alternatives of a pattern cell. Defaults to ",".
+        exclude_ids (iterable, optional): IDs never reported under policy. Defaults to ().
+        collection_policies (dict, optional): (policy, exclude_ids) of the collections matched
+            differently. Defaults to None.
+        cache_dir (str, optional): Directory of the cache. Defaults to DICTIONARY_CACHE_DIR.
+        refresh (bool, optional): Recompile the dictionary even if the cache is up to date. Defaults to False.
+
+    Returns:
+        CompiledDictionary: The compiled dictionary.
+    """
+    if isinstance(file_paths, str):
+        file_paths = [file_paths]
+    options = {"policy": policy, "separator": separator, "exclude_ids": list(exclude_ids),
+               "collection_policies": {collection: [rule[0], list(rule[1])]
+                                       for collection, rule in (collection_policies or {}).items()}}
+    signature = _dictionary_signature(file_paths, options)
+    # One cache file per sources and options, named after the first source
+    name = os.path.splitext(os.path.basename(file_paths[0]))[0]
+    key = [[source[0] for source in signature["sources"]], options]
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    cache_path = os.path.join(cache_dir, f"{name}-{digest}.pkl")
+
+    if not refresh and os.path.exists(cache_path):
+        with open(cache_path, "rb") as file:
+            cached_signature, dictionary = pickle.load(file)
+        if cached_signature == signature:
+            return dictionary
+
+    df = pd.concat([read_dictionary(file_path) for file_path in file_paths], ignore_index=True)
+    dictionary = CompiledDictionary.from_dataframe(df, policy, separator, exclude_ids, collection_policies)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Written under a temporary name, so that pipeline workers never read a partial cache
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        pickle.dump((signature, dictionary), file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, cache_path)
+    return dictionary
@@ -0,0 +1,365 @@
+import argparse
+import os
+import time
+from array import array
+import numpy as np
+from tqdm import tqdm
+from generate_rdf import load_entity_table, join_entity_tables, LABEL_MAPPING
+from profiling import timed, SERIALIZATION
+from utility import arabic_to_int
+
+# Directory of the extractor outputs of each collection
+ENTITY_TABLES_DIR = "results/{collection}/identified_entities"
+
+# Path of the corpus-wide entity index
+ENTITY_INDEX_PATH = "results/entity_index.npz"
+
+# Entity tables indexed with the locations table, by name; tables missing from a collection are skipped
+ENTITY_TABLES = {
+    "angels": "angels.xlsx",
+    "prophets": "prophets.xlsx",
+    "clans": "clans.xlsx",
+    "crimes": "crimes.xlsx",
+    "holybooks": "holybooks.xlsx",
+    "afterlife": "afterlife.xlsx",
+    "pillarsofislam": "pillarsofislam.xlsx",
+    "caliphs": "caliphs.xlsx",
+    "plants": "plants.xlsx",
+    "animals": "animals.xlsx",
+    "concepts": "concepts.xlsx",
+    "ayat": "ayat.xlsx",
+}
+
+
+# Function to get the entity IDs of a hadith in an entity table
+def row_entities(name, values):
+    """
+    Converts the cells of a hadith in an entity table to entity IDs, named as in the RDF graph:
+    "Heaven" and "Hell" for the afterlife table and "CH002_V255" for ayat.
+
+    Args:
+        name (str): Name of the table, a key of ENTITY_TABLES or "locations".
+        values (list): Parsed cells of the hadith, one per entity column of the table.
+
+    Returns:
+        list: The entity IDs.
+    """
+    if name == "afterlife":
+        return [topic for topic, mentions in zip(["Heaven", "Hell"], values) if mentions]
+    if name == "ayat":
+        return [f"CH{chapter:03d}_V{verse:03d}" for chapter, verse in values[0]]
+    return [entity for entity in values[0] if entity is not None]
+
+
+class EntityIndex:
+    """
+    Inverted index from entity IDs to the hadith mentioning them, across collections.
+
+    Hadith are numbered collection by collection; the postings of each entity are a sorted
+    uint32 array of hadith numbers, stored back to back in a single array. Queries combine
+    postings with binary searches, which takes microseconds for typical entities.
+    """
+
+    def __init__(self, hadith_ids, collections, collection_starts, entity_ids, offsets, postings):
+        """
+        Args:
+            hadith_ids (np.ndarray): RDF ID of each hadith, e.g. "SB-HD0001".
+            collections (np.ndarray): The indexed collections.
+            collection_starts (np.ndarray): Number of the first hadith of each collection, followed by
+                the number of hadith.
+            entity_ids (np.ndarray): The indexed entity IDs.
+            offsets (np.ndarray): Start of the postings of each entity, followed by the number of postings.
+            postings (np.ndarray): The sorted hadith numbers of each entity, back to back (uint32).
+        """
+        self.hadith_ids = hadith_ids
+        self.collections = [str(collection) for collection in collections]
+        self.collection_starts = collection_starts
+        self.entity_ids = entity_ids
+        self.offsets = offsets
+        self.postings_array = postings
+        self.entity_rows = {str(entity): row for row, entity in enumerate(entity_ids)}
+
+    def __len__(self):
+        return len(self.hadith_ids)
+
+    def __contains__(self, entity):
+        return entity in self.entity_rows
+
+    def postings(self, entity):
+        """
+        Returns the hadith mentioning an entity.
+
+        Args:
+            entity (str): The entity ID, e.g. "Musa".
+
+        Returns:
+            np.ndarray: Sorted hadith numbers (uint32), empty for an unknown entity.
+        """
+        row = self.entity_rows.get(entity)
+        if row is None:
+            return self.postings_array[:0]
+        return self.postings_array[self.offsets[row]:self.offsets[row + 1]]
+
+    def restrict_to_collections(self, hadith, collections):
+        """
+        Keeps the hadith of some collections.
+
+        Args:
+            hadith (np.ndarray): Sorted hadith numbers, or None for all hadith.
+            collections (list): Collection names; collections that are not indexed have no hadith.
+
+        Returns:
+            np.ndarray: The sorted hadith numbers belonging to the collections (uint32).
+        """
+        parts = []
+        positions = {self.collections.index(collection) for collection in collections if collection in self.collections}
+        for position in sorted(positions):
+            start, end = self.collection_starts[position], self.collection_starts[position + 1]
+            if hadith is None:
+                parts.append(np.arange(start, end, dtype=np.uint32))
+            else:
+                # Hadith are numbered collection by collection, so each collection is a slice
+                parts.append(hadith[np.searchsorted(hadith, start):np.searchsorted(hadith, end)])
+        return np.concatenate(parts) if parts else self.postings_array[:0]
+
+    def query(self, all_of=(), any_of=(), none_of=(), collections=None):
+        """
+        Finds the hadith mentioning all the entities of all_of (AND), at least one entity of any_of
+        (OR) and none of the entities of none_of (NOT).
+
+        Args:
+            all_of (iterable, optional): Entities that must all be mentioned. Defaults to ().
+            any_of (iterable, optional): Entities of which at least one must be mentioned. Defaults to ().
+            none_of (iterable, optional): Entities that must not be mentioned. Defaults to ().
+            collections (list, optional): Collections searched. Defaults to all indexed collections.
+
+        Returns:
+            np.ndarray: Sorted numbers of the matching hadith (uint32), see get_hadith_ids.
+        """
+        # Intersect the shortest postings first, so that the candidates only shrink
+        candidates = None
+        for postings in sorted((self.postings(entity) for entity in all_of), key=len):
+            candidates = postings if candidates is None else intersect_postings(candidates, postings)
+        any_of = list(any_of)
+        if any_of:
+            union = union_postings([self.postings(entity) for entity in any_of])
+            candidates = union if candidates is None else intersect_postings(candidates, union)
+        if collections is not None:
+            candidates = self.restrict_to_collections(candidates, collections)
+        if candidates is None:
+            candidates = np.arange(len(self), dtype=np.uint32)
+        for entity in none_of:
+            candidates = subtract_postings(candidates, self.postings(entity))
+        return candidates
+
+    def get_hadith_ids(self, hadith):
+        """
+        Converts hadith numbers to RDF hadith IDs.
+
+        Args:
+            hadith (np.ndarray): Hadith numbers, as returned by query.
+
+        Returns:
+            list: The hadith IDs, e.g. ["SB-HD0001", "IM-HD0042"].
+        """
+        return self.hadith_ids[hadith].tolist()
+
+    def save(self, file_path=ENTITY_INDEX_PATH):
+        """
+        Saves the index as a NumPy .npz archive.
+
+        Args:
+            file_path (str, optional): Path of the archive. Defaults to ENTITY_INDEX_PATH.
+        """
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(file_path, hadith_ids=self.hadith_ids, collections=np.array(self.collections),
+                            collection_starts=self.collection_starts, entity_ids=self.entity_ids,
+                            offsets=self.offsets, postings=self.postings_array)
+        print(f"Results saved to {file_path}")
+
+    @classmethod
+    @timed(SERIALIZATION)
+    def load(cls, file_path=ENTITY_INDEX_PATH):
+        """
+        Loads an index saved with save.
+
+        Args:
+            file_path (str, optional): Path of the archive. Defaults to ENTITY_INDEX_PATH.
+
+        Returns:
+            EntityIndex: The index.
+        """
+        with np.load(file_path) as archive:
+            return cls(archive["hadith_ids"], archive["collections"], archive["collection_starts"],
+                       archive["entity_ids"], archive["offsets"], archive["postings"])
+
+
+# Functions to combine sorted postings
+def intersect_postings(postings, other):
+    """
+    Returns the hadith in both postings, with a binary search of each hadith of the first.
+
+    Args:
+        postings (np.ndarray): Sorted hadith numbers, ideally the shorter postings.
+        other (np.ndarray): Sorted hadith numbers.
+
+    Returns:
+        np.ndarray: The sorted hadith numbers in both.
+    """
+    if not len(postings) or not len(other):
+        return postings[:0]
+    positions = np.searchsorted(other, postings)
+    positions[positions == len(other)] = 0
+    return postings[other[positions] == postings]
+
+
+def subtract_postings(postings, other):
+    """
+    Returns the hadith of the first postings that are not in the second.
+
+    Args:
+        postings (np.ndarray): Sorted hadith numbers.
+        other (np.ndarray): Sorted hadith numbers to remove.
+
+    Returns:
+        np.ndarray: The sorted remaining hadith numbers.
+    """
+    if not len(postings) or not len(other):
+        return postings
+    positions = np.searchsorted(other, postings)
+    positions[positions == len(other)] = 0
+    return postings[other[positions] != postings]
+
+
+def union_postings(postings_list):
+    """
+    Returns the hadith in any of the postings.
+
+    Args:
+        postings_list (list): Sorted hadith numbers of each entity.
+
+    Returns:
+        np.ndarray: The sorted hadith numbers in at least one of the postings.
+    """
+    if len(postings_list) == 1:
+        return postings_list[0]
+    return np.unique(np.concatenate(postings_list)).astype(np.uint32, copy=False)
+
+
+# Function to build the entity index from the extractor outputs
+def build_entity_index(collections=tuple(LABEL_MAPPING), tables_dir=ENTITY_TABLES_DIR):
+    """
+    Builds the entity index of collections from the entity tables written by the extractors.
+
+    The hadith of a collection are the rows of its locations table, with the IDs used by
+    generate_rdf; the other tables are joined on them.
+
+    Args:
+        collections (list, optional): Collection names. Defaults to the collections of LABEL_MAPPING.
+        tables_dir (str, optional): Directory pattern of the entity tables. Defaults to ENTITY_TABLES_DIR.
+
+    Returns:
+        EntityIndex: The index.
+    """
+    hadith_ids = []
+    indexed_collections = []
+    collection_starts = []
+    postings = {}
+
+    for collection in tqdm(collections, desc="Indexing collections"):
+        directory = tables_dir.format(collection=collection)
+        locations_path = os.path.join(directory, "locations.xlsx")
+        if not os.path.exists(locations_path):
+            print(f"Skipping {collection}: {locations_path} not found")
+            continue
+        base_table = load_entity_table(locations_path)
+        tables = {name: load_entity_table(os.path.join(directory, file))
+                  for name, file in ENTITY_TABLES.items() if os.path.exists(os.path.join(directory, file))}
+        joined = join_entity_tables(base_table, tables)
+        joined["locations"] = {"locations": base_table["locations"].tolist()}
+
+        label = LABEL_MAPPING.get(collection, "SB")
+        indexed_collections.append(collection)
+        collection_starts.append(len(hadith_ids))
+        for row, (hadith_number, _) in enumerate(base_table.index):
+            # Hadith whose number cannot be read are left out, as in the RDF graph
+            if label == "JT":
+                hadith_number = arabic_to_int(hadith_number)
+                if hadith_number == -1:
+                    continue
+            hadith = len(hadith_ids)
+            hadith_ids.append(f"{label}-HD{hadith_number:04d}")
+
+            entities = set()
+            for name, columns in joined.items():
+                entities.update(row_entities(name, [values[row] for values in columns.values()]))
+            # Hadith are numbered in increasing order, so every postings array stays sorted
+            for entity in entities:
+                postings.setdefault(entity, array("I")).append(hadith)
+
+    collection_starts.append(len(hadith_ids))
+    entity_ids = sorted(postings)
+    lengths = [len(postings[entity]) for entity in entity_ids]
+    offsets = np.zeros(len(entity_ids) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    postings_array = np.frombuffer(b"".join(postings[entity].tobytes() for entity in entity_ids), dtype=np.uint32)
+    return EntityIndex(np.array(hadith_ids, dtype=str), np.array(indexed_collections, dtype=str),
+                       np.array(collection_starts, dtype=np.int64), np.array(entity_ids, dtype=str),
+                       offsets, postings_array)
+
+
+# Function to parse the command line of the entity index
+def parse_entity_index_arguments(argv=None):
+    """
+    Parses the command line options of the entity index.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Build and query the entity index of hadith collections.")
+    parser.add_argument("--build", action="store_true",
+                        help="(re)build the index from the entity tables (default: only when it is missing)")
+    parser.add_argument("--index-path", default=ENTITY_INDEX_PATH,
+                        help="path of the index (default: %(default)s)")
+    parser.add_argument("--index-collections", nargs="+", default=None,
+                        help="collections to index when building the index (default: all)")
+    parser.add_argument("--collections", nargs="+", default=None,
+                        help="collections to search when querying (default: all indexed collections)")
+    parser.add_argument("--all", nargs="+", default=[], dest="all_of", metavar="ENTITY",
+                        help="entities that must all be mentioned (AND)")
+    parser.add_argument("--any", nargs="+", default=[], dest="any_of", metavar="ENTITY",
+                        help="entities of which at least one must be mentioned (OR)")
+    parser.add_argument("--none", nargs="+", default=[], dest="none_of", metavar="ENTITY",
+                        help="entities that must not be mentioned (NOT)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_entity_index_arguments(argv)
+    if args.build or not os.path.exists(args.index_path):
+        build_entity_index(args.index_collections or tuple(LABEL_MAPPING)).save(args.index_path)
+        if not (args.all_of or args.any_of or args.none_of):
+            return
+    index = EntityIndex.load(args.index_path)
+    for entity in args.all_of + args.any_of + args.none_of:
+        if entity not in index:
+            print(f"Unknown entity: {entity}")
+    for collection in args.collections or []:
+        if collection not in index.collections:
+            print(f"Unknown collection: {collection} (indexed: {', '.join(index.collections)})")
+
+    start = time.perf_counter()
+    hadith = index.query(args.all_of, args.any_of, args.none_of, args.collections)
+    elapsed = time.perf_counter() - start
+    for hadith_id in index.get_hadith_ids(hadith):
+        print(hadith_id)
+    print(f"{len(hadith)} hadith found in {elapsed * 1e6:.0f} µs")
+
+
+if __name__ == '__main__':
+    main()
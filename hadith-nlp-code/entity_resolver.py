@@ -0,0 +1,89 @@
+from functools import lru_cache
+import pandas as pd
+from dictionary_matcher import AhoCorasick
+
+# Number of distinct surface forms remembered by each resolver
+DEFAULT_MEMO_SIZE = 4096
+
+
+class EntityIdResolver:
+    """
+    Resolves NER surface forms to dictionary IDs using an alternatives dictionary.
+
+    An entity resolves to the first dictionary row (in file order) with an alternative
+    contained in the entity. The dictionary is loaded once and indexed with an exact-match
+    table of the alternatives plus a substring automaton, and results are memoized for
+    repeated surface forms.
+    """
+
+    def __init__(self, df, id_column="id", alternatives_column="alternatives", separator="-",
+                 memo_size=DEFAULT_MEMO_SIZE):
+        """
+        Args:
+            df (pd.DataFrame): The dictionary of IDs and alternatives.
+            id_column (str, optional): Column holding the IDs. Defaults to "id".
+            alternatives_column (str, optional): Column holding the alternatives. Defaults to "alternatives".
+            separator (str, optional): Separator between alternatives. Defaults to "-".
+            memo_size (int, optional): Number of resolved surface forms to memoize. Defaults to DEFAULT_MEMO_SIZE.
+        """
+        self.ids = df[id_column].tolist()
+
+        # Flatten the alternatives, remembering the row owning each of them
+        alternatives = []
+        self.owners = []
+        for row_index, cell in enumerate(df[alternatives_column]):
+            for alternative in cell.split(separator):
+                alternatives.append(alternative)
+                self.owners.append(row_index)
+        self.automaton = AhoCorasick(alternatives)
+
+        # Exact-match index answering entities that are themselves an alternative
+        self.exact = {}
+        for alternative in alternatives:
+            if alternative not in self.exact:
+                self.exact[alternative] = self._scan(alternative)
+
+        self.resolve = lru_cache(maxsize=memo_size)(self._resolve)
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        """
+        Loads an alternatives dictionary from a CSV file.
+
+        Args:
+            path (str): Path of the CSV file.
+            **kwargs: Additional arguments passed to the constructor.
+
+        Returns:
+            EntityIdResolver: The resolver of the dictionary.
+        """
+        return cls(pd.read_csv(path), **kwargs)
+
+    def _scan(self, name):
+        """
+        Resolves a name with a single pass of the substring automaton.
+
+        Args:
+            name (str): The surface form to resolve.
+
+        Returns:
+            The ID of the first row with an alternative contained in the name, or None.
+        """
+        matched = self.automaton.find(name)
+        if not matched:
+            return None
+        return self.ids[min(self.owners[i] for i in matched)]
+
+    def _resolve(self, name):
+        """
+        Resolves a name, trying the exact-match index before the automaton.
+
+        Args:
+            name (str): The surface form to resolve.
+
+        Returns:
+            The ID of the matching dictionary row, or None if there is none.
+        """
+        if name in self.exact:
+            return self.exact[name]
+        return self._scan(name)
@@ -1,5 +1,101 @@
+import argparse
+import ast
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import pandas as pd
 from tqdm import tqdm
+from profiling import timed, SERIALIZATION
+from rdf_writer import RDF_FORMATS, open_rdf_writer
+from utility import arabic_to_int
+
+# Label of the hadith IDs of each collection
+LABEL_MAPPING = {"sb": "SB", "maj": "IM", "ms": "SM", "nis": "SN", "tir": "JT", "sad": "SD"}
+
+# Columns of mukarrat_similarity.csv holding lists of similar hadith
+SIMILARITY_LIST_COLUMNS = ['ar_0.9', 'ar_0.8', 'ar_0.7', 'ar_rest']
+
+
+# Entity table loading
+@lru_cache(maxsize=None)
+def parse_entity_cell(cell):
+    """
+    Parses a list, set or tuple written as text in an entity table, e.g. "['Adam']", "{1, 2}" or "set()".
+
+    Cells are parsed as literals only, and each distinct text is parsed once. The parsed values
+    are shared between cells and must not be modified.
+
+    Args:
+        cell (str): The text of the cell.
+
+    Returns:
+        list, set or tuple: The parsed value; an empty list for empty cells.
+    """
+    if not isinstance(cell, str):
+        return []
+    if cell == "set()":
+        return set()
+    return ast.literal_eval(cell)
+
+
+@timed(SERIALIZATION)
+def load_entity_table(file_path):
+    """
+    Loads an entity table, parsing its entity columns and keying its rows on the hadith number
+    and the occurrence of the number (hadith numbers are not unique in every collection).
+
+    Args:
+        file_path (str): Path of the xlsx file written by an extractor.
+
+    Returns:
+        pd.DataFrame: The parsed entity columns, indexed by (hadith_number, occurrence).
+    """
+    table = pd.read_excel(file_path)
+    for column in table.columns[1:]:
+        table[column] = table[column].map(parse_entity_cell)
+    table["occurrence"] = table.groupby("hadith_number").cumcount()
+    return table.set_index(["hadith_number", "occurrence"])
+
+
+def join_entity_tables(base_table, tables):
+    """
+    Joins entity tables on the (hadith_number, occurrence) key of a base table.
+
+    Args:
+        base_table (pd.DataFrame): Table whose rows define the hadith, as returned by load_entity_table.
+        tables (dict): Tables to join, by name.
+
+    Returns:
+        dict: Column values of each table aligned with the rows of the base table, by name;
+            hadith missing from a table get empty lists.
+    """
+    joined = {}
+    for name, table in tables.items():
+        aligned = table.reindex(base_table.index)
+        joined[name] = {column: [value if isinstance(value, (list, set, tuple)) else [] for value in aligned[column]]
+                        for column in aligned.columns}
+    return joined
+
+
+@timed(SERIALIZATION)
+def load_similarity_table(file_path, row_count):
+    """
+    Loads mukarrat_similarity.csv, whose hadith_number column holds the row number of the hadith.
+
+    Args:
+        file_path (str): Path of the CSV file.
+        row_count (int): Number of hadith rows to align the table with.
+
+    Returns:
+        list: Parsed similarity lists of each row, as dicts keyed by SIMILARITY_LIST_COLUMNS.
+    """
+    table = pd.read_csv(file_path)
+    for column in SIMILARITY_LIST_COLUMNS:
+        table[column] = table[column].map(parse_entity_cell)
+    table = table.set_index("hadith_number").reindex(range(1, row_count + 1))
+    return [{column: value if isinstance(value, list) else [] for column, value in zip(SIMILARITY_LIST_COLUMNS, values)}
+            for values in table[SIMILARITY_LIST_COLUMNS].itertuples(index=False, name=None)]
+
 
 # Utility functions
 def append_ttl_string(hid, items, ttl_strings, objprop="containsMentionOf"):
@@ -63,21 +159,8 @@ def append_ayat_ttl(hid, ayat_list, ttl_strings):
     return ttl_strings
 
 
-def arabic_to_int(arabic_numeral):
-    """
-    Converts Eastern Arabic numerals to integers.
-
-    Args:
-        arabic_numeral (str): The Arabic numeral string.
-
-    Returns:
-        int: The integer equivalent.
-    """
-    numeral_dict = {'۰': 0, '۱': 1, '۲': 2, '۳': 3, '۴': 4, '۵': 5, '۶': 6, '۷': 7, '۸': 8, '۹': 9}
-    if any(ch in arabic_numeral for ch in ['م', 'b', 'm']):
-        return -1
-    arabic_numeral = arabic_numeral[1:-1]
-    return int(''.join(str(numeral_dict[ch]) for ch in arabic_numeral))
+def _as_list(value):
+    return parse_entity_cell(value) if isinstance(value, str) else value
 
 
 def append_similarity_ttl(hid, row, ttl_strings, label):
@@ -86,15 +169,15 @@ def append_similarity_ttl(hid, row, ttl_strings, label):
 
     Args:
         hid (str): Hadith ID.
-        row (pd.Series): Row containing similarity data.
+        row (dict or pd.Series): Row containing similarity data, parsed or as text.
         ttl_strings (list): Existing TTL strings to append to.
         label (str): Label prefix for Hadith IDs.
 
     Returns:
         list: Updated TTL strings.
     """
-    strong = eval(row['ar_0.9'])
-    similar = eval(row['ar_0.8']) + eval(row['ar_0.7']) + eval(row['ar_rest'])
+    strong = _as_list(row['ar_0.9'])
+    similar = _as_list(row['ar_0.8']) + _as_list(row['ar_0.7']) + _as_list(row['ar_rest'])
 
     if strong:
         strong_ids = [f":{label}-HD{hnum:04d}" for hnum in strong if f":{label}-HD{hnum:04d}" != hid]
@@ -108,28 +191,30 @@ def append_similarity_ttl(hid, row, ttl_strings, label):
     return ttl_strings
 
 # Main turtling functions
-def turtlfy_collection(collection="sb", save_path="results/ttl"):
+def turtlfy_collection(collection="sb", save_path="results/ttl", compress=False, output_format="ttl",
+                       shard_size=None):
     """
     Converts a Hadith collection into TTL format.
 
     Args:
         collection (str): The collection name (e.g., "sb", "maj").
         save_path (str): Path to save the TTL file.
+        compress (bool, optional): Whether to write a gzip-compressed .ttl.gz file. Defaults to False.
+        output_format (str, optional): "ttl" for Turtle, "nt" for N-Triples or "npz" for a binary
+            triple dump. Defaults to "ttl".
+        shard_size (int, optional): Maximum number of triples per N-Triples file. Defaults to a single file.
 
     Returns:
         None
     """
-    label_mapping = {"sb": "SB", "maj": "IM", "ms": "SM", "nis": "SN", "tir": "JT", "sad": "SD"}
-    label = label_mapping.get(collection, "SB")
-    df = pd.read_excel(f"results/{collection}/identified_entities/locations.xlsx")
+    label = LABEL_MAPPING.get(collection, "SB")
+    df = load_entity_table(f"results/{collection}/identified_entities/locations.xlsx")
 
-    ttl_strings = []
     prefixes = """@base <http://semantichadith.com/ontology> .
 @prefix : <http://www.semantichadith.com/ontology/> .
 @prefix owl: <http://www.w3.org/2002/07/owl#> .
 @prefix qur: <http://quranontology.com/Resource/> .
 @prefix wiki: <https://www.wikidata.org/wiki/> ."""
-    ttl_strings.append(prefixes)
 
     additional_files = {
         "angels": "angels.xlsx",
@@ -147,37 +232,102 @@ def turtlfy_collection(collection="sb", save_path="results/ttl"):
         "similarity": "mukarrat_similarity.csv"
     }
 
-    # Load additional data
-    additional_data = {key: pd.read_excel(f"results/{collection}/identified_entities/{file}")
-                       for key, file in additional_files.items() if file.endswith('.xlsx')}
-    additional_data["similarity"] = pd.read_csv(f"results/{collection}/mukarrat_similarity.csv")
+    # Load additional data, parsed once and joined on the hadith of the locations table
+    tables = {key: load_entity_table(f"results/{collection}/identified_entities/{file}")
+              for key, file in additional_files.items() if file.endswith('.xlsx')}
+    additional_data = join_entity_tables(df, tables)
+    similarity_rows = load_similarity_table(f"results/{collection}/mukarrat_similarity.csv", len(df))
+    locations = df['locations'].tolist()
+    heaven_column, hell_column = tables["afterlife"].columns[:2]
 
-    with tqdm(total=len(df), desc=f"Generating TTL for {label}") as pbar:
-        for index, row in df.iterrows():
-            hnum = row['hadith_number']
-            if label == "JT":
-                hnum = arabic_to_int(hnum)
-                if hnum == -1:
-                    continue
-            hid = f"{label}-HD{hnum:04d}"
+    # Statements are written as each hadith is processed instead of being joined at the end
+    with open_rdf_writer(f"{save_path}/{label}", output_format, compress, shard_size) as ttl_strings:
+        ttl_strings.append(prefixes)
 
-            location = eval(row['locations'])
-            ttl_strings = append_ttl_string(hid, location, ttl_strings)
+        with tqdm(total=len(df), desc=f"Generating TTL for {label}") as pbar:
+            for index, (hnum, _) in enumerate(df.index):
+                if label == "JT":
+                    hnum = arabic_to_int(hnum)
+                    if hnum == -1:
+                        continue
+                hid = f"{label}-HD{hnum:04d}"
 
-            for key, data in additional_data.items():
-                if key in ["similarity"]:
-                    ttl_strings = append_similarity_ttl(hid, data.iloc[index], ttl_strings, label)
-                else:
-                    entities = eval(data.iloc[index, 1])
-                    ttl_strings = append_ttl_string(hid, entities, ttl_strings, objprop="discussesTopic" if key in ["crimes", "concepts"] else "containsMentionOf")
+                ttl_strings = append_ttl_string(hid, locations[index], ttl_strings)
 
-            ttl_strings = append_afterlife_ttl(hid, eval(additional_data["afterlife"].iloc[index, 1]), eval(additional_data["afterlife"].iloc[index, 2]), ttl_strings)
-            ttl_strings = append_ayat_ttl(hid, eval(additional_data["ayat"].iloc[index, 1]), ttl_strings)
+                for key in additional_files:
+                    if key in ["similarity"]:
+                        ttl_strings = append_similarity_ttl(hid, similarity_rows[index], ttl_strings, label)
+                    else:
+                        entities = additional_data[key][tables[key].columns[0]][index]
+                        ttl_strings = append_ttl_string(hid, entities, ttl_strings, objprop="discussesTopic" if key in ["crimes", "concepts"] else "containsMentionOf")
 
-            pbar.update(1)
+                ttl_strings = append_afterlife_ttl(hid, additional_data["afterlife"][heaven_column][index], additional_data["afterlife"][hell_column][index], ttl_strings)
+                ttl_strings = append_ayat_ttl(hid, additional_data["ayat"][tables["ayat"].columns[0]][index], ttl_strings)
 
-    with open(f"{save_path}/{label}.ttl", 'w') as file:
-        file.write('\n\n'.join(ttl_strings))
+                pbar.update(1)
 
 
-#turtlfy_mapping_hadith_book_topic_qur()
\ No newline at end of file
+#turtlfy_mapping_hadith_book_topic_qur()
+
+
+# Function to convert several collections in parallel
+def turtlfy_collections(collections=tuple(LABEL_MAPPING), save_path="results/ttl", compress=False,
+                        output_format="ttl", shard_size=None, workers=os.cpu_count()):
+    """
+    Converts Hadith collections on a pool of worker processes, one collection per task.
+
+    Args:
+        collections (list, optional): Collection names. Defaults to the collections of LABEL_MAPPING.
+        save_path (str, optional): Path to save the output files. Defaults to "results/ttl".
+        compress (bool, optional): Whether to compress the output files. Defaults to False.
+        output_format (str, optional): "ttl", "nt" or "npz". Defaults to "ttl".
+        shard_size (int, optional): Maximum number of triples per N-Triples file. Defaults to a single file.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        None
+    """
+    os.makedirs(save_path, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(turtlfy_collection, collection, save_path, compress, output_format, shard_size)
+                   for collection in collections]
+        for future in futures:
+            future.result()
+    print(f"Results saved to {save_path}")
+
+
+# Function to parse the command line of the RDF generation
+def parse_rdf_arguments(argv=None):
+    """
+    Parses the command line options of the RDF generation.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Generate the RDF of hadith collections.")
+    parser.add_argument("--collections", nargs="+", default=list(LABEL_MAPPING),
+                        help="collections to convert (default: %(default)s)")
+    parser.add_argument("--save-path", default="results/ttl",
+                        help="output directory (default: %(default)s)")
+    parser.add_argument("--format", dest="output_format", choices=sorted(RDF_FORMATS), default="ttl",
+                        help="output format: Turtle, N-Triples or binary triples (default: %(default)s)")
+    parser.add_argument("--shard-size", type=int, default=None,
+                        help="maximum number of triples per N-Triples file (default: one file per collection)")
+    parser.add_argument("--compress", action="store_true",
+                        help="gzip the Turtle and N-Triples files, or compress the binary dump")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of collections converted in parallel (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_rdf_arguments(argv)
+    turtlfy_collections(args.collections, args.save_path, args.compress, args.output_format,
+                        args.shard_size, args.workers)
+
+
+if __name__ == '__main__':
+    main()
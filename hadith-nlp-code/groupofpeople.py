@@ -1,7 +1,10 @@
+from functools import lru_cache
 import pandas as pd
 from tqdm import tqdm
-from pyarabic.araby import strip_tashkeel
+from normalization import strip_tashkeel
+from dictionary_matcher import DictionaryMatcher, load_dictionary, MATCH_AR_AND_EN
 from utility import tarabic_name, hadith_number_name, strip_punctuation, english_name
+from profiling import timed, NORMALIZATION, SERIALIZATION
 
 # File paths for clan dictionaries
 CLAN_DICTIONARY_PATHS = [
@@ -9,44 +12,44 @@ CLAN_DICTIONARY_PATHS = [
     'dictionaries/new-group-of-people.xlsx',
 ]
 
-# Load clan dictionaries into DataFrames
-clan_dictionaries = [pd.read_excel(path) for path in CLAN_DICTIONARY_PATHS]
 
+# Function to load the compiled dictionary of clans on first use
+@lru_cache(maxsize=None)
+def get_clans_dictionary():
+    """
+    Loads the compiled dictionary of clans once per process, so that importing the module reads no file.
+
+    Returns:
+        CompiledDictionary: The clans dictionary.
+    """
+    return load_dictionary(CLAN_DICTIONARY_PATHS, policy=MATCH_AR_AND_EN)
 
-def find_clans_in_one_hadith(ar_text, en_text, dfs):
+
+def find_clans_in_one_hadith(ar_text, en_text, dfs=None):
     """
     Identifies clans mentioned in a single hadith using Arabic and English patterns.
 
     Args:
         ar_text (str): The Arabic text of the hadith.
         en_text (str): The English translation of the hadith.
-        dfs (list of pd.DataFrame): List of DataFrames containing clan patterns and IDs.
+        dfs (list of pd.DataFrame, optional): List of DataFrames containing clan patterns and IDs.
+            Defaults to the compiled clan dictionaries.
 
     Returns:
         list: A list of IDs corresponding to clans mentioned in the hadith.
     """
     # Preprocess Arabic text
-    ar_text = strip_punctuation(ar_text)
-    ar_text = strip_tashkeel(ar_text)
-
-    clan_list = []
-
-    # Iterate through each clan dictionary
-    for df in dfs:
-        for _, row in df.iterrows():
-            # Extract patterns from the dictionary
-            ar_patterns = strip_tashkeel(row['ar']).split(',')
-            en_patterns = row['en'].split(',')
-
-            # Check for matches in both Arabic and English texts
-            is_match_ar = any(pattern in ar_text for pattern in ar_patterns)
-            is_match_en = any(pattern.lower() in en_text.lower() for pattern in en_patterns)
+    with timed(NORMALIZATION):
+        ar_text = strip_punctuation(ar_text)
+        ar_text = strip_tashkeel(ar_text)
 
-            # Append ID if both Arabic and English patterns match
-            if is_match_ar and is_match_en:
-                clan_list.append(row['ID'])
+    if dfs is None:
+        matcher = get_clans_dictionary().matcher()
+    else:
+        matcher = DictionaryMatcher.from_dataframe(pd.concat(dfs, ignore_index=True), policy=MATCH_AR_AND_EN)
 
-    return clan_list
+    # Both the Arabic and the English patterns must match
+    return matcher.match(ar_text, en_text)
 
 
 def find_clans_mentioned_in_all_hadith(hadith_df, save_result=False, save_file_path=""):
@@ -73,7 +76,7 @@ def find_clans_mentioned_in_all_hadith(hadith_df, save_result=False, save_file_p
             english_text = row[english_name]
 
             # Find clans mentioned in the current hadith
-            clans_in_hadith = find_clans_in_one_hadith(arabic_text, english_text, clan_dictionaries)
+            clans_in_hadith = find_clans_in_one_hadith(arabic_text, english_text)
 
             # Append results
             all_clans.append(clans_in_hadith)
@@ -95,7 +98,8 @@ def find_clans_mentioned_in_all_hadith(hadith_df, save_result=False, save_file_p
 
     # Save results to an Excel file if requested
     if save_result and save_file_path:
-        result_df.to_excel(save_file_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_file_path, index=False)
         print(f"Results saved to {save_file_path}")
 
     return result_df
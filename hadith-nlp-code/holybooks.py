@@ -1,36 +1,50 @@
+from functools import lru_cache
 import pandas as pd
 from tqdm import tqdm
-from pyarabic.araby import strip_tashkeel
+from normalization import strip_tashkeel
+from dictionary_matcher import DictionaryMatcher, load_dictionary, MATCH_AR
 from utility import tarabic_name, hadith_number_name, strip_punctuation, clean_arabic_text
+from profiling import timed, NORMALIZATION, SERIALIZATION
 
 # Load the dictionary of holy books
 HOLYBOOKS_DICTIONARY_PATH = 'dictionaries/holybooks.xlsx'
-df_holybooks = pd.read_excel(HOLYBOOKS_DICTIONARY_PATH)
 
 
-def find_holybooks_in_one_hadith(ar_text, df=df_holybooks):
+# Function to load the compiled dictionary of holy books on first use
+@lru_cache(maxsize=None)
+def get_holybooks_dictionary():
+    """
+    Loads the compiled dictionary of holy books once per process, so that importing the module reads no file.
+
+    Returns:
+        CompiledDictionary: The holy books dictionary.
+    """
+    return load_dictionary(HOLYBOOKS_DICTIONARY_PATH, policy=MATCH_AR)
+
+
+def find_holybooks_in_one_hadith(ar_text, df=None):
     """
     Identifies mentions of holy books in a single hadith using Arabic patterns.
 
     Args:
         ar_text (str): The Arabic text of the hadith.
-        df (pd.DataFrame): DataFrame containing patterns for holy books.
+        df (pd.DataFrame, optional): DataFrame containing patterns for holy books.
+            Defaults to the compiled holy books dictionary.
 
     Returns:
         list: A list of IDs corresponding to holy books mentioned in the hadith.
     """
     # Preprocess Arabic text
-    ar_text = clean_arabic_text(strip_tashkeel(strip_punctuation(ar_text)))
+    with timed(NORMALIZATION):
+        ar_text = clean_arabic_text(strip_tashkeel(strip_punctuation(ar_text)))
 
-    holybooks_list = []
+    if df is None:
+        matcher = get_holybooks_dictionary().matcher()
+    else:
+        matcher = DictionaryMatcher.from_dataframe(df, policy=MATCH_AR)
 
     # Check for matches in the Arabic patterns
-    for _, row in df.iterrows():
-        ar_patterns = strip_tashkeel(row['ar']).split(',')
-        if any(pattern in ar_text for pattern in ar_patterns):
-            holybooks_list.append(row['ID'])
-
-    return holybooks_list
+    return matcher.match(ar_text)
 
 
 def find_holybooks_mentioned_in_all_hadith(hadith_df, save_result=False, collection="sb"):
@@ -79,7 +93,8 @@ def find_holybooks_mentioned_in_all_hadith(hadith_df, save_result=False, collect
     # Save results to an Excel file if requested
     if save_result:
         save_path = f"results/{collection}/holybooks.xlsx"
-        result_df.to_excel(save_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_path, index=False)
         print(f"Results saved to {save_path}")
 
     return result_df
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import pickle
+from corpus import AR_NORMALIZED_NAME
+from ner_annotations import text_fingerprint
+from utility import english_name
+
+# Directory holding the state of incremental runs, inside the output directory of the pipeline
+INCREMENTAL_STATE_SUBDIR = "incremental"
+
+# Directory holding the state of incremental runs of each collection written to the default output directory
+INCREMENTAL_STATE_DIR = "results/{collection}/identified_entities/" + INCREMENTAL_STATE_SUBDIR
+
+# Column identifying a hadith across runs (hadith numbers are not unique in every collection)
+HADITH_KEY_NAME = "hadith_id"
+
+
+# Function to fingerprint a file
+def file_fingerprint(file_path):
+    """
+    Computes the fingerprint of a file's content, e.g. an entity dictionary.
+
+    Args:
+        file_path (str): Path of the file.
+
+    Returns:
+        str: Hexadecimal SHA-1 digest of the file.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Function to fingerprint the input text of each hadith
+def hadith_fingerprints(hadith_df):
+    """
+    Computes the fingerprint of the texts every stage may read: the normalized Arabic text and the English text.
+
+    Args:
+        hadith_df (pd.DataFrame): The collection, as returned by load_corpus.
+
+    Returns:
+        list: Fingerprint of each hadith, in DataFrame order.
+    """
+    return [text_fingerprint(f"{ar_text}\n{en_text}")
+            for ar_text, en_text in zip(hadith_df[AR_NORMALIZED_NAME], hadith_df[english_name])]
+
+
+class IncrementalState:
+    """
+    Results of the last run of each stage over a collection, with the fingerprints of the
+    inputs they were computed from.
+    """
+
+    def __init__(self, collection="sb", state_dir=INCREMENTAL_STATE_DIR):
+        """
+        Args:
+            collection (str, optional): The collection name. Defaults to "sb".
+            state_dir (str, optional): Directory pattern of the state. Defaults to INCREMENTAL_STATE_DIR.
+        """
+        self.collection = collection
+        self.state_dir = state_dir.format(collection=collection)
+
+    def _path(self, stage):
+        return os.path.join(self.state_dir, f"{stage}.pkl")
+
+    def load(self, stage):
+        """
+        Loads the last run of a stage.
+
+        Args:
+            stage (str): Name of the stage.
+
+        Returns:
+            dict or None: The "dependencies", "hadith_keys", "fingerprints" and "result" of the
+                last run, or None if the stage never ran.
+        """
+        if not os.path.exists(self._path(stage)):
+            return None
+        with open(self._path(stage), "rb") as file:
+            return pickle.load(file)
+
+    def save(self, stage, dependencies, hadith_keys, fingerprints, result_df):
+        """
+        Saves a run of a stage.
+
+        Args:
+            stage (str): Name of the stage.
+            dependencies (dict): Fingerprints of the dictionaries and models used by the stage.
+            hadith_keys (list): Key of each hadith.
+            fingerprints (list): Text fingerprint of each hadith.
+            result_df (pd.DataFrame): Result of the stage, one row per hadith.
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(self._path(stage), "wb") as file:
+            pickle.dump({"dependencies": dependencies, "hadith_keys": list(hadith_keys),
+                         "fingerprints": list(fingerprints), "result": result_df}, file)
+
+    def stale_rows(self, stage, dependencies, hadith_keys, fingerprints):
+        """
+        Finds the hadith whose result must be recomputed, and the previous result of the others.
+
+        Every hadith is stale when a dependency of the stage changed; otherwise only new hadith
+        and hadith whose text changed are.
+
+        Args:
+            stage (str): Name of the stage.
+            dependencies (dict): Current fingerprints of the dictionaries and models used by the stage.
+            hadith_keys (list): Key of each hadith.
+            fingerprints (list): Current text fingerprint of each hadith.
+
+        Returns:
+            tuple: Positions of the stale hadith, and the previous result row of each up-to-date hadith by key.
+        """
+        previous = self.load(stage)
+        if previous is None or previous["dependencies"] != dependencies:
+            return list(range(len(hadith_keys))), {}
+
+        previous_rows = {
+            key: (fingerprint, row)
+            for key, fingerprint, row in zip(previous["hadith_keys"], previous["fingerprints"],
+                                             previous["result"].itertuples(index=False, name=None))
+        }
+        stale = [i for i, (key, fingerprint) in enumerate(zip(hadith_keys, fingerprints))
+                 if previous_rows.get(key, (None, None))[0] != fingerprint]
+        stale_keys = {hadith_keys[i] for i in stale}
+        up_to_date = {key: row for key, (_, row) in previous_rows.items() if key not in stale_keys}
+        return stale, up_to_date
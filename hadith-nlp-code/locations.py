@@ -1,19 +1,36 @@
+from functools import lru_cache
 import pandas as pd
 import tqdm
-from pyarabic.araby import strip_tashkeel
-from NERModelLoader import nlp
+from ner_annotations import normalize_for_ner
+from model_registry import get_ner_model
+from entity_resolver import EntityIdResolver
+from ner_engine import resolve_doc_entities, stream_resolved_entities, DEFAULT_BATCH_SIZE, DEFAULT_N_PROCESS
 from utility import (
-    strip_punctuation,
-    Resolve_Entities,
     tarabic_name,
     hadith_number_name,
-    clean_arabic_text,
 )
+from profiling import timed, NORMALIZATION, INFERENCE, ENTITY_RESOLUTION, SERIALIZATION
+
+# Dictionary of locations
+LOCATIONS_DICTIONARY_PATH = "dictionaries/locations.csv"
+
+
+# Function to load the indexed dictionary of locations on first use
+@lru_cache(maxsize=None)
+def get_location_resolver():
+    """
+    Loads and indexes the dictionary of locations once per process, so that importing the module reads no file.
+
+    Returns:
+        EntityIdResolver: The locations resolver.
+    """
+    return EntityIdResolver.from_csv(LOCATIONS_DICTIONARY_PATH)
+
 
 # Utility function to get the location ID based on an Arabic name
 def get_location_id(arabic_name):
     """
-    Retrieves the location ID from a CSV file based on the provided Arabic name.
+    Retrieves the location ID from the locations dictionary based on the provided Arabic name.
 
     Args:
         arabic_name (str): The Arabic name to search for in the locations dictionary.
@@ -21,14 +38,39 @@ def get_location_id(arabic_name):
     Returns:
         int or None: The location ID if found; otherwise, None.
     """
-    df = pd.read_csv("dictionaries/locations.csv")
-    for _, row in df.iterrows():
-        # Split the 'alternatives' column into a list of possible names
-        string_list = row["alternatives"].split("-")
-        # Check if any alternative matches the Arabic name
-        if any(substring in arabic_name for substring in string_list):
-            return row["id"]
-    return None
+    # The first location with an alternative contained in the name is returned
+    return get_location_resolver().resolve(arabic_name)
+
+
+# Function to preprocess the Arabic text before location extraction
+@timed(NORMALIZATION)
+def preprocess_location_text(arabic_text):
+    """
+    Prepares the Arabic text of a hadith for location extraction.
+
+    Args:
+        arabic_text (str): The text of the hadith in Arabic.
+
+    Returns:
+        str: The text as sent to the NER model by the pipeline (see normalize_for_ner).
+    """
+    return normalize_for_ner(arabic_text)
+
+
+# Function to map resolved entities to location IDs
+@timed(ENTITY_RESOLUTION)
+def locations_from_entities(resolved_entities):
+    """
+    Collects location IDs from the resolved entities of a hadith.
+
+    Args:
+        resolved_entities (list): List of resolved entities as tuples (entity, label).
+
+    Returns:
+        set: A set of unique location IDs.
+    """
+    locations = [get_location_id(entity) for entity, label in resolved_entities if label == "LOC"]
+    return set(locations)
 
 
 # Function to find locations mentioned in a single hadith
@@ -43,22 +85,21 @@ def find_location_in_one_hadith(arabic_text):
         set: A set of unique location IDs mentioned in the hadith.
     """
     # Preprocess the Arabic text
-    arabic_text = strip_punctuation(arabic_text)
-    arabic_text = strip_tashkeel(arabic_text)
-    arabic_text = clean_arabic_text(arabic_text)
+    arabic_text = preprocess_location_text(arabic_text)
 
     # Extract entities using the NER model
-    doc = nlp(arabic_text)
-    entities = [(ent.text, ent.label_) for ent in doc.ents]
-    resolved_entities = Resolve_Entities(entities)
+    with timed(INFERENCE):
+        doc = get_ner_model()(arabic_text)
+    resolved_entities = resolve_doc_entities(doc)
 
     # Collect location IDs for entities labeled as "LOC"
-    locations = [get_location_id(entity) for entity, label in resolved_entities if label == "LOC"]
-    return set(locations)
+    return locations_from_entities(resolved_entities)
 
 
 # Function to find locations mentioned in all hadith in a dataset
-def find_locations_mentioned_in_all_hadith(hadith_df, save_result=False, collection="sb"):
+def find_locations_mentioned_in_all_hadith(hadith_df, save_result=False, collection="sb",
+                                           batch_size=DEFAULT_BATCH_SIZE, n_process=DEFAULT_N_PROCESS,
+                                           annotation_store=None):
     """
     Identifies locations mentioned in all hadith in the provided DataFrame.
 
@@ -66,6 +107,10 @@ def find_locations_mentioned_in_all_hadith(hadith_df, save_result=False, collect
         hadith_df (pd.DataFrame): DataFrame containing hadith texts.
         save_result (bool, optional): Whether to save the result to an Excel file. Defaults to False.
         collection (str, optional): The collection name to use for saving results. Defaults to "sb".
+        batch_size (int, optional): Number of hadith per NER batch. Defaults to DEFAULT_BATCH_SIZE.
+        n_process (int, optional): Number of NER worker processes. Defaults to DEFAULT_N_PROCESS.
+        annotation_store (NERAnnotationStore, optional): Store of cached NER annotations. When given,
+            entities are read from the store and the model only runs on hadith missing from it.
 
     Returns:
         pd.DataFrame: DataFrame with hadith numbers and their corresponding locations.
@@ -73,14 +118,18 @@ def find_locations_mentioned_in_all_hadith(hadith_df, save_result=False, collect
     all_locations = []
     all_hadith_numbers = []
 
-    # Iterate through the hadith dataset with a progress bar
-    with tqdm.tqdm(total=len(hadith_df), desc="Extracting locations") as pbar:
-        for _, row in hadith_df.iterrows():
-            arabic_text = row[tarabic_name]  # Extract Arabic text column
-            hadith_number = row[hadith_number_name]  # Extract hadith number
+    if annotation_store is not None:
+        # Reuse the annotations of a single shared NER pass
+        entity_stream = annotation_store.annotate(hadith_df, batch_size=batch_size, n_process=n_process)
+    else:
+        # Stream the preprocessed texts through the NER model in batches
+        texts = (preprocess_location_text(text) for text in hadith_df[tarabic_name])
+        entity_stream = stream_resolved_entities(texts, batch_size=batch_size, n_process=n_process)
 
+    with tqdm.tqdm(total=len(hadith_df), desc="Extracting locations") as pbar:
+        for hadith_number, resolved_entities in zip(hadith_df[hadith_number_name], entity_stream):
             # Find locations for the current hadith
-            locations = find_location_in_one_hadith(arabic_text)
+            locations = locations_from_entities(resolved_entities)
 
             # Append results
             all_locations.append(locations)
@@ -97,7 +146,8 @@ def find_locations_mentioned_in_all_hadith(hadith_df, save_result=False, collect
     # Save results to an Excel file if requested
     if save_result:
         save_path = f"results/{collection}/locations.xlsx"
-        result_df.to_excel(save_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_path, index=False)
         print(f"Results saved to {save_path}")
 
     return result_df
@@ -0,0 +1,127 @@
+import hashlib
+import os
+
+# Locations of the trained models
+NER_MODEL_PATH = "trained_models/finetune/camel/10_caner_customized_ner_model"
+SENTENCE_MODEL_PATH = "trained_models/transformer_models/"
+
+# Models loaded so far in this process, and the versions of models registered with set_model
+_models = {}
+_versions = {}
+
+
+def _load_ner_model():
+    """
+    Loads the fine-tuned CAMeL-BERT spaCy pipeline.
+
+    Returns:
+        spacy.Language: The NER pipeline.
+    """
+    import spacy
+    return spacy.load(NER_MODEL_PATH)
+
+
+def _load_sentence_model(language):
+    """
+    Loads the sentence transformer of a language.
+
+    Args:
+        language (str): "en" or "ar".
+
+    Returns:
+        SentenceTransformer: The sentence encoder.
+    """
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(SENTENCE_MODEL_PATH + language)
+
+
+# Loader of each model, called on first use
+_loaders = {
+    "ner": _load_ner_model,
+    "en": lambda: _load_sentence_model("en"),
+    "ar": lambda: _load_sentence_model("ar"),
+}
+
+# Directory of each model on disk
+_model_paths = {
+    "ner": NER_MODEL_PATH,
+    "en": SENTENCE_MODEL_PATH + "en",
+    "ar": SENTENCE_MODEL_PATH + "ar",
+}
+
+
+def get_model(name):
+    """
+    Returns a model, loading it on first use and caching it for the rest of the process.
+
+    Args:
+        name (str): "ner", "en" or "ar".
+
+    Returns:
+        The loaded model.
+    """
+    if name not in _models:
+        _models[name] = _loaders[name]()
+    return _models[name]
+
+
+def set_model(name, model, version=None):
+    """
+    Registers an already loaded model, e.g. a stub model or a quantized variant.
+
+    Args:
+        name (str): "ner", "en" or "ar".
+        model: The model to use for this name.
+        version (str, optional): Version reported by get_model_version for this model. Defaults to None.
+    """
+    _models[name] = model
+    _versions[name] = version
+
+
+def get_model_version(name):
+    """
+    Returns a version of a model that changes whenever the model changes, without loading it.
+
+    The version of a model on disk is a fingerprint of the names, sizes and modification times of its files.
+
+    Args:
+        name (str): "ner", "en" or "ar".
+
+    Returns:
+        str or None: The version, or None if it is unknown.
+    """
+    if name in _versions:
+        return _versions[name]
+    model_path = _model_paths[name]
+    if not os.path.isdir(model_path):
+        return None
+    digest = hashlib.sha1()
+    for directory, _, files in sorted(os.walk(model_path)):
+        for file_name in sorted(files):
+            stat = os.stat(os.path.join(directory, file_name))
+            relative_path = os.path.relpath(os.path.join(directory, file_name), model_path)
+            digest.update(f"{relative_path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_ner_model():
+    """
+    Returns the NER pipeline used by the NER-based extractors.
+
+    Returns:
+        spacy.Language: The NER pipeline.
+    """
+    return get_model("ner")
+
+
+def get_sentence_model(language):
+    """
+    Returns the sentence encoder of a language.
+
+    Args:
+        language (str): "en" or "ar".
+
+    Returns:
+        SentenceTransformer: The sentence encoder.
+    """
+    return get_model(language)
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+from normalization import normalize_clean_arabic
+from model_registry import get_model_version
+from ner_engine import stream_resolved_entities, DEFAULT_BATCH_SIZE, DEFAULT_N_PROCESS
+from utility import tarabic_name, hadith_number_name
+from profiling import timed, SERIALIZATION
+
+# Location of the persisted annotations of each collection
+NER_ANNOTATIONS_PATH = "results/{collection}/ner_annotations.json"
+
+
+# Function to normalize the Arabic text that is sent to the NER model
+def normalize_for_ner(arabic_text):
+    """
+    Normalizes the Arabic text of a hadith before it is annotated by the NER model.
+
+    Args:
+        arabic_text (str): The Arabic text of the hadith.
+
+    Returns:
+        str: The text without punctuation, diacritics and English characters.
+    """
+    return normalize_clean_arabic(arabic_text)
+
+
+# Function to fingerprint a normalized text
+def text_fingerprint(text):
+    """
+    Computes a stable fingerprint of a text.
+
+    Args:
+        text (str): The text to fingerprint.
+
+    Returns:
+        str: Hexadecimal SHA-1 digest of the UTF-8 encoded text.
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class NERAnnotationStore:
+    """
+    Persisted store of the resolved NER entities of a hadith collection.
+
+    Each entry holds the full Resolve_Entities output of one NER pass and is keyed by
+    the collection, the hadith number and the fingerprint of the normalized text, so
+    label-specific extractors can share a single pass over the model. Annotations made by
+    another version of the NER model are discarded when the store is opened.
+    """
+
+    def __init__(self, collection="sb", path=None, model_version=None):
+        """
+        Args:
+            collection (str, optional): The collection name. Defaults to "sb".
+            path (str, optional): JSON file backing the store. Defaults to NER_ANNOTATIONS_PATH.
+            model_version (str, optional): Version of the NER model. Defaults to the version
+                reported by the model registry.
+        """
+        self.collection = collection
+        self.path = path or NER_ANNOTATIONS_PATH.format(collection=collection)
+        self.model_version = model_version or get_model_version("ner")
+        self.annotations = {}
+
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            stored_version = stored.get("model_version")
+            if stored_version and self.model_version and stored_version != self.model_version:
+                print(f"Discarding annotations of another NER model version in {self.path}")
+                return
+            self.annotations = {
+                key: [tuple(entity) for entity in entities]
+                for key, entities in stored["annotations"].items()
+            }
+
+    def key(self, hadith_number, normalized_text):
+        """
+        Builds the store key of a hadith.
+
+        Args:
+            hadith_number: The hadith number.
+            normalized_text (str): The normalized Arabic text of the hadith.
+
+        Returns:
+            str: The key of the hadith in the store.
+        """
+        return f"{self.collection}|{hadith_number}|{text_fingerprint(normalized_text)}"
+
+    def get(self, hadith_number, normalized_text):
+        """
+        Retrieves the resolved entities of a hadith.
+
+        Args:
+            hadith_number: The hadith number.
+            normalized_text (str): The normalized Arabic text of the hadith.
+
+        Returns:
+            list or None: Resolved entities (entity, label), or None if the hadith is not annotated.
+        """
+        return self.annotations.get(self.key(hadith_number, normalized_text))
+
+    def put(self, hadith_number, normalized_text, resolved_entities):
+        """
+        Stores the resolved entities of a hadith.
+
+        Args:
+            hadith_number: The hadith number.
+            normalized_text (str): The normalized Arabic text of the hadith.
+            resolved_entities (list): Resolved entities (entity, label).
+        """
+        self.annotations[self.key(hadith_number, normalized_text)] = list(resolved_entities)
+
+    @timed(SERIALIZATION)
+    def save(self):
+        """
+        Writes the store to its JSON file.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Written under a temporary name, so that a reader never sees a partial store
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({"collection": self.collection, "model_version": self.model_version,
+                       "annotations": self.annotations}, f, ensure_ascii=False)
+        os.replace(temporary_path, self.path)
+
+    def annotate(self, hadith_df, batch_size=DEFAULT_BATCH_SIZE, n_process=DEFAULT_N_PROCESS, save=True, texts=None):
+        """
+        Returns the resolved entities of every hadith, running the NER model only on
+        hadith that are missing from the store.
+
+        Args:
+            hadith_df (pd.DataFrame): DataFrame containing hadith texts in Arabic.
+            batch_size (int, optional): Number of hadith per NER batch. Defaults to DEFAULT_BATCH_SIZE.
+            n_process (int, optional): Number of NER worker processes. Defaults to DEFAULT_N_PROCESS.
+            save (bool, optional): Whether to persist newly annotated hadith. Defaults to True.
+            texts (list, optional): Texts already normalized with normalize_for_ner, in DataFrame order.
+                Defaults to normalizing the Arabic column of the DataFrame.
+
+        Returns:
+            list: Resolved entities (entity, label) of each hadith, in DataFrame order.
+        """
+        hadith_numbers = list(hadith_df[hadith_number_name])
+        if texts is None:
+            texts = [normalize_for_ner(text) for text in hadith_df[tarabic_name]]
+
+        # Annotate only the hadith that are not in the store yet
+        missing = [i for i, (hnum, text) in enumerate(zip(hadith_numbers, texts)) if self.get(hnum, text) is None]
+        if missing:
+            entity_stream = stream_resolved_entities((texts[i] for i in missing),
+                                                     batch_size=batch_size, n_process=n_process)
+            for i, resolved_entities in zip(missing, entity_stream):
+                self.put(hadith_numbers[i], texts[i], resolved_entities)
+            if save:
+                self.save()
+
+        return [self.get(hnum, text) for hnum, text in zip(hadith_numbers, texts)]
@@ -0,0 +1,40 @@
+from model_registry import get_ner_model
+from utility import Resolve_Entities
+from profiling import timed, timed_iter, INFERENCE, ENTITY_RESOLUTION
+
+# Defaults for streaming hadith through the NER model
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_N_PROCESS = 1
+
+
+@timed(ENTITY_RESOLUTION)
+def resolve_doc_entities(doc):
+    """
+    Resolves the B-/I- tagged entities of a processed spaCy document.
+
+    Args:
+        doc (spacy.tokens.Doc): Document returned by the NER model.
+
+    Returns:
+        list: List of resolved entities as tuples (entity, label).
+    """
+    entities = [(ent.text, ent.label_) for ent in doc.ents]
+    return Resolve_Entities(entities)
+
+
+def stream_resolved_entities(texts, batch_size=DEFAULT_BATCH_SIZE, n_process=DEFAULT_N_PROCESS, model=None):
+    """
+    Streams preprocessed hadith texts through the NER model in batches.
+
+    Args:
+        texts (iterable): Preprocessed Arabic texts, one per hadith.
+        batch_size (int, optional): Number of texts per model batch. Defaults to DEFAULT_BATCH_SIZE.
+        n_process (int, optional): Number of worker processes used by spaCy. Defaults to DEFAULT_N_PROCESS.
+        model (spacy.Language, optional): NER pipeline to use. Defaults to the shared CAMeL-BERT model.
+
+    Yields:
+        list: Resolved entities (entity, label) for each text, in input order.
+    """
+    model = model if model is not None else get_ner_model()
+    for doc in timed_iter(INFERENCE, model.pipe(texts, batch_size=batch_size, n_process=n_process)):
+        yield resolve_doc_entities(doc)
@@ -0,0 +1,82 @@
+import json
+
+# Training data of the NER model, written by caner2spacy.py
+NER_DATASET_PATH = "training_dataset/customized-caner.json"
+
+# Share of the dataset used for training; the rest is the validation split
+TRAIN_FRACTION = 0.8
+
+
+# Function to load the NER dataset
+def load_ner_dataset(file_path=NER_DATASET_PATH):
+    """
+    Loads the NER dataset in spaCy format.
+
+    Args:
+        file_path (str, optional): Path of the JSON dataset. Defaults to NER_DATASET_PATH.
+
+    Returns:
+        list: (text, {"entities": [(start, end, label), ...]}) pairs.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Function to split the NER dataset into training and validation sets
+def split_ner_dataset(data, train_fraction=TRAIN_FRACTION):
+    """
+    Splits the dataset in order, as done when training the CAMeL-BERT model.
+
+    Args:
+        data (list): The dataset, as returned by load_ner_dataset.
+        train_fraction (float, optional): Share of the dataset used for training. Defaults to TRAIN_FRACTION.
+
+    Returns:
+        tuple: The training and the validation examples.
+    """
+    train_size = int(train_fraction * len(data))
+    return data[:train_size], data[train_size:]
+
+
+def evaluate_model(nlp, val_dataset):
+    """
+    Evaluate the SpaCy NER model on a validation set.
+    Args:
+        nlp: Trained SpaCy NER model.
+        val_dataset: Validation data in SpaCy format.
+    Returns:
+        metrics: Dictionary with accuracy, precision, recall, and F1-score.
+    """
+    from seqeval.metrics import classification_report, accuracy_score, f1_score
+    true_labels = []
+    pred_labels = []
+
+    for text, annotations in val_dataset:
+        # True entities
+        entities = annotations["entities"]
+        true = ['O'] * len(text)  # Default to "O" (non-entity)
+        for start, end, label in entities:
+            for i in range(start, end):
+                true[i] = label
+
+        # Predicted entities
+        doc = nlp(text)
+        pred = ['O'] * len(text)  # Default to "O" (non-entity)
+        for ent in doc.ents:
+            for i in range(ent.start_char, ent.end_char):
+                pred[i] = ent.label_
+
+        # Align lengths
+        min_len = min(len(true), len(pred))
+        true_labels.append(true[:min_len])
+        pred_labels.append(pred[:min_len])
+
+    # Calculate metrics
+    accuracy = accuracy_score(true_labels, pred_labels)
+    f1 = f1_score(true_labels, pred_labels)
+    report = classification_report(true_labels, pred_labels)
+    return {
+        "accuracy": accuracy,
+        "f1": f1,
+        "classification_report": report,
+    }
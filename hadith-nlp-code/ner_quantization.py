@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import time
+from model_registry import NER_MODEL_PATH, get_model_version, set_model
+from ner_engine import DEFAULT_BATCH_SIZE
+from ner_evaluation import NER_DATASET_PATH, load_ner_dataset, split_ner_dataset, evaluate_model
+
+# Suffix of the version of the quantized NER model, so that its annotations are stored apart
+QUANTIZED_VERSION_SUFFIX = "-int8"
+
+# Report of the comparison of the full-precision and quantized models
+NER_QUANTIZATION_RESULTS_PATH = "results/benchmarks/ner_quantization.json"
+
+
+# Function to find the PyTorch models of a spaCy pipeline
+def transformer_shims(nlp):
+    """
+    Finds the shims holding the PyTorch models of the transformer components of a spaCy pipeline.
+
+    Args:
+        nlp (spacy.Language): The pipeline.
+
+    Returns:
+        list: The thinc shims whose _model is a torch.nn.Module.
+    """
+    import torch
+    shims = []
+    for _, component in nlp.pipeline:
+        model = getattr(component, "model", None)
+        if model is None:
+            continue
+        for node in model.walk():
+            for shim in node.shims:
+                if isinstance(getattr(shim, "_model", None), torch.nn.Module) and shim not in shims:
+                    shims.append(shim)
+    return shims
+
+
+# Function to quantize the transformer of the NER pipeline
+def quantize_ner_pipeline(nlp):
+    """
+    Converts the linear layers of the transformer of a spaCy pipeline to dynamically quantized int8
+    layers for CPU inference. The tokenizer, the NER head and doc.ents are unchanged.
+
+    Args:
+        nlp (spacy.Language): The full-precision pipeline, modified in place.
+
+    Returns:
+        spacy.Language: The quantized pipeline.
+    """
+    import torch
+    shims = transformer_shims(nlp)
+    if not shims:
+        raise ValueError("The pipeline has no PyTorch transformer to quantize")
+    for shim in shims:
+        quantized = torch.quantization.quantize_dynamic(shim._model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+        shim._model = quantized
+        # spacy-transformers also keeps a reference to the transformer next to its tokenizer
+        hf_objects = getattr(shim, "_hfmodel", None)
+        if hf_objects is not None:
+            hf_objects.transformer = quantized
+    return nlp
+
+
+def load_quantized_ner_model(model_path=NER_MODEL_PATH):
+    """
+    Loads the fine-tuned CAMeL-BERT spaCy pipeline on the CPU and quantizes its transformer.
+
+    Args:
+        model_path (str, optional): Directory of the pipeline. Defaults to NER_MODEL_PATH.
+
+    Returns:
+        spacy.Language: The quantized NER pipeline.
+    """
+    import spacy
+    spacy.require_cpu()
+    return quantize_ner_pipeline(spacy.load(model_path))
+
+
+def quantized_ner_model_version():
+    """
+    Returns the version the quantized pipeline is registered with, without loading it.
+
+    Returns:
+        str: The version of the full-precision model followed by QUANTIZED_VERSION_SUFFIX.
+    """
+    version = get_model_version("ner") or ""
+    if version.endswith(QUANTIZED_VERSION_SUFFIX):
+        return version
+    return version + QUANTIZED_VERSION_SUFFIX
+
+
+def use_quantized_ner_model(model_path=NER_MODEL_PATH):
+    """
+    Registers the quantized pipeline as the "ner" model, used by the NER-based extractors and the pipeline.
+
+    Args:
+        model_path (str, optional): Directory of the pipeline. Defaults to NER_MODEL_PATH.
+    """
+    version = quantized_ner_model_version()
+    set_model("ner", load_quantized_ner_model(model_path), version=version)
+
+
+# Function to measure the NER throughput of a pipeline
+def time_ner_model(nlp, texts, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Runs texts through a pipeline, after a warm-up batch.
+
+    Args:
+        nlp (spacy.Language): The pipeline.
+        texts (list): The texts.
+        batch_size (int, optional): Number of texts per batch. Defaults to DEFAULT_BATCH_SIZE.
+
+    Returns:
+        float: Seconds taken by the texts.
+    """
+    for _ in nlp.pipe(texts[:batch_size], batch_size=batch_size):
+        pass
+    start = time.perf_counter()
+    for _ in nlp.pipe(texts, batch_size=batch_size):
+        pass
+    return time.perf_counter() - start
+
+
+# Function to compare the full-precision and quantized NER models
+def benchmark_ner_quantization(dataset_path=NER_DATASET_PATH, model_path=NER_MODEL_PATH,
+                               batch_size=DEFAULT_BATCH_SIZE, limit=None):
+    """
+    Measures the CPU throughput and F1 score of the full-precision and int8 pipelines on the
+    validation split used when training the model.
+
+    Args:
+        dataset_path (str, optional): Path of the NER dataset. Defaults to NER_DATASET_PATH.
+        model_path (str, optional): Directory of the pipeline. Defaults to NER_MODEL_PATH.
+        batch_size (int, optional): Number of texts per batch. Defaults to DEFAULT_BATCH_SIZE.
+        limit (int, optional): Number of validation examples used. Defaults to all.
+
+    Returns:
+        dict: Seconds, texts per second, accuracy and F1 of each model, the speedup and the F1 delta.
+    """
+    import spacy
+    spacy.require_cpu()
+    _, val_dataset = split_ner_dataset(load_ner_dataset(dataset_path))
+    val_dataset = val_dataset[:limit]
+    texts = [text for text, _ in val_dataset]
+
+    report = {"examples": len(val_dataset), "batch_size": batch_size}
+    for variant in ("fp32", "int8"):
+        nlp = spacy.load(model_path)
+        if variant == "int8":
+            quantize_ner_pipeline(nlp)
+        seconds = time_ner_model(nlp, texts, batch_size)
+        metrics = evaluate_model(nlp, val_dataset)
+        report[variant] = {
+            "seconds": round(seconds, 3),
+            "texts_per_second": round(len(texts) / seconds, 2),
+            "accuracy": metrics["accuracy"],
+            "f1": metrics["f1"],
+        }
+        print(f"{variant}: {report[variant]['texts_per_second']} texts/s, F1-Score: {metrics['f1']:.4f}")
+    report["speedup"] = round(report["fp32"]["seconds"] / report["int8"]["seconds"], 3)
+    report["f1_delta"] = report["int8"]["f1"] - report["fp32"]["f1"]
+    print(f"Speedup: {report['speedup']}x, F1 delta: {report['f1_delta']:+.4f}")
+    return report
+
+
+# Function to parse the command line of the quantization benchmark
+def parse_quantization_arguments(argv=None):
+    """
+    Parses the command line options of the quantization benchmark.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Compare the full-precision and int8 quantized NER models on CPU.")
+    parser.add_argument("--dataset", default=NER_DATASET_PATH,
+                        help="NER dataset, split as in Training_NER_camelbert.py (default: %(default)s)")
+    parser.add_argument("--model-path", default=NER_MODEL_PATH,
+                        help="directory of the spaCy pipeline (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="number of texts per batch (default: %(default)s)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="number of validation examples used (default: all)")
+    parser.add_argument("--output", default=NER_QUANTIZATION_RESULTS_PATH,
+                        help="JSON report path (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_quantization_arguments(argv)
+    report = benchmark_ner_quantization(args.dataset, args.model_path, args.batch_size, args.limit)
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,38 @@
 import pandas as pd
 from tqdm import tqdm
-from pyarabic.araby import strip_tashkeel
-from NERModelLoader import nlp
-from utility import strip_punctuation, Resolve_Entities, tarabic_name, hadith_number_name
+from ner_annotations import normalize_for_ner
+from model_registry import get_ner_model
+from ner_engine import resolve_doc_entities, stream_resolved_entities, DEFAULT_BATCH_SIZE, DEFAULT_N_PROCESS
+from utility import tarabic_name, hadith_number_name
+from profiling import timed, NORMALIZATION, INFERENCE, ENTITY_RESOLUTION, SERIALIZATION
+
+
+@timed(NORMALIZATION)
+def preprocess_persons_text(arabic_text):
+    """
+    Prepares the Arabic text of a hadith for person extraction.
+
+    Args:
+        arabic_text (str): The Arabic text of the hadith.
+
+    Returns:
+        str: The text as sent to the NER model by the pipeline (see normalize_for_ner).
+    """
+    return normalize_for_ner(arabic_text)
+
+
+@timed(ENTITY_RESOLUTION)
+def persons_from_entities(resolved_entities):
+    """
+    Collects person mentions from the resolved entities of a hadith.
+
+    Args:
+        resolved_entities (list): List of resolved entities as tuples (entity, label).
+
+    Returns:
+        set: A set of unique person mentions.
+    """
+    return {entity for entity, label in resolved_entities if label == "PERS"}
 
 
 def find_persons_in_one_hadith(arabic_text):
@@ -16,22 +46,20 @@ def find_persons_in_one_hadith(arabic_text):
         set: A set of unique person mentions in the hadith.
     """
     # Preprocess Arabic text
-    arabic_text = strip_tashkeel(arabic_text)
-
-    # Process the text with the NER model
-    doc = nlp(arabic_text)
+    arabic_text = preprocess_persons_text(arabic_text)
 
-    # Extract entities and resolve them
-    entities = [(ent.text, ent.label_) for ent in doc.ents]
-    resolved_entities = Resolve_Entities(entities)
+    # Process the text with the NER model and resolve the entities
+    with timed(INFERENCE):
+        doc = get_ner_model()(arabic_text)
+    resolved_entities = resolve_doc_entities(doc)
 
     # Collect person entities
-    persons = {entity for entity, label in resolved_entities if label == "PERS"}
-
-    return persons
+    return persons_from_entities(resolved_entities)
 
 
-def find_persons_mentioned_in_all_hadith(hadith_df, save_result=False, save_file_path=""):
+def find_persons_mentioned_in_all_hadith(hadith_df, save_result=False, save_file_path="",
+                                         batch_size=DEFAULT_BATCH_SIZE, n_process=DEFAULT_N_PROCESS,
+                                         annotation_store=None):
     """
     Identifies mentions of persons across all hadith in the dataset.
 
@@ -39,6 +67,10 @@ def find_persons_mentioned_in_all_hadith(hadith_df, save_result=False, save_file
         hadith_df (pd.DataFrame): DataFrame containing hadith texts in Arabic.
         save_result (bool, optional): Whether to save the results to an Excel file. Defaults to False.
         save_file_path (str, optional): File path to save the results. Defaults to "".
+        batch_size (int, optional): Number of hadith per NER batch. Defaults to DEFAULT_BATCH_SIZE.
+        n_process (int, optional): Number of NER worker processes. Defaults to DEFAULT_N_PROCESS.
+        annotation_store (NERAnnotationStore, optional): Store of cached NER annotations. When given,
+            entities are read from the store and the model only runs on hadith missing from it.
 
     Returns:
         pd.DataFrame: DataFrame with hadith numbers and corresponding person mentions.
@@ -47,19 +79,23 @@ def find_persons_mentioned_in_all_hadith(hadith_df, save_result=False, save_file
     all_person_mentions = []
     all_hadith_numbers = []
 
-    # Iterate through the hadith dataset with a progress bar
-    with tqdm(total=len(hadith_df), desc="Extracting mentions of persons") as pbar:
-        for _, row in hadith_df.iterrows():
-            # Extract Arabic text
-            arabic_text = row.get(tarabic_name, "")
+    if annotation_store is not None:
+        # Reuse the annotations of a single shared NER pass
+        entity_stream = annotation_store.annotate(hadith_df, batch_size=batch_size, n_process=n_process)
+    else:
+        # Stream the preprocessed texts through the NER model in batches
+        texts = (preprocess_persons_text(text) for text in hadith_df[tarabic_name])
+        entity_stream = stream_resolved_entities(texts, batch_size=batch_size, n_process=n_process)
 
+    with tqdm(total=len(hadith_df), desc="Extracting mentions of persons") as pbar:
+        for hadith_number, resolved_entities in zip(hadith_df[hadith_number_name], entity_stream):
             # Find persons mentioned in the current hadith
-            persons_in_hadith = find_persons_in_one_hadith(arabic_text)
+            persons_in_hadith = persons_from_entities(resolved_entities)
 
             # Append results
             all_persons.append(persons_in_hadith)
             all_person_mentions.extend(persons_in_hadith)
-            all_hadith_numbers.append(row.get(hadith_number_name, ""))
+            all_hadith_numbers.append(hadith_number)
 
             pbar.update(1)
 
@@ -76,7 +112,8 @@ def find_persons_mentioned_in_all_hadith(hadith_df, save_result=False, save_file
 
     # Save results to an Excel file if requested
     if save_result and save_file_path:
-        result_df.to_excel(save_file_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_file_path, index=False)
         print(f"Results saved to {save_file_path}")
 
     return result_df
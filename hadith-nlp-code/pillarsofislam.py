@@ -1,37 +1,51 @@
+from functools import lru_cache
 import pandas as pd
 from tqdm import tqdm
-from pyarabic.araby import strip_tashkeel
+from normalization import strip_tashkeel
+from dictionary_matcher import DictionaryMatcher, load_dictionary, MATCH_AR
 from utility import tarabic_name, hadith_number_name, strip_punctuation, english_name, clean_arabic_text
+from profiling import timed, NORMALIZATION, SERIALIZATION
 
 # Load the dictionary for pillars of Islam
 PILLARS_DICTIONARY_PATH = 'dictionaries/pillars-of-islam.xlsx'
-df_pillars = pd.read_excel(PILLARS_DICTIONARY_PATH)
 
 
-def find_pillars_in_one_hadith(ar_text, en_text, df=df_pillars):
+# Function to load the compiled dictionary of pillars of Islam on first use
+@lru_cache(maxsize=None)
+def get_pillars_dictionary():
+    """
+    Loads the compiled dictionary of pillars of Islam once per process, so that importing the module reads no file.
+
+    Returns:
+        CompiledDictionary: The pillars of Islam dictionary.
+    """
+    return load_dictionary(PILLARS_DICTIONARY_PATH, policy=MATCH_AR)
+
+
+def find_pillars_in_one_hadith(ar_text, en_text, df=None):
     """
     Identifies mentions of pillars of Islam in a single hadith using Arabic patterns.
 
     Args:
         ar_text (str): Arabic text of the hadith.
         en_text (str): English text of the hadith.
-        df (pd.DataFrame): DataFrame containing patterns and IDs for pillars of Islam.
+        df (pd.DataFrame, optional): DataFrame containing patterns and IDs for pillars of Islam.
+            Defaults to the compiled pillars of Islam dictionary.
 
     Returns:
         list: A list of IDs corresponding to pillars mentioned in the hadith.
     """
     # Preprocess Arabic text
-    ar_text = clean_arabic_text(strip_tashkeel(strip_punctuation(ar_text)))
+    with timed(NORMALIZATION):
+        ar_text = clean_arabic_text(strip_tashkeel(strip_punctuation(ar_text)))
 
-    pillars_list = []
+    if df is None:
+        matcher = get_pillars_dictionary().matcher()
+    else:
+        matcher = DictionaryMatcher.from_dataframe(df, policy=MATCH_AR)
 
     # Check for matches in the Arabic patterns
-    for _, row in df.iterrows():
-        ar_patterns = strip_tashkeel(row['ar']).split(',')
-        if any(pattern in ar_text for pattern in ar_patterns):
-            pillars_list.append(row['ID'])
-
-    return pillars_list
+    return matcher.match(ar_text)
 
 
 def find_pillars_mentioned_in_all_hadith(hadith_df, save_result=False, collection="sb"):
@@ -81,7 +95,8 @@ def find_pillars_mentioned_in_all_hadith(hadith_df, save_result=False, collectio
     # Save results to an Excel file if requested
     if save_result:
         save_path = f"results/{collection}/pillarsofislam.xlsx"
-        result_df.to_excel(save_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_path, index=False)
         print(f"Results saved to {save_path}")
 
     return result_df
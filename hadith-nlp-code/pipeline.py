@@ -0,0 +1,579 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from tqdm import tqdm
+from afterlife import heaven_and_hell_from_entities
+from animals import get_animals_dictionary, ANIMALS_DICTIONARY_PATH
+from ayat import extract_coordinates_values
+from caliphs import get_caliphs_dictionary, CALIPHS_DICTIONARY_PATH
+from concepts import get_concepts_dictionary, CONCEPTS_DICTIONARY_PATH
+from corpus import load_corpus, AR_NORMALIZED_NAME, AR_CLEAN_NAME, EN_NORMALIZED_NAME
+from crimes import crimes_from_entities, CRIMES_DICTIONARY_PATH
+from dictionary_matcher import TokenIndex, MATCH_SUBSTRINGS, MATCH_TOKENS, MATCH_MODES
+from groupofpeople import get_clans_dictionary, CLAN_DICTIONARY_PATHS
+from holybooks import get_holybooks_dictionary, HOLYBOOKS_DICTIONARY_PATH
+from incremental import IncrementalState, file_fingerprint, hadith_fingerprints, HADITH_KEY_NAME, INCREMENTAL_STATE_SUBDIR
+from locations import locations_from_entities, LOCATIONS_DICTIONARY_PATH
+from ner_annotations import NERAnnotationStore
+from model_registry import get_model, get_model_version
+from ner_engine import stream_resolved_entities, DEFAULT_BATCH_SIZE, DEFAULT_N_PROCESS
+from ner_quantization import use_quantized_ner_model, quantized_ner_model_version
+from persons import persons_from_entities
+from pillarsofislam import get_pillars_dictionary, PILLARS_DICTIONARY_PATH
+from plants import get_plants_dictionary, PLANTS_DICTIONARY_PATH
+from profiling import timed, enable_profiling, print_profile, dump_profile, NORMALIZATION, SERIALIZATION
+from prophets import get_prophets_dictionary, PROPHETS_DICTIONARY_PATH
+from utility import tarabic_name, english_name, hadith_number_name
+
+# Collections processed by default
+COLLECTIONS = ["sb", "maj", "ms", "nis", "tir", "sad"]
+
+# Directory the stage outputs are written to, read back by generate_rdf
+PIPELINE_OUTPUT_DIR = "results/{collection}/identified_entities"
+
+# Number of hadith sent to a worker at once for NER annotation
+ANNOTATION_CHUNK_SIZE = 256
+
+# Registered stages: name -> function, output file, result columns, whether NER entities are needed
+# and the dictionary files the stage reads
+STAGES = {}
+
+
+def register_stage(name, output_file, columns, uses_entities=False, dependencies=()):
+    """
+    Registers a function as a pipeline stage.
+
+    The function receives the shared state of one hadith (a dict with the hadith number, the raw
+    and normalized texts, the collection, the match mode and, for NER stages, the resolved entities)
+    and returns one value per result column. Dictionary stages read their texts through match_text.
+
+    Args:
+        name (str): Name of the stage, used on the command line.
+        output_file (str): File name of the stage output.
+        columns (list): Result columns, written after the "hadith_number" column.
+        uses_entities (bool, optional): Whether the stage reads the NER entities. Defaults to False.
+        dependencies (iterable, optional): Dictionary files read by the stage. Defaults to ().
+
+    Returns:
+        callable: Decorator registering the function.
+    """
+    def decorator(function):
+        STAGES[name] = {"function": function, "output_file": output_file, "columns": columns,
+                        "uses_entities": uses_entities, "dependencies": list(dependencies)}
+        return function
+    return decorator
+
+
+# Function to get a text of a hadith as matched by the dictionary stages
+def match_text(hadith, field):
+    """
+    Returns a text of a hadith in the form expected by the match mode: the text itself when
+    matching substrings, its TokenIndex when matching whole words. The index of each text is
+    built once and shared by all the dictionary stages.
+
+    Args:
+        hadith (dict): The shared state of the hadith.
+        field (str): Name of the text, e.g. "ar_normalized" or "en_text".
+
+    Returns:
+        str or TokenIndex: The text or its index (lowercased for English texts).
+    """
+    if hadith["match_mode"] != MATCH_TOKENS:
+        return hadith[field]
+    token_indexes = hadith["token_indexes"]
+    if field not in token_indexes:
+        token_indexes[field] = TokenIndex(hadith[field], lowercase=field.startswith("en"))
+    return token_indexes[field]
+
+
+@register_stage("locations", "locations.xlsx", ["locations"], uses_entities=True,
+                dependencies=[LOCATIONS_DICTIONARY_PATH])
+def locations_stage(hadith):
+    return (locations_from_entities(hadith["entities"]),)
+
+
+@register_stage("persons", "persons.xlsx", ["persons"], uses_entities=True)
+def persons_stage(hadith):
+    return (persons_from_entities(hadith["entities"]),)
+
+
+@register_stage("crimes", "crimes.xlsx", ["crimes"], uses_entities=True, dependencies=[CRIMES_DICTIONARY_PATH])
+def crimes_stage(hadith):
+    return (crimes_from_entities(hadith["entities"]),)
+
+
+@register_stage("afterlife", "afterlife.xlsx", ["HEAVEN", "HELL"], uses_entities=True)
+def afterlife_stage(hadith):
+    return heaven_and_hell_from_entities(hadith["entities"])
+
+
+@register_stage("prophets", "prophets.xlsx", ["prophets"], dependencies=[PROPHETS_DICTIONARY_PATH])
+def prophets_stage(hadith):
+    prophets_dictionary = get_prophets_dictionary()
+    if hadith["collection"] == "sb":
+        return (prophets_dictionary.matcher("sb").match(match_text(hadith, "ar_normalized"),
+                                                        match_text(hadith, "en_text")),)
+    return (prophets_dictionary.matcher().match(match_text(hadith, "ar_normalized")),)
+
+
+@register_stage("clans", "clans.xlsx", ["clans"], dependencies=CLAN_DICTIONARY_PATHS)
+def clans_stage(hadith):
+    matcher = get_clans_dictionary().matcher()
+    return (matcher.match(match_text(hadith, "ar_normalized"), match_text(hadith, "en_text")),)
+
+
+@register_stage("caliphs", "caliphs.xlsx", ["caliphs"], dependencies=[CALIPHS_DICTIONARY_PATH])
+def caliphs_stage(hadith):
+    matcher = get_caliphs_dictionary().matcher()
+    return (matcher.match(match_text(hadith, "ar_normalized"), match_text(hadith, "en_text")),)
+
+
+@register_stage("holybooks", "holybooks.xlsx", ["holy_books"], dependencies=[HOLYBOOKS_DICTIONARY_PATH])
+def holybooks_stage(hadith):
+    return (get_holybooks_dictionary().matcher().match(match_text(hadith, "ar_clean")),)
+
+
+@register_stage("pillarsofislam", "pillarsofislam.xlsx", ["pillars"], dependencies=[PILLARS_DICTIONARY_PATH])
+def pillars_stage(hadith):
+    return (get_pillars_dictionary().matcher().match(match_text(hadith, "ar_clean")),)
+
+
+@register_stage("concepts", "concepts.xlsx", ["concepts"], dependencies=[CONCEPTS_DICTIONARY_PATH])
+def concepts_stage(hadith):
+    matcher = get_concepts_dictionary().matcher()
+    return (matcher.match(match_text(hadith, "ar_normalized"), match_text(hadith, "en_normalized")),)
+
+
+@register_stage("animals", "animals.xlsx", ["animals"], dependencies=[ANIMALS_DICTIONARY_PATH])
+def animals_stage(hadith):
+    return (get_animals_dictionary().matcher().match(en_text=match_text(hadith, "en_normalized")),)
+
+
+@register_stage("plants", "plants.xlsx", ["plants"], dependencies=[PLANTS_DICTIONARY_PATH])
+def plants_stage(hadith):
+    return (get_plants_dictionary().matcher().match(en_text=match_text(hadith, "en_normalized")),)
+
+
+@register_stage("ayat", "ayat.xlsx", ["ayat"])
+def ayat_stage(hadith):
+    return (extract_coordinates_values(hadith["en_text"]),)
+
+
+# Function to get the texts annotated by the NER model
+@timed(NORMALIZATION)
+def ner_texts(hadith_df):
+    """
+    Returns the Arabic texts of a collection as sent to the NER model (see normalize_for_ner).
+
+    Args:
+        hadith_df (pd.DataFrame): The collection, as returned by load_corpus.
+
+    Returns:
+        list: The cleaned normalized Arabic text of each hadith.
+    """
+    return list(hadith_df[AR_CLEAN_NAME])
+
+
+# Function to run the selected stages over one collection
+def run_collection(hadith_df, collection="sb", stages=None, annotation_store=None,
+                   batch_size=DEFAULT_BATCH_SIZE, n_process=DEFAULT_N_PROCESS, match_mode=MATCH_SUBSTRINGS):
+    """
+    Runs the selected stages over a collection in a single pass, normalizing each hadith once.
+
+    Args:
+        hadith_df (pd.DataFrame): The collection, as returned by load_corpus.
+        collection (str, optional): The collection name. Defaults to "sb".
+        stages (list, optional): Names of the stages to run. Defaults to all registered stages.
+        annotation_store (NERAnnotationStore, optional): Store the NER entities are read from.
+            Defaults to the store of the collection.
+        batch_size (int, optional): Number of hadith per NER batch. Defaults to DEFAULT_BATCH_SIZE.
+        n_process (int, optional): Number of NER worker processes. Defaults to DEFAULT_N_PROCESS.
+        match_mode (str, optional): MATCH_SUBSTRINGS or MATCH_TOKENS, how dictionary patterns are
+            matched. Defaults to MATCH_SUBSTRINGS.
+
+    Returns:
+        dict: Result DataFrame of each stage.
+    """
+    stages = list(stages or STAGES)
+    ar_texts = list(hadith_df[AR_NORMALIZED_NAME])
+    ar_clean_texts = ner_texts(hadith_df)
+
+    # A single NER pass, shared by all NER stages
+    all_entities = None
+    if any(STAGES[name]["uses_entities"] for name in stages):
+        annotation_store = annotation_store or NERAnnotationStore(collection=collection)
+        all_entities = annotation_store.annotate(hadith_df, batch_size=batch_size, n_process=n_process,
+                                                 texts=ar_clean_texts)
+
+    rows = {name: [] for name in stages}
+    columns = zip(hadith_df[hadith_number_name], hadith_df[tarabic_name], hadith_df[english_name],
+                  ar_texts, ar_clean_texts, hadith_df[EN_NORMALIZED_NAME])
+    with tqdm(total=len(hadith_df), desc=f"Running pipeline on {collection}") as pbar:
+        for i, (hadith_number, ar_text, en_text, ar_normalized, ar_clean, en_normalized) in enumerate(columns):
+            hadith = {
+                "collection": collection,
+                "hadith_number": hadith_number,
+                "ar_text": ar_text,
+                "en_text": en_text,
+                "ar_normalized": ar_normalized,
+                "ar_clean": ar_clean,
+                "en_normalized": en_normalized,
+                "entities": all_entities[i] if all_entities is not None else None,
+                "match_mode": match_mode,
+                "token_indexes": {},
+            }
+            for name in stages:
+                rows[name].append((hadith_number,) + tuple(STAGES[name]["function"](hadith)))
+            pbar.update(1)
+
+    return {name: pd.DataFrame(rows[name], columns=["hadith_number"] + STAGES[name]["columns"])
+            for name in stages}
+
+
+# Function to fingerprint the dictionaries and models a stage depends on
+def stage_dependencies(stage, match_mode=MATCH_SUBSTRINGS):
+    """
+    Fingerprints the inputs of a stage other than the hadith texts.
+
+    Args:
+        stage (str): Name of the stage.
+        match_mode (str, optional): How dictionary patterns are matched. Defaults to MATCH_SUBSTRINGS.
+
+    Returns:
+        dict: Fingerprint of each dictionary file, for NER stages the NER model version and, for
+            dictionary stages matching whole words, the match mode.
+    """
+    dependencies = {path: file_fingerprint(path) for path in STAGES[stage]["dependencies"]}
+    if STAGES[stage]["uses_entities"]:
+        dependencies["ner_model"] = get_model_version("ner")
+    elif dependencies and match_mode != MATCH_SUBSTRINGS:
+        dependencies["match_mode"] = match_mode
+    return dependencies
+
+
+# Function to rerun the selected stages only where their inputs changed
+def run_collection_incremental(hadith_df, collection="sb", stages=None, annotation_store=None, state=None,
+                               save_result=True, output_dir=PIPELINE_OUTPUT_DIR,
+                               batch_size=DEFAULT_BATCH_SIZE, n_process=DEFAULT_N_PROCESS,
+                               match_mode=MATCH_SUBSTRINGS):
+    """
+    Patches the results of the last run, recomputing only the (hadith, stage) cells whose inputs changed.
+
+    A cell is recomputed when the hadith is new or its text changed, or when a dictionary, the
+    match mode or the NER model used by the stage changed. Recomputing a NER stage reuses the annotation store, so
+    the NER model only runs on hadith whose text changed.
+
+    Args:
+        hadith_df (pd.DataFrame): The collection, as returned by load_corpus.
+        collection (str, optional): The collection name. Defaults to "sb".
+        stages (list, optional): Names of the stages to run. Defaults to all registered stages.
+        annotation_store (NERAnnotationStore, optional): Store the NER entities are read from.
+            Defaults to the store of the collection.
+        state (IncrementalState, optional): Results of the last run. Defaults to the state kept in the
+            "incremental" directory of the output directory, so that every output directory has its own state.
+        save_result (bool, optional): Whether to save the outputs of the stages that changed. Defaults to True.
+        output_dir (str, optional): Output directory pattern. Defaults to PIPELINE_OUTPUT_DIR.
+        batch_size (int, optional): Number of hadith per NER batch. Defaults to DEFAULT_BATCH_SIZE.
+        n_process (int, optional): Number of NER worker processes. Defaults to DEFAULT_N_PROCESS.
+        match_mode (str, optional): How dictionary patterns are matched. Defaults to MATCH_SUBSTRINGS.
+
+    Returns:
+        dict: Result DataFrame of each stage.
+    """
+    stages = list(stages or STAGES)
+    state = state or IncrementalState(collection, os.path.join(output_dir, INCREMENTAL_STATE_SUBDIR))
+    if any(STAGES[name]["uses_entities"] for name in stages):
+        annotation_store = annotation_store or NERAnnotationStore(collection=collection)
+    hadith_keys = list(hadith_df[HADITH_KEY_NAME])
+    fingerprints = hadith_fingerprints(hadith_df)
+
+    results = {}
+    for stage in stages:
+        dependencies = stage_dependencies(stage, match_mode)
+        stale, up_to_date = state.stale_rows(stage, dependencies, hadith_keys, fingerprints)
+        print(f"{collection}/{stage}: {len(stale)} of {len(hadith_keys)} hadith to recompute")
+
+        recomputed = {}
+        if stale:
+            stale_df = hadith_df.iloc[stale]
+            stage_df = run_collection(stale_df, collection, [stage], annotation_store, batch_size, n_process,
+                                      match_mode)[stage]
+            recomputed = dict(zip(stale_df[HADITH_KEY_NAME], stage_df.itertuples(index=False, name=None)))
+
+        rows = [recomputed[key] if key in recomputed else up_to_date[key] for key in hadith_keys]
+        results[stage] = pd.DataFrame(rows, columns=["hadith_number"] + STAGES[stage]["columns"])
+
+        previous = state.load(stage)
+        if stale or previous is None or previous["hadith_keys"] != hadith_keys:
+            state.save(stage, dependencies, hadith_keys, fingerprints, results[stage])
+            if save_result:
+                save_stage_results({stage: results[stage]}, collection, output_dir)
+    return results
+
+
+# Function to save the outputs of the stages
+@timed(SERIALIZATION)
+def save_stage_results(results, collection="sb", output_dir=PIPELINE_OUTPUT_DIR):
+    """
+    Writes the result of each stage to its file.
+
+    Args:
+        results (dict): Result DataFrame of each stage.
+        collection (str, optional): The collection name. Defaults to "sb".
+        output_dir (str, optional): Output directory pattern. Defaults to PIPELINE_OUTPUT_DIR.
+    """
+    output_dir = output_dir.format(collection=collection)
+    os.makedirs(output_dir, exist_ok=True)
+    for name, result_df in results.items():
+        save_path = os.path.join(output_dir, STAGES[name]["output_file"])
+        result_df.to_excel(save_path, index=False)
+        print(f"Results saved to {save_path}")
+
+
+# Function to run the pipeline over several collections
+def run_pipeline(collections=COLLECTIONS, stages=None, save_result=True, output_dir=PIPELINE_OUTPUT_DIR,
+                 batch_size=DEFAULT_BATCH_SIZE, n_process=DEFAULT_N_PROCESS, incremental=False,
+                 match_mode=MATCH_SUBSTRINGS):
+    """
+    Runs the selected stages over each collection and writes all outputs at the end of each collection.
+
+    Args:
+        collections (list, optional): Collection names. Defaults to COLLECTIONS.
+        stages (list, optional): Names of the stages to run. Defaults to all registered stages.
+        save_result (bool, optional): Whether to save the outputs. Defaults to True.
+        output_dir (str, optional): Output directory pattern. Defaults to PIPELINE_OUTPUT_DIR.
+        batch_size (int, optional): Number of hadith per NER batch. Defaults to DEFAULT_BATCH_SIZE.
+        n_process (int, optional): Number of NER worker processes. Defaults to DEFAULT_N_PROCESS.
+        incremental (bool, optional): Whether to only recompute the cells whose inputs changed since
+            the last incremental run (see run_collection_incremental). Defaults to False.
+        match_mode (str, optional): MATCH_SUBSTRINGS or MATCH_TOKENS, how dictionary patterns are
+            matched. Defaults to MATCH_SUBSTRINGS.
+
+    Returns:
+        dict: Result DataFrames of each stage, per collection.
+    """
+    all_results = {}
+    for collection in collections:
+        hadith_df = load_corpus(collection)
+        if incremental:
+            all_results[collection] = run_collection_incremental(hadith_df, collection, stages,
+                                                                 save_result=save_result, output_dir=output_dir,
+                                                                 batch_size=batch_size, n_process=n_process,
+                                                                 match_mode=match_mode)
+            continue
+        results = run_collection(hadith_df, collection, stages, batch_size=batch_size, n_process=n_process,
+                                 match_mode=match_mode)
+        if save_result:
+            save_stage_results(results, collection, output_dir)
+        all_results[collection] = results
+    return all_results
+
+
+def _initialize_worker(model_names, quantized_ner=False):
+    """
+    Loads the given models once in a worker process, so that every task of the worker reuses them.
+
+    Args:
+        model_names (list): Names of the models in the model registry.
+        quantized_ner (bool, optional): Whether the NER model is the int8 quantized one. Defaults to False.
+    """
+    if quantized_ner:
+        use_quantized_ner_model()
+    for name in model_names:
+        get_model(name)
+
+
+def _annotate_chunk(texts, batch_size):
+    """
+    Annotates a chunk of hadith in a worker process.
+
+    Args:
+        texts (list): Texts normalized with normalize_for_ner.
+        batch_size (int): Number of hadith per NER batch.
+
+    Returns:
+        list: Resolved entities of each text.
+    """
+    return list(stream_resolved_entities(texts, batch_size=batch_size, n_process=1))
+
+
+def _run_stage_unit(collection, stage, save_result, output_dir, match_mode, ner_model_version):
+    """
+    Runs one stage over one collection in a worker process.
+
+    Args:
+        collection (str): The collection name.
+        stage (str): Name of the stage.
+        save_result (bool): Whether to save the output.
+        output_dir (str): Output directory pattern.
+        match_mode (str): How dictionary patterns are matched.
+        ner_model_version (str): Version of the NER model the annotation stores were filled with, so
+            that the worker reads them back instead of annotating the collection again.
+
+    Returns:
+        pd.DataFrame: The result of the stage.
+    """
+    annotation_store = None
+    if STAGES[stage]["uses_entities"]:
+        annotation_store = NERAnnotationStore(collection=collection, model_version=ner_model_version)
+    results = run_collection(load_corpus(collection), collection, [stage], annotation_store=annotation_store,
+                             match_mode=match_mode)
+    if save_result:
+        save_stage_results(results, collection, output_dir)
+    return results[stage]
+
+
+# Function to fill the annotation stores of several collections in parallel
+def annotate_collections_in_parallel(collections, workers, batch_size=DEFAULT_BATCH_SIZE,
+                                     chunk_size=ANNOTATION_CHUNK_SIZE, quantized_ner=False):
+    """
+    Annotates the hadith missing from the NER annotation stores, spreading chunks of hadith
+    over a pool of workers that each load the NER model once.
+
+    Args:
+        collections (list): Collection names.
+        workers (int): Number of worker processes.
+        batch_size (int, optional): Number of hadith per NER batch. Defaults to DEFAULT_BATCH_SIZE.
+        chunk_size (int, optional): Number of hadith per task. Defaults to ANNOTATION_CHUNK_SIZE.
+        quantized_ner (bool, optional): Whether the workers use the int8 quantized NER model. Defaults to False.
+    """
+    model_version = quantized_ner_model_version() if quantized_ner else get_model_version("ner")
+    stores = {}
+    chunks = []
+    for collection in collections:
+        hadith_df = load_corpus(collection)
+        store = NERAnnotationStore(collection=collection, model_version=model_version)
+        texts = zip(hadith_df[hadith_number_name], ner_texts(hadith_df))
+        missing = [(hadith_number, text) for hadith_number, text in texts if store.get(hadith_number, text) is None]
+        stores[collection] = store
+        chunks.extend((collection, missing[start:start + chunk_size]) for start in range(0, len(missing), chunk_size))
+
+    if not chunks:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker,
+                             initargs=(["ner"], quantized_ner)) as executor:
+        futures = [executor.submit(_annotate_chunk, [text for _, text in chunk], batch_size) for _, chunk in chunks]
+        with tqdm(total=len(futures), desc="Annotating hadith") as pbar:
+            # Chunks are merged in submission order, whatever order they finish in
+            for (collection, chunk), future in zip(chunks, futures):
+                for (hadith_number, text), resolved_entities in zip(chunk, future.result()):
+                    stores[collection].put(hadith_number, text, resolved_entities)
+                pbar.update(1)
+
+    for collection in sorted({collection for collection, _ in chunks}):
+        stores[collection].save()
+
+
+# Function to run the pipeline over several collections in parallel
+def run_pipeline_in_parallel(collections=COLLECTIONS, stages=None, workers=os.cpu_count(), save_result=True,
+                             output_dir=PIPELINE_OUTPUT_DIR, batch_size=DEFAULT_BATCH_SIZE,
+                             match_mode=MATCH_SUBSTRINGS, quantized_ner=False):
+    """
+    Runs the selected stages over each collection on a pool of worker processes.
+
+    NER annotation runs first, in chunks spread over the workers; every collection x stage pair
+    is then an independent work unit that writes its own output file.
+
+    Args:
+        collections (list, optional): Collection names. Defaults to COLLECTIONS.
+        stages (list, optional): Names of the stages to run. Defaults to all registered stages.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        save_result (bool, optional): Whether to save the outputs. Defaults to True.
+        output_dir (str, optional): Output directory pattern. Defaults to PIPELINE_OUTPUT_DIR.
+        batch_size (int, optional): Number of hadith per NER batch. Defaults to DEFAULT_BATCH_SIZE.
+        match_mode (str, optional): How dictionary patterns are matched. Defaults to MATCH_SUBSTRINGS.
+        quantized_ner (bool, optional): Whether NER annotation uses the int8 quantized model. Defaults to False.
+
+    Returns:
+        dict: Result DataFrames of each stage, per collection, in the order of collections and stages.
+    """
+    stages = list(stages or STAGES)
+
+    # Build the corpus caches once, before workers read them concurrently
+    for collection in collections:
+        load_corpus(collection)
+
+    if any(STAGES[name]["uses_entities"] for name in stages):
+        annotate_collections_in_parallel(collections, workers, batch_size, quantized_ner=quantized_ner)
+    ner_model_version = quantized_ner_model_version() if quantized_ner else get_model_version("ner")
+
+    units = [(collection, stage) for collection in collections for stage in stages]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_stage_unit, collection, stage, save_result, output_dir, match_mode,
+                                   ner_model_version)
+                   for collection, stage in units]
+        all_results = {collection: {} for collection in collections}
+        for (collection, stage), future in zip(units, futures):
+            all_results[collection][stage] = future.result()
+    return all_results
+
+
+# Function to parse the command line of the pipeline
+def parse_pipeline_arguments(argv=None):
+    """
+    Parses the command line options of the pipeline.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Extract entities from hadith collections.")
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), default=None,
+                        help="stages to run (default: all)")
+    parser.add_argument("--collections", nargs="+", default=COLLECTIONS,
+                        help="collections to process (default: %(default)s)")
+    parser.add_argument("--output-dir", default=PIPELINE_OUTPUT_DIR,
+                        help="output directory pattern (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="number of hadith per NER batch (default: %(default)s)")
+    parser.add_argument("--n-process", type=int, default=DEFAULT_N_PROCESS,
+                        help="number of NER worker processes (default: %(default)s)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only recompute results whose text, dictionary or NER model changed since the last run")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes running collection x stage units in parallel (default: %(default)s)")
+    parser.add_argument("--match-mode", choices=MATCH_MODES, default=MATCH_SUBSTRINGS,
+                        help="match dictionary patterns anywhere in the text, as the extractor scripts do, "
+                             "or on whole words only (default: %(default)s)")
+    parser.add_argument("--quantized-ner", action="store_true",
+                        help="run NER with the transformer quantized to int8 on the CPU (see ner_quantization.py)")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="JSON",
+                        help="time normalization, inference, entity resolution, dictionary matching and "
+                             "serialization, and print the summary or save it to JSON (main process only)")
+    args = parser.parse_args(argv)
+    if args.incremental and args.workers > 1:
+        parser.error("--incremental runs in a single process and cannot be combined with --workers")
+    return args
+
+
+def main(argv=None):
+    args = parse_pipeline_arguments(argv)
+    if args.profile is not None:
+        enable_profiling()
+    # Parallel runs load the quantized model in their annotation workers only
+    if args.quantized_ner and (args.incremental or args.workers <= 1):
+        use_quantized_ner_model()
+    if args.incremental:
+        results = run_pipeline(args.collections, args.stages, output_dir=args.output_dir,
+                               batch_size=args.batch_size, n_process=args.n_process, incremental=True,
+                               match_mode=args.match_mode)
+    elif args.workers > 1:
+        results = run_pipeline_in_parallel(args.collections, args.stages, args.workers, output_dir=args.output_dir,
+                                           batch_size=args.batch_size, match_mode=args.match_mode,
+                                           quantized_ner=args.quantized_ner)
+    else:
+        results = run_pipeline(args.collections, args.stages, output_dir=args.output_dir,
+                               batch_size=args.batch_size, n_process=args.n_process, match_mode=args.match_mode)
+    if args.profile:
+        dump_profile(args.profile)
+    elif args.profile is not None:
+        print_profile()
+    return results
+
+
+if __name__ == '__main__':
+    main()
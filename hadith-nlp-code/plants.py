@@ -1,38 +1,52 @@
+from functools import lru_cache
 import pandas as pd
 from tqdm import tqdm
-from pyarabic.araby import strip_tashkeel
+from normalization import strip_tashkeel
+from dictionary_matcher import DictionaryMatcher, load_dictionary, MATCH_EN
 from utility import tarabic_name, hadith_number_name, strip_punctuation, english_name
+from profiling import timed, NORMALIZATION, SERIALIZATION
 
 # Load the dictionary of plants
 PLANTS_DICTIONARY_PATH = 'dictionaries/plants.csv'
-df_plants = pd.read_csv(PLANTS_DICTIONARY_PATH)
 
 
-def find_plants_in_one_hadith(ar_text, en_text, df=df_plants):
+# Function to load the compiled dictionary of plants on first use
+@lru_cache(maxsize=None)
+def get_plants_dictionary():
+    """
+    Loads the compiled dictionary of plants once per process, so that importing the module reads no file.
+
+    Returns:
+        CompiledDictionary: The plants dictionary.
+    """
+    return load_dictionary(PLANTS_DICTIONARY_PATH, policy=MATCH_EN, separator='-')
+
+
+def find_plants_in_one_hadith(ar_text, en_text, df=None):
     """
     Identifies mentions of plants in a single hadith using English patterns.
 
     Args:
         ar_text (str): Arabic text of the hadith.
         en_text (str): English text of the hadith.
-        df (pd.DataFrame): DataFrame containing patterns and IDs for plants.
+        df (pd.DataFrame, optional): DataFrame containing patterns and IDs for plants.
+            Defaults to the compiled plants dictionary.
 
     Returns:
         list: A list of IDs corresponding to plants mentioned in the hadith.
     """
     # Preprocess Arabic and English text
-    ar_text = strip_tashkeel(strip_punctuation(ar_text))
-    en_text = strip_punctuation(en_text)
+    with timed(NORMALIZATION):
+        ar_text = strip_tashkeel(strip_punctuation(ar_text))
+        en_text = strip_punctuation(en_text)
 
-    plant_list = []
+    if df is None:
+        matcher = get_plants_dictionary().matcher()
+    else:
+        matcher = DictionaryMatcher.from_dataframe(df, policy=MATCH_EN, separator='-')
 
     # Check for matches in the English patterns
-    for _, row in df.iterrows():
-        en_patterns = row['en'].split('-')
-        if any(pattern.lower() in en_text.lower() for pattern in en_patterns):
-            plant_list.append(row['ID'])
-
-    return plant_list
+    return matcher.match(en_text=en_text)
 
 
 def find_plants_mentioned_in_all_hadith(hadith_df, save_result=False, save_file_path=""):
@@ -81,7 +95,8 @@ def find_plants_mentioned_in_all_hadith(hadith_df, save_result=False, save_file_
 
     # Save results to an Excel file if requested
     if save_result and save_file_path:
-        result_df.to_excel(save_file_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_file_path, index=False)
         print(f"Results saved to {save_file_path}")
 
     return result_df
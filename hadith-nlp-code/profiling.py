@@ -0,0 +1,228 @@
+import atexit
+import json
+import os
+import time
+from functools import wraps
+
+# Profiled stages
+NORMALIZATION = "normalization"
+INFERENCE = "inference"
+ENTITY_RESOLUTION = "entity_resolution"
+DICTIONARY_MATCHING = "dictionary_matching"
+SIMILARITY_COMPUTATION = "similarity_computation"
+SERIALIZATION = "serialization"
+
+# Environment variable enabling profiling for a whole run: "1" prints the summary at exit,
+# a path ending in ".json" dumps it there instead
+PROFILING_ENV_VAR = "HADITH_NLP_PROFILE"
+
+# Cumulative time and number of calls of each stage, and the stages being timed, innermost last
+_totals = {}
+_calls = {}
+_stack = []
+_enabled = False
+
+
+class timed:
+    """
+    Times a stage, as a context manager or as a function decorator.
+
+        with timed(NORMALIZATION):
+            text = strip_tashkeel(text)
+
+        @timed(DICTIONARY_MATCHING)
+        def match(...):
+
+    A stage only accumulates its own time: while a nested stage runs, the enclosing stage is
+    paused, so the stage totals add up to the profiled wall time. A stage nested in itself is
+    timed once. When profiling is disabled, the cost is a flag check.
+    """
+
+    __slots__ = ("stage", "pushed")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.pushed = False
+
+    def __enter__(self):
+        # Profiling may be switched on or off inside the block, so only the frame pushed here is popped
+        self.pushed = _enabled
+        if self.pushed:
+            _start(self.stage)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.pushed:
+            self.pushed = False
+            _stop()
+
+    def __call__(self, function):
+        stage = self.stage
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            _start(stage)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _stop()
+        return wrapper
+
+
+def _running_frame():
+    # Index of the innermost frame that is not a reentrant call
+    for i in range(len(_stack) - 1, -1, -1):
+        if _stack[i][1] is not None:
+            return i
+    return None
+
+
+def _start(stage):
+    now = time.perf_counter()
+    if _stack and _stack[-1][0] == stage:
+        # Reentrant call: the stage keeps running
+        _stack.append((stage, None))
+        return
+    i = _running_frame()
+    if i is not None:
+        # Pause the enclosing stage
+        outer_stage, resumed = _stack[i]
+        _totals[outer_stage] = _totals.get(outer_stage, 0.0) + now - resumed
+    _stack.append((stage, now))
+
+
+def _stop():
+    now = time.perf_counter()
+    stage, resumed = _stack.pop()
+    if resumed is None:
+        return
+    _totals[stage] = _totals.get(stage, 0.0) + now - resumed
+    _calls[stage] = _calls.get(stage, 0) + 1
+    i = _running_frame()
+    if i is not None:
+        # Resume the enclosing stage
+        _stack[i] = (_stack[i][0], now)
+
+
+# Function to time each item produced by an iterable
+def timed_iter(stage, iterable):
+    """
+    Times the production of each item of an iterable, e.g. the documents streamed by nlp.pipe.
+
+    Args:
+        stage (str): The stage the time is attributed to.
+        iterable (iterable): The iterable to time.
+
+    Returns:
+        iterable: The iterable itself when profiling is disabled, otherwise a generator of its items.
+    """
+    if not _enabled:
+        return iterable
+    return _timed_items(stage, iter(iterable))
+
+
+def _timed_items(stage, iterator):
+    while True:
+        with timed(stage):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def enable_profiling(enabled=True):
+    """
+    Turns the timing of stages on or off.
+
+    Args:
+        enabled (bool, optional): Whether stages are timed. Defaults to True.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def profiling_enabled():
+    """
+    Returns:
+        bool: Whether stages are timed.
+    """
+    return _enabled
+
+
+def reset_profile():
+    """
+    Clears the recorded timings.
+    """
+    _totals.clear()
+    _calls.clear()
+
+
+# Function to summarize the recorded timings
+def profile_summary():
+    """
+    Summarizes the time spent in each stage, slowest first.
+
+    Returns:
+        list: One dict per stage with its number of calls, total seconds, mean milliseconds per call
+            and share of the profiled time in percent.
+    """
+    profiled_time = sum(_totals.values())
+    summary = []
+    for stage, total in sorted(_totals.items(), key=lambda item: item[1], reverse=True):
+        calls = _calls.get(stage, 0)
+        summary.append({
+            "stage": stage,
+            "calls": calls,
+            "total_seconds": round(total, 6),
+            "mean_ms": round(total / calls * 1000, 4) if calls else None,
+            "percent": round(total / profiled_time * 100, 2) if profiled_time else 0.0,
+        })
+    return summary
+
+
+def print_profile():
+    """
+    Prints the summary of the recorded timings as a table.
+    """
+    print(f"{'stage':<24}{'calls':>12}{'total (s)':>14}{'mean (ms)':>14}{'%':>9}")
+    for row in profile_summary():
+        mean_ms = f"{row['mean_ms']:.4f}" if row["mean_ms"] is not None else "-"
+        print(f"{row['stage']:<24}{row['calls']:>12}{row['total_seconds']:>14.3f}{mean_ms:>14}{row['percent']:>9.2f}")
+
+
+def dump_profile(file_path):
+    """
+    Saves the summary of the recorded timings as JSON.
+
+    Args:
+        file_path (str): Path of the JSON file.
+    """
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(profile_summary(), file, indent=2)
+    print(f"Profile saved to {file_path}")
+
+
+# Function to report the profile when the process exits
+def report_profile_at_exit(file_path=""):
+    """
+    Enables profiling and reports the summary when the process exits.
+
+    Args:
+        file_path (str, optional): JSON file the summary is dumped to. Defaults to printing it.
+    """
+    enable_profiling()
+    if file_path:
+        atexit.register(dump_profile, file_path)
+    else:
+        atexit.register(print_profile)
+
+
+_profile_setting = os.environ.get(PROFILING_ENV_VAR, "")
+if _profile_setting and _profile_setting != "0":
+    report_profile_at_exit(_profile_setting if _profile_setting.endswith(".json") else "")
@@ -1,13 +1,37 @@
+from functools import lru_cache
 import pandas as pd
 from tqdm import tqdm
-from pyarabic.araby import strip_tashkeel
+from normalization import strip_tashkeel
+from dictionary_matcher import CompiledDictionary, load_dictionary, MATCH_AR_AND_EN, MATCH_AR
 from utility import tarabic_name, hadith_number_name, strip_punctuation, english_name
+from profiling import timed, NORMALIZATION, DICTIONARY_MATCHING, SERIALIZATION
 
 # Load the dictionary of prophets
 PROPHETS_DICTIONARY_PATH = 'dictionaries/prophets.xlsx'
-df_prophets = pd.read_excel(PROPHETS_DICTIONARY_PATH)
 
+# Other collections only rely on the Arabic text, where "Adam" is too ambiguous, while Sahih Bukhari
+# has English translations aligned with the Arabic text, so both must match
+PROPHETS_MATCH_POLICIES = {"policy": MATCH_AR, "exclude_ids": ["Adam"],
+                           "collection_policies": {"sb": (MATCH_AR_AND_EN, ())}}
 
+
+# Function to load the compiled dictionary of prophets on first use
+@lru_cache(maxsize=None)
+def get_prophets_dictionary():
+    """
+    Loads the compiled dictionary of prophets once per process, so that importing the module reads no file.
+
+    Returns:
+        CompiledDictionary: The prophets dictionary.
+    """
+    return load_dictionary(PROPHETS_DICTIONARY_PATH, **PROPHETS_MATCH_POLICIES)
+
+
+# Honorific phrase following the name of Prophet Muhammad (PBUH), without diacritics
+MUHAMMAD_HONORIFIC = strip_tashkeel("صَلَّى اللَّهُ عَلَيْهِ وَسَلَّمَ")
+
+
+@timed(DICTIONARY_MATCHING)
 def find_muhammad(ar_text):
     """
     Checks if the honorific phrase for Prophet Muhammad (PBUH) is present in the Arabic text.
@@ -18,12 +42,11 @@ def find_muhammad(ar_text):
     Returns:
         bool: True if the phrase is found, False otherwise.
     """
-    pattern = strip_tashkeel("صَلَّى اللَّهُ عَلَيْهِ وَسَلَّمَ")
     ar_text = strip_tashkeel(ar_text)
-    return pattern in ar_text
+    return MUHAMMAD_HONORIFIC in ar_text
 
 
-def find_prophets_in_one_hadith(ar_text, en_text, collection="sb", df=df_prophets):
+def find_prophets_in_one_hadith(ar_text, en_text, collection="sb", df=None):
     """
     Identifies mentions of prophets in a single hadith using Arabic and English patterns.
 
@@ -31,30 +54,23 @@ def find_prophets_in_one_hadith(ar_text, en_text, collection="sb", df=df_prophet
         ar_text (str): Arabic text of the hadith.
         en_text (str): English text of the hadith.
         collection (str, optional): Collection type. Defaults to "sb".
-        df (pd.DataFrame): DataFrame containing patterns and IDs for prophets.
+        df (pd.DataFrame, optional): DataFrame containing patterns and IDs for prophets.
+            Defaults to the compiled prophets dictionary.
 
     Returns:
         list: A list of IDs corresponding to prophets mentioned in the hadith.
     """
     # Preprocess Arabic text
-    ar_text = strip_tashkeel(strip_punctuation(ar_text))
-
-    prophets_list = []
-
-    for _, row in df.iterrows():
-        ar_patterns = strip_tashkeel(row['ar']).split(',')
-
-        if collection == "sb":  # Handle the "sb" collection case
-            en_patterns = row['en'].split(',')
-            flag = any(pattern.lower() in en_text.lower() for pattern in en_patterns)
-            flag = flag and any(pattern in ar_text for pattern in ar_patterns)
-        else:  # Handle other collections
-            flag = row['ID'] != "Adam" and any(pattern in ar_text for pattern in ar_patterns)
+    with timed(NORMALIZATION):
+        ar_text = strip_tashkeel(strip_punctuation(ar_text))
 
-        if flag:
-            prophets_list.append(row['ID'])
+    if df is None:
+        dictionary = get_prophets_dictionary()
+    else:
+        dictionary = CompiledDictionary.from_dataframe(df, **PROPHETS_MATCH_POLICIES)
 
-    return prophets_list
+    # The English text is only checked in the "sb" collection
+    return dictionary.match(ar_text, en_text, collection)
 
 
 def find_prophets_mentioned_in_all_hadith(hadith_df, save_result=False, collection="sb"):
@@ -104,7 +120,8 @@ def find_prophets_mentioned_in_all_hadith(hadith_df, save_result=False, collecti
     # Save results to an Excel file if requested
     if save_result:
         save_path = f"results/{collection}/prophets.xlsx"
-        result_df.to_excel(save_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_path, index=False)
         print(f"Results saved to {save_path}")
 
     return result_df
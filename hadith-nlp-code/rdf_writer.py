@@ -0,0 +1,278 @@
+import gzip
+import os
+from array import array
+import numpy as np
+
+# Size of the write buffer of RDF output files
+WRITE_BUFFER_SIZE = 1 << 20
+
+# File extension of each output format
+RDF_FORMATS = {"ttl": ".ttl", "nt": ".nt", "npz": ".npz"}
+
+
+class TurtleWriter:
+    """
+    Streams Turtle statements to a file as they are produced.
+
+    The writer has the append method of the list of TTL strings used by generate_rdf, so
+    the append_*_ttl functions can write to it directly. Statements are separated by a
+    blank line, without a trailing newline, as with '\\n\\n'.join(ttl_strings).
+    """
+
+    def __init__(self, file_path, compress=False, separator="\n\n"):
+        """
+        Args:
+            file_path (str): Path of the output file; ".gz" is appended when compressing.
+            compress (bool, optional): Whether to write gzip-compressed output. Defaults to False.
+            separator (str, optional): Text written between statements. Defaults to a blank line.
+        """
+        self.file_path = file_path + ".gz" if compress else file_path
+        self.separator = separator
+        self.statement_count = 0
+        if compress:
+            self.file = gzip.open(self.file_path, "wt", encoding="utf-8")
+        else:
+            self.file = open(self.file_path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE)
+
+    def append(self, statement):
+        """
+        Writes a statement.
+
+        Args:
+            statement (str): Turtle statement(s).
+        """
+        if self.statement_count:
+            self.file.write(self.separator)
+        self.file.write(statement)
+        self.statement_count += 1
+
+    def close(self):
+        """
+        Flushes and closes the output file.
+        """
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# Function to split a Turtle statement of generate_rdf into triples
+def turtle_triples(statement, prefixes):
+    """
+    Splits a statement of the form "s p o1, o2 ." into triples of absolute IRIs.
+
+    Only the statements written by generate_rdf are supported: prefixed names as subject,
+    predicate and objects, with objects separated by ", ".
+
+    Args:
+        statement (str): Turtle statement.
+        prefixes (dict): Namespace IRI of each prefix, e.g. {"": "http://www.semantichadith.com/ontology/"}.
+
+    Returns:
+        list: Triples (subject, predicate, object) as "<iri>" strings.
+    """
+    subject, predicate, objects = statement.rstrip(" .").split(" ", 2)
+    subject, predicate = expand_name(subject, prefixes), expand_name(predicate, prefixes)
+    return [(subject, predicate, expand_name(obj, prefixes)) for obj in objects.split(", ")]
+
+
+# Function to expand a prefixed name
+def expand_name(name, prefixes):
+    """
+    Expands a prefixed name such as ":Makkah" into an N-Triples IRI.
+
+    Args:
+        name (str): Prefixed name, or an IRI already in angle brackets.
+        prefixes (dict): Namespace IRI of each prefix.
+
+    Returns:
+        str: The IRI in angle brackets.
+    """
+    if name.startswith("<"):
+        return name
+    prefix, local_name = name.split(":", 1)
+    return f"<{prefixes[prefix]}{local_name}>"
+
+
+# Function to read the @prefix directives of a Turtle header
+def parse_prefixes(header):
+    """
+    Reads the namespaces declared by "@prefix p: <iri> ." lines.
+
+    Args:
+        header (str): Turtle directives, one per line.
+
+    Returns:
+        dict: Namespace IRI of each prefix.
+    """
+    prefixes = {}
+    for line in header.splitlines():
+        if line.startswith("@prefix"):
+            _, prefix, iri = line.rstrip(" .").split(" ", 2)
+            prefixes[prefix.rstrip(":")] = iri.strip("<>")
+    return prefixes
+
+
+class NTriplesWriter:
+    """
+    Streams the Turtle statements of generate_rdf as N-Triples, one triple per line.
+
+    Like TurtleWriter, statements are given to append. Directives (@prefix, @base) are not
+    written but used to expand prefixed names. With shard_size, the output is split into
+    files of at most shard_size triples each, named <name>-0000.nt, <name>-0001.nt, ...,
+    which a triple store can load concurrently.
+    """
+
+    def __init__(self, file_path, compress=False, shard_size=None):
+        """
+        Args:
+            file_path (str): Path of the output file; ".gz" is appended when compressing.
+            compress (bool, optional): Whether to write gzip-compressed output. Defaults to False.
+            shard_size (int, optional): Maximum number of triples per file. Defaults to a single file.
+        """
+        self.file_path = file_path
+        self.compress = compress
+        self.shard_size = shard_size
+        self.prefixes = {}
+        self.triple_count = 0
+        self.file_paths = []
+        self.file = None
+
+    def _open_next_file(self):
+        if self.file is not None:
+            self.file.close()
+        file_path = self.file_path
+        if self.shard_size:
+            root, extension = os.path.splitext(self.file_path)
+            file_path = f"{root}-{len(self.file_paths):04d}{extension}"
+        if self.compress:
+            file_path += ".gz"
+            self.file = gzip.open(file_path, "wt", encoding="utf-8")
+        else:
+            self.file = open(file_path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE)
+        self.file_paths.append(file_path)
+
+    def append(self, statement):
+        """
+        Writes the triples of a statement.
+
+        Args:
+            statement (str): Turtle statement, or Turtle directives.
+        """
+        if statement.startswith("@"):
+            self.prefixes.update(parse_prefixes(statement))
+            return
+        for subject, predicate, obj in turtle_triples(statement, self.prefixes):
+            if self.file is None or (self.shard_size and self.triple_count % self.shard_size == 0):
+                self._open_next_file()
+            self.file.write(f"{subject} {predicate} {obj} .\n")
+            self.triple_count += 1
+
+    def close(self):
+        """
+        Flushes and closes the current output file.
+        """
+        if self.file is None:
+            self._open_next_file()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class BinaryTripleWriter:
+    """
+    Collects the Turtle statements of generate_rdf into a compact binary triple dump.
+
+    The dump is a NumPy .npz archive with two arrays: "terms", the distinct IRIs, and
+    "triples", one row (subject, predicate, object) of uint32 indexes into terms per triple.
+    """
+
+    def __init__(self, file_path, compress=False):
+        """
+        Args:
+            file_path (str): Path of the .npz output file.
+            compress (bool, optional): Whether to compress the archive. Defaults to False.
+        """
+        self.file_path = file_path
+        self.compress = compress
+        self.prefixes = {}
+        self.term_ids = {}
+        self.triples = array("I")
+
+    def _term_id(self, term):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            term_id = self.term_ids[term] = len(self.term_ids)
+        return term_id
+
+    def append(self, statement):
+        """
+        Adds the triples of a statement.
+
+        Args:
+            statement (str): Turtle statement, or Turtle directives.
+        """
+        if statement.startswith("@"):
+            self.prefixes.update(parse_prefixes(statement))
+            return
+        for triple in turtle_triples(statement, self.prefixes):
+            self.triples.extend(self._term_id(term) for term in triple)
+
+    def close(self):
+        """
+        Writes the archive.
+        """
+        terms = np.array([term[1:-1] for term in self.term_ids], dtype=str)
+        triples = np.frombuffer(self.triples, dtype=np.uint32).reshape(-1, 3)
+        save = np.savez_compressed if self.compress else np.savez
+        save(self.file_path, terms=terms, triples=triples)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# Function to read back a binary triple dump
+def load_binary_triples(file_path):
+    """
+    Loads a dump written by BinaryTripleWriter.
+
+    Args:
+        file_path (str): Path of the .npz file.
+
+    Returns:
+        tuple: The terms (np.ndarray of str) and the triples (np.ndarray of uint32, shape (n, 3)).
+    """
+    with np.load(file_path) as archive:
+        return archive["terms"], archive["triples"]
+
+
+# Function to open the writer of an output format
+def open_rdf_writer(file_path, output_format="ttl", compress=False, shard_size=None):
+    """
+    Opens a writer for the statements of generate_rdf.
+
+    Args:
+        file_path (str): Path of the output file, without extension.
+        output_format (str, optional): One of RDF_FORMATS. Defaults to "ttl".
+        compress (bool, optional): Whether to compress the output. Defaults to False.
+        shard_size (int, optional): Maximum number of triples per N-Triples file. Defaults to a single file.
+
+    Returns:
+        TurtleWriter, NTriplesWriter or BinaryTripleWriter: The writer.
+    """
+    file_path += RDF_FORMATS[output_format]
+    if output_format == "nt":
+        return NTriplesWriter(file_path, compress=compress, shard_size=shard_size)
+    if output_format == "npz":
+        return BinaryTripleWriter(file_path, compress=compress)
+    return TurtleWriter(file_path, compress=compress)
@@ -1,60 +1,79 @@
 import pandas as pd
 import tqdm
-from pyarabic.araby import strip_tashkeel
-import re
-from sklearn.metrics.pairwise import euclidean_distances, manhattan_distances, cosine_similarity
+from normalization import strip_tashkeel, normalize_series, NON_ALPHANUMERIC_PATTERN
 import ast
 #from scipy.spatial.distance import minkowski, jaccard, hamming, jensenshannon
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
-from utility import tarabic_name, hadith_number_name, strip_punctuation, english_name, play_default_sound, \
-    save_matrix_to_csv
+import os
+from corpus import AR_NORMALIZED_NAME
+from utility import tarabic_name, hadith_number_name, english_name, play_default_sound, \
+    save_matrix_to_csv, save_matrix_to_npy, load_matrix_from_npy, SIMILARITY_MEASURES_DIR
+from model_registry import get_sentence_model
+from profiling import timed, NORMALIZATION, INFERENCE, SIMILARITY_COMPUTATION, SERIALIZATION
+from vector_store import save_vector_store, load_vector_store, VECTOR_STORE_DIR
 
-modelPath = "trained_models/transformer_models/"
+# Number of sentences sent to the encoders at once in batched mode
+ENCODING_BATCH_SIZE = 64
 
-# Load pre-trained BERT model
-english_model = SentenceTransformer(modelPath+"en")#('paraphrase-MiniLM-L6-v2')
-english_model.save(modelPath+"en")
-arabic_model = SentenceTransformer(modelPath+"ar")#('asafaya/bert-base-arabic')
-arabic_model.save(modelPath+"ar")
+# Kind of matrix each calculate_*_similarity function saves, part of the matrix file names
+MATRIX_KINDS = {"cosine": "similarity", "euclidean": "distance", "manhattan": "distance"}
+
+# Pre-trained BERT models are loaded on first use
+# (paraphrase-MiniLM-L6-v2 for English, asafaya/bert-base-arabic for Arabic)
 
 def get_english_encoding(sentence):
     #sentence = str(sentence)
     #print(sentence)
-    cleaned_text = re.sub(r'[^a-zA-Z0-9\s]', '', sentence)
-    embedding = english_model.encode(cleaned_text, convert_to_tensor=True)
+    with timed(NORMALIZATION):
+        cleaned_text = NON_ALPHANUMERIC_PATTERN.sub('', sentence)
+    with timed(INFERENCE):
+        embedding = get_sentence_model("en").encode(cleaned_text, convert_to_tensor=True)
     return embedding
 
 def get_arabic_encoding(sentence):
     #sentence = str(sentence)
     #print(sentence)
-    cleaned_text = strip_tashkeel(sentence)
-    embedding = arabic_model.encode(cleaned_text, convert_to_tensor=True)
+    with timed(NORMALIZATION):
+        cleaned_text = strip_tashkeel(sentence)
+    with timed(INFERENCE):
+        embedding = get_sentence_model("ar").encode(cleaned_text, convert_to_tensor=True)
     return embedding
 
 
+# Function to get the texts sent to the sentence encoders
+@timed(NORMALIZATION)
+def encoding_texts(hadith_df):
+    """
+    Normalizes the Arabic and English texts of a collection for the sentence encoders, once per collection.
+
+    The normalized Arabic column of load_corpus is reused when present.
 
+    Args:
+        hadith_df (pd.DataFrame): DataFrame containing hadith texts in Arabic and English.
+
+    Returns:
+        tuple: Arabic texts without punctuation and diacritics, and English texts with only
+            letters, digits and spaces, as lists.
+    """
+    if AR_NORMALIZED_NAME in hadith_df:
+        ar_texts = hadith_df[AR_NORMALIZED_NAME].tolist()
+    else:
+        ar_texts = normalize_series(hadith_df[tarabic_name], "ar").tolist()
+    en_texts = normalize_series(hadith_df[english_name], "en_clean").tolist()
+    return ar_texts, en_texts
 
 
 def encode_all_hadith(hadith_df, save_result=False, save_file_path=""):
     all_similarities = []
     issues = []
     all_encodings = []
+    # The whole collection is normalized once, before the encoding loop
+    ar_texts, en_texts = encoding_texts(hadith_df)
     try:
         with tqdm.tqdm(total=len(hadith_df), desc=f'Generating encodings') as pbar:
-            # Iterate over each row in the DataFrame
-            for index, row in hadith_df.iterrows():
-                # Iterate over the values in the row until NaN is encountered
-                # l1 = []
-                hid = int(row[hadith_number_name])
-
-                ar_text = row[tarabic_name]
-                en_text = row[english_name]
-
-                ar_text = strip_punctuation(ar_text)
-                ar_text = strip_tashkeel(ar_text)
-
-                en_text = strip_punctuation(en_text)
+            # Iterate over each hadith
+            for hid, ar_text, en_text in zip(hadith_df[hadith_number_name], ar_texts, en_texts):
+                hid = int(hid)
 
                 eng_hid_encoding = get_english_encoding(en_text)
                 ar_hid_encoding = get_arabic_encoding(ar_text)
@@ -73,113 +92,170 @@ def encode_all_hadith(hadith_df, save_result=False, save_file_path=""):
 
     if save_result:
         # Write to CSV
-        result_df.to_excel(save_file_path, index=False)
+        with timed(SERIALIZATION):
+            result_df.to_excel(save_file_path, index=False)
 
     return result_df
 
 
-def calculate_cosine_similarity(file_path="results/buhkari_encodings.xlsx"):
-    df_encodings=pd.read_excel(file_path)
-    # # Extract vectors from DataFrame
-    # Assuming df is your DataFrame and encodings_column is the column containing string representations of lists
-    df_encodings['ar_encodings'] = df_encodings['ar_encodings'].apply(ast.literal_eval)
-    df_encodings['eng_encodings'] = df_encodings['eng_encodings'].apply(ast.literal_eval)
-    # Extract tensors from DataFrame
-    ar_vectors = np.array(df_encodings['ar_encodings'].tolist(), dtype=float)#np.array(df_encodings['ar_encodings'])
-    eng_vectors = np.array(df_encodings['eng_encodings'].tolist(), dtype=float)#np.array(df_encodings['eng_encodings'])
+def encode_all_hadith_batched(hadith_df, save_result=False, save_dir=VECTOR_STORE_DIR, batch_size=ENCODING_BATCH_SIZE):
+    """
+    Encodes all hadith in batches and optionally saves them to a binary vector store.
 
-    # Cosine Similarity
-    cosine_similarity_matrix_ar = cosine_similarity(ar_vectors)
-    cosine_similarity_matrix_ar = np.round(cosine_similarity_matrix_ar, 5)
-    save_matrix_to_csv(cosine_similarity_matrix_ar, 'cosine_similarity_arabic.csv')
-    play_default_sound()
-    cosine_similarity_matrix_eng = cosine_similarity(eng_vectors)
-    cosine_similarity_matrix_eng = np.round(cosine_similarity_matrix_eng, 5)
-    save_matrix_to_csv(cosine_similarity_matrix_eng, 'cosine_similarity_english.csv')
-    play_default_sound()
+    Args:
+        hadith_df (pd.DataFrame): DataFrame containing hadith texts in Arabic and English.
+        save_result (bool, optional): Whether to save the encodings. Defaults to False.
+        save_dir (str, optional): Directory of the vector store. Defaults to VECTOR_STORE_DIR.
+        batch_size (int, optional): Number of sentences per encoder batch. Defaults to ENCODING_BATCH_SIZE.
+
+    Returns:
+        tuple: Arabic vectors, English vectors and hadith IDs as NumPy arrays.
+    """
+    hadith_ids = hadith_df[hadith_number_name].astype(int).to_numpy()
 
+    # Apply the same cleaning as the per-hadith encoders
+    ar_texts, en_texts = encoding_texts(hadith_df)
+
+    try:
+        with timed(INFERENCE):
+            ar_vectors = get_sentence_model("ar").encode(ar_texts, batch_size=batch_size, convert_to_numpy=True,
+                                             show_progress_bar=True).astype(np.float32)
+            eng_vectors = get_sentence_model("en").encode(en_texts, batch_size=batch_size, convert_to_numpy=True,
+                                               show_progress_bar=True).astype(np.float32)
+    finally:
+        play_default_sound()
 
+    if save_result:
+        with timed(SERIALIZATION):
+            save_vector_store(save_dir, hadith_ids, ar_vectors, eng_vectors)
 
-def calculate_euclidean_similarity(file_path="results/buhkari_encodings.xlsx"):
-    df_encodings=pd.read_excel(file_path)
-    # # Extract vectors from DataFrame
-    # Assuming df is your DataFrame and encodings_column is the column containing string representations of lists
-    df_encodings['ar_encodings'] = df_encodings['ar_encodings'].apply(ast.literal_eval)
-    df_encodings['eng_encodings'] = df_encodings['eng_encodings'].apply(ast.literal_eval)
-    # Extract tensors from DataFrame
-    ar_vectors = np.array(df_encodings['ar_encodings'].tolist(), dtype=float)#np.array(df_encodings['ar_encodings'])
-    eng_vectors = np.array(df_encodings['eng_encodings'].tolist(), dtype=float)#np.array(df_encodings['eng_encodings'])
+    return ar_vectors, eng_vectors, hadith_ids
 
-    # Euclidean Distance
-    euclidean_dist_matrix_ar = euclidean_distances(ar_vectors)
-    euclidean_dist_matrix_ar = np.round(euclidean_dist_matrix_ar)
-    save_matrix_to_csv(euclidean_dist_matrix_ar, 'euclidean_distance_arabic.csv')
+
+@timed(SERIALIZATION)
+def load_hadith_encodings(file_path=VECTOR_STORE_DIR):
+    """
+    Loads the Arabic and English encodings of all hadith.
+
+    Binary vector stores are memory-mapped, so no copy of the vectors is made. Legacy Excel
+    files written by encode_all_hadith are still supported but have to be parsed.
+
+    Args:
+        file_path (str, optional): Vector store directory or legacy Excel file. Defaults to VECTOR_STORE_DIR.
+
+    Returns:
+        tuple: Arabic vectors, English vectors and hadith IDs.
+    """
+    if not file_path.endswith(".xlsx"):
+        return load_vector_store(file_path)
+
+    df_encodings = pd.read_excel(file_path)
+    # Encodings are stored as string representations of lists
+    ar_vectors = np.array(df_encodings['ar_encodings'].apply(ast.literal_eval).tolist(), dtype=float)
+    eng_vectors = np.array(df_encodings['eng_encodings'].apply(ast.literal_eval).tolist(), dtype=float)
+    hadith_ids = df_encodings['hadith_number'].to_numpy()
+    return ar_vectors, eng_vectors, hadith_ids
+
+
+@timed(SERIALIZATION)
+def save_similarity_matrix(matrix, filename, matrix_format="csv"):
+    """
+    Saves a similarity or distance matrix as text CSV or as a binary .npy file.
+
+    Args:
+        matrix (np.ndarray): The matrix to save.
+        filename (str): CSV filename of the matrix; the extension is replaced for .npy files.
+        matrix_format (str, optional): "csv" or "npy". Defaults to "csv".
+    """
+    if matrix_format == "npy":
+        save_matrix_to_npy(matrix, os.path.splitext(filename)[0] + ".npy")
+    else:
+        save_matrix_to_csv(matrix, filename)
+
+
+@timed(SERIALIZATION)
+def load_similarity_matrix(measure, language, directory=SIMILARITY_MEASURES_DIR):
+    """
+    Loads a similarity or distance matrix, memory-mapping the binary .npy version when it exists.
+
+    Args:
+        measure (str): The measure, e.g. "cosine"; see MATRIX_KINDS.
+        language (str): "arabic" or "english".
+        directory (str, optional): Directory of the matrices. Defaults to SIMILARITY_MEASURES_DIR, where
+            the calculate_*_similarity functions save them.
+
+    Returns:
+        np.ndarray: The matrix; cells of .npy files are only read when accessed.
+    """
+    base_path = os.path.join(directory, f"{measure}_{MATRIX_KINDS.get(measure, 'similarity')}_{language}")
+    if os.path.exists(base_path + ".npy"):
+        return load_matrix_from_npy(base_path + ".npy")
+    return pd.read_csv(base_path + ".csv", header=None).to_numpy()
+
+
+def calculate_cosine_similarity(file_path=VECTOR_STORE_DIR, matrix_format="csv"):
+    from sklearn.metrics.pairwise import cosine_similarity
+    ar_vectors, eng_vectors, _ = load_hadith_encodings(file_path)
+
+    # Cosine Similarity
+    with timed(SIMILARITY_COMPUTATION):
+        cosine_similarity_matrix_ar = cosine_similarity(ar_vectors)
+        cosine_similarity_matrix_ar = np.round(cosine_similarity_matrix_ar, 5)
+    save_similarity_matrix(cosine_similarity_matrix_ar, 'cosine_similarity_arabic.csv', matrix_format)
     play_default_sound()
-    euclidean_dist_matrix_eng = euclidean_distances(eng_vectors)
-    euclidean_dist_matrix_eng = np.round(euclidean_dist_matrix_eng)
-    save_matrix_to_csv(euclidean_dist_matrix_eng, 'euclidean_distance_english.csv')
+    with timed(SIMILARITY_COMPUTATION):
+        cosine_similarity_matrix_eng = cosine_similarity(eng_vectors)
+        cosine_similarity_matrix_eng = np.round(cosine_similarity_matrix_eng, 5)
+    save_similarity_matrix(cosine_similarity_matrix_eng, 'cosine_similarity_english.csv', matrix_format)
     play_default_sound()
 
-def calculate_euclidean_similarity(file_path="results/buhkari_encodings.xlsx"):
-    df_encodings=pd.read_excel(file_path)
-    # # Extract vectors from DataFrame
-    # Assuming df is your DataFrame and encodings_column is the column containing string representations of lists
-    df_encodings['ar_encodings'] = df_encodings['ar_encodings'].apply(ast.literal_eval)
-    df_encodings['eng_encodings'] = df_encodings['eng_encodings'].apply(ast.literal_eval)
-    # Extract tensors from DataFrame
-    ar_vectors = np.array(df_encodings['ar_encodings'].tolist(), dtype=float)#np.array(df_encodings['ar_encodings'])
-    eng_vectors = np.array(df_encodings['eng_encodings'].tolist(), dtype=float)#np.array(df_encodings['eng_encodings'])
+
+
+def calculate_euclidean_similarity(file_path=VECTOR_STORE_DIR, matrix_format="csv"):
+    from sklearn.metrics.pairwise import euclidean_distances
+    ar_vectors, eng_vectors, _ = load_hadith_encodings(file_path)
 
     # Euclidean Distance
-    euclidean_dist_matrix_ar = euclidean_distances(ar_vectors)
-    euclidean_dist_matrix_ar = np.round(euclidean_dist_matrix_ar)
-    save_matrix_to_csv(euclidean_dist_matrix_ar, 'euclidean_distance_arabic.csv')
+    with timed(SIMILARITY_COMPUTATION):
+        euclidean_dist_matrix_ar = euclidean_distances(ar_vectors)
+        euclidean_dist_matrix_ar = np.round(euclidean_dist_matrix_ar)
+    save_similarity_matrix(euclidean_dist_matrix_ar, 'euclidean_distance_arabic.csv', matrix_format)
     play_default_sound()
-    euclidean_dist_matrix_eng = euclidean_distances(eng_vectors)
-    euclidean_dist_matrix_eng = np.round(euclidean_dist_matrix_eng)
-    save_matrix_to_csv(euclidean_dist_matrix_eng, 'euclidean_distance_english.csv')
+    with timed(SIMILARITY_COMPUTATION):
+        euclidean_dist_matrix_eng = euclidean_distances(eng_vectors)
+        euclidean_dist_matrix_eng = np.round(euclidean_dist_matrix_eng)
+    save_similarity_matrix(euclidean_dist_matrix_eng, 'euclidean_distance_english.csv', matrix_format)
     play_default_sound()
 
 
-def calculate_manhattan_similarity(file_path="results/buhkari_encodings.xlsx"):
-    df_encodings=pd.read_excel(file_path)
-    # # Extract vectors from DataFrame
-    # Assuming df is your DataFrame and encodings_column is the column containing string representations of lists
-    df_encodings['ar_encodings'] = df_encodings['ar_encodings'].apply(ast.literal_eval)
-    df_encodings['eng_encodings'] = df_encodings['eng_encodings'].apply(ast.literal_eval)
-    # Extract tensors from DataFrame
-    ar_vectors = np.array(df_encodings['ar_encodings'].tolist(), dtype=float)#np.array(df_encodings['ar_encodings'])
-    eng_vectors = np.array(df_encodings['eng_encodings'].tolist(), dtype=float)#np.array(df_encodings['eng_encodings'])
+def calculate_manhattan_similarity(file_path=VECTOR_STORE_DIR, matrix_format="csv"):
+    from sklearn.metrics.pairwise import manhattan_distances
+    ar_vectors, eng_vectors, _ = load_hadith_encodings(file_path)
 
     # Manhattan Distance
-    manhattan_dist_matrix_ar = manhattan_distances(ar_vectors)
-    manhattan_dist_matrix_ar = np.round(manhattan_dist_matrix_ar)
-    save_matrix_to_csv(manhattan_dist_matrix_ar, 'manhattan_distance_arabic.csv')
+    with timed(SIMILARITY_COMPUTATION):
+        manhattan_dist_matrix_ar = manhattan_distances(ar_vectors)
+        manhattan_dist_matrix_ar = np.round(manhattan_dist_matrix_ar)
+    save_similarity_matrix(manhattan_dist_matrix_ar, 'manhattan_distance_arabic.csv', matrix_format)
     play_default_sound()
-    manhattan_dist_matrix_eng = manhattan_distances(eng_vectors)
-    manhattan_dist_matrix_eng = np.round(manhattan_dist_matrix_eng)
-    save_matrix_to_csv(manhattan_dist_matrix_eng, 'manhattan_distance_english.csv')
+    with timed(SIMILARITY_COMPUTATION):
+        manhattan_dist_matrix_eng = manhattan_distances(eng_vectors)
+        manhattan_dist_matrix_eng = np.round(manhattan_dist_matrix_eng)
+    save_similarity_matrix(manhattan_dist_matrix_eng, 'manhattan_distance_english.csv', matrix_format)
     play_default_sound()
 
 def find_similar_hadith(measure="cosine"):
-    # Read the CSV file containing the similarity matrix
-    df_ar = pd.read_csv("results/similarity_measures/"+measure+'_distance_arabic.csv', header=None)  # Adjust the filename as per your actual file
-    df_en = pd.read_csv("results/similarity_measures/" + measure + '_distance_english.csv',
-                        header=None)  # Adjust the filename as per your actual file
-
-
+    # Load the matrices saved by the calculate_*_similarity function of the measure
+    matrix_ar = load_similarity_matrix(measure, "arabic")
+    matrix_en = load_similarity_matrix(measure, "english")
 
     alist = []
-    with tqdm.tqdm(total=len(df_en), desc=f'Getting similar '+measure) as pbar:
-        # Iterate through the elements of the matrix to check for values greater than 0.9
-        for i in range(df_ar.shape[0]):
-            plist =[]
-            for j in range(i, df_ar.shape[1]):
-                similarity_value_ar = df_ar.iloc[i, j]
-                similarity_value_en = df_en.iloc[i, j]
-                if similarity_value_ar > 0.9 and similarity_value_en > 0.9:
-                    plist.append(j+1)
-                    #print(f"Similarity value at position ({i}, {j}) is greater than 0.9: {similarity_value}")
+    with tqdm.tqdm(total=matrix_en.shape[0], desc=f'Getting similar '+measure) as pbar:
+        # Check the upper triangle of each row for values greater than 0.9 in both languages
+        for i in range(matrix_ar.shape[0]):
+            with timed(SIMILARITY_COMPUTATION):
+                mask = (matrix_ar[i, i:] > 0.9) & (matrix_en[i, i:] > 0.9)
+                plist = (np.nonzero(mask)[0] + i + 1).tolist()
 
             alist.append([i+1,plist])
             pbar.update(1)
@@ -190,18 +266,16 @@ def find_similar_hadith(measure="cosine"):
         # Create a DataFrame
         result_df = pd.DataFrame(alist, columns=column_names)
         # Save the DataFrame to a CSV file
-        result_df.to_csv("results/similar_hadith_"+measure+".csv", index=False)
+        with timed(SERIALIZATION):
+            result_df.to_csv("results/similar_hadith_"+measure+".csv", index=False)
 
 def find_similarity_values_mukarrat_hadith(df, measure="cosine"):
-    # Read the CSV file containing the similarity matrix
-    df_ar = pd.read_csv("results/sb/similarity_measures/"+measure+'_similarity_arabic.csv', header=None)  # Adjust the filename as per your actual file
-    df_en = pd.read_csv("results/sb/similarity_measures/" + measure + '_similarity_english.csv',
-                        header=None)  # Adjust the filename as per your actual file
-
-
+    # Load the similarity matrices; binary matrices are memory-mapped so only the looked up cells are read
+    matrix_ar = load_similarity_matrix(measure, "arabic")
+    matrix_en = load_similarity_matrix(measure, "english")
 
     alist = []
-    with tqdm.tqdm(total=len(df_en), desc=f'Getting similar '+measure) as pbar:
+    with tqdm.tqdm(total=matrix_en.shape[0], desc=f'Getting similar '+measure) as pbar:
         # Iterate through the elements of the matrix to check for values greater than 0.9
         sims_ar = []
         sims_en = []
@@ -221,11 +295,11 @@ def find_similarity_values_mukarrat_hadith(df, measure="cosine"):
 
             for j in mukararat_list:
                 if j!=0 and j<=7563 and j!=i:
-                    similarity_value_ar = df_ar.iloc[i, j-1]
-                    similarity_value_en = df_en.iloc[i, j-1]
+                    # Matrices hold values rounded to 5 decimals; rounding undoes float32 storage noise
+                    similarity_value_ar = round(float(matrix_ar[i, j-1]), 5)
+                    similarity_value_en = round(float(matrix_en[i, j-1]), 5)
                     sims_ar.append(similarity_value_ar)
                     sims_en.append(similarity_value_en)
-                    #if similarity_value_ar > 0.9 and similarity_value_en > 0.9:
                     plist.append((j,similarity_value_ar,similarity_value_en))
                     if similarity_value_ar >= 0.9:
                         list_9.append(j)
@@ -236,8 +310,6 @@ def find_similarity_values_mukarrat_hadith(df, measure="cosine"):
                     else:
                         list_6b.append(j)
 
-                        #print(f"Similarity value at position ({i}, {j}) is greater than 0.9: {similarity_value}")
-
             alist.append([i+1,plist,list_9,list_8,list_7,list_6b])
             pbar.update(1)
 
@@ -247,7 +319,8 @@ def find_similarity_values_mukarrat_hadith(df, measure="cosine"):
         # Create a DataFrame
         result_df = pd.DataFrame(alist, columns=column_names)
         # Save the DataFrame to a CSV file
-        result_df.to_csv("results/sb/mukarrat_similarity.csv", index=False)
+        with timed(SERIALIZATION):
+            result_df.to_csv("results/sb/mukarrat_similarity.csv", index=False)
 
         # Calculate the histogram
         hist, bins = np.histogram(sims_ar, bins=np.arange(0, 1.1, 0.1))
@@ -281,49 +354,33 @@ def find_similarity_values_mukarrat_hadith(df, measure="cosine"):
 
 
 def find_similarity_values_all_hadith(measure="cosine"):
-    # Read the CSV file containing the similarity matrix
-    df_ar = pd.read_csv("results/sb/similarity_measures/"+measure+'_similarity_arabic.csv', header=None)  # Adjust the filename as per your actual file
-    df_en = pd.read_csv("results/sb/similarity_measures/" + measure + '_similarity_english.csv',
-                        header=None)  # Adjust the filename as per your actual file
-
+    # Load the similarity matrices; binary matrices are memory-mapped and read row by row
+    matrix_ar = load_similarity_matrix(measure, "arabic")
+    matrix_en = load_similarity_matrix(measure, "english")
+    # Only columns up to index 7563 are considered
+    n_cols = min(matrix_ar.shape[1], 7564)
 
+    # Histograms are accumulated row by row over the upper triangle
+    bins = np.arange(0, 1.1, 0.1)
+    hist_ar = np.zeros(len(bins) - 1, dtype=np.int64)
+    hist_en = np.zeros(len(bins) - 1, dtype=np.int64)
 
     alist = []
-    with tqdm.tqdm(total=len(df_en), desc=f'Getting similar '+measure) as pbar:
-        # Iterate through the elements of the matrix to check for values greater than 0.9
-        sims_ar = []
-        sims_en = []
-        for i in range(df_ar.shape[0]):
-            #plist =[]
-            list_9=[]
-            list_8=[]
-            list_7=[]
-            list_6b=[]
-            #mukararat_str = df.iloc[i,5]
-            # Remove "~" from the string
-            # mukararat_str = mukararat_str.replace(",~", "~")
-            # mukararat_str = mukararat_str.replace("~", "")
-            #
-            # # Split the string by commas and convert each part to an integer
-            # mukararat_list = [int(num.strip()) for num in mukararat_str.split(",")]
-
-            for j in range(i+1, df_ar.shape[1]):
-                if  j<=7563:
-                    similarity_value_ar = df_ar.iloc[i, j]
-                    similarity_value_en = df_en.iloc[i, j]
-                    sims_ar.append(similarity_value_ar)
-                    sims_en.append(similarity_value_en)
-                    #if similarity_value_ar > 0.9 and similarity_value_en > 0.9:
-                    #plist.append((j,similarity_value_ar,similarity_value_en))
-                    if similarity_value_ar >= 0.9:
-                        list_9.append(j+1)
-                    elif similarity_value_ar >= 0.8:
-                        list_8.append(j+1)
-                    elif similarity_value_ar >= 0.7:
-                        list_7.append(j+1)
-                    else:
-                        list_6b.append(j+1)
-                        #print(f"Similarity value at position ({i}, {j}) is greater than 0.9: {similarity_value}")
+    with tqdm.tqdm(total=matrix_en.shape[0], desc=f'Getting similar '+measure) as pbar:
+        for i in range(matrix_ar.shape[0]):
+            # Values are rounded as they are in the CSV matrices, so float32 .npy values near a bin
+            # edge fall in the same bin as their CSV counterparts
+            row_ar = np.round(np.asarray(matrix_ar[i, i+1:n_cols], dtype=np.float64), 5)
+            row_en = np.round(np.asarray(matrix_en[i, i+1:n_cols], dtype=np.float64), 5)
+            hadith_numbers = np.arange(i+1, n_cols) + 1
+
+            hist_ar += np.histogram(row_ar, bins=bins)[0]
+            hist_en += np.histogram(row_en, bins=bins)[0]
+
+            # Bucket the Arabic similarity values
+            list_9 = hadith_numbers[row_ar >= 0.9].tolist()
+            list_8 = hadith_numbers[(row_ar >= 0.8) & (row_ar < 0.9)].tolist()
+            list_7 = hadith_numbers[(row_ar >= 0.7) & (row_ar < 0.8)].tolist()
 
             alist.append([i+1,list_9,list_8,list_7])
             pbar.update(1)
@@ -334,13 +391,11 @@ def find_similarity_values_all_hadith(measure="cosine"):
         # Create a DataFrame
         result_df = pd.DataFrame(alist, columns=column_names)
         # Save the DataFrame to a CSV file
-        result_df.to_csv("results/sb/all_9_8_7_r_similarity-2.csv", index=False)
-
-        # Calculate the histogram
-        hist, bins = np.histogram(sims_ar, bins=np.arange(0, 1.1, 0.1))
+        with timed(SERIALIZATION):
+            result_df.to_csv("results/sb/all_9_8_7_r_similarity-2.csv", index=False)
 
         # Prepare the data to write to file
-        data_to_write = [f"Bin {bins[i]:.1f}-{bins[i + 1]:.1f}: {hist[i]}\n" for i in range(len(bins) - 1)]
+        data_to_write = [f"Bin {bins[i]:.1f}-{bins[i + 1]:.1f}: {hist_ar[i]}\n" for i in range(len(bins) - 1)]
 
         # Define the file path
         file_path = "results/sb/all_similarity_frequency_m_ar-2.txt"
@@ -351,11 +406,8 @@ def find_similarity_values_all_hadith(measure="cosine"):
 
         print(f"Frequency data saved to {file_path}")
 
-        # Calculate the histogram
-        hist, bins = np.histogram(sims_en, bins=np.arange(0, 1.1, 0.1))
-
         # Prepare the data to write to file
-        data_to_write = [f"Bin {bins[i]:.1f}-{bins[i + 1]:.1f}: {hist[i]}\n" for i in range(len(bins) - 1)]
+        data_to_write = [f"Bin {bins[i]:.1f}-{bins[i + 1]:.1f}: {hist_en[i]}\n" for i in range(len(bins) - 1)]
 
         # Define the file path
         file_path = "results/sb/all_similarity_frequency_m_en-2.txt"
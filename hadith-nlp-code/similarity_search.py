@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+import tqdm
+from vector_store import load_vector_store
+
+# Pairwise function of each measure (in sklearn.metrics.pairwise) and whether higher values mean more similar
+PAIRWISE_MEASURES = {
+    "cosine": ("cosine_similarity", True),
+    "euclidean": ("euclidean_distances", False),
+    "manhattan": ("manhattan_distances", False),
+}
+
+# Number of rows and columns of the similarity matrix computed at once
+DEFAULT_BLOCK_SIZE = 1024
+
+
+def blocked_similarity_search(query_vectors, corpus_vectors=None, measure="cosine", k=10, threshold=None,
+                              block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Finds the nearest neighbours of each query vector, one tile of the similarity matrix at a time.
+
+    Only block_size x block_size values and the running top-k of a row block are held in memory,
+    so memory stays bounded whatever the size of the corpus.
+
+    Args:
+        query_vectors (array-like): Query embeddings, one row per hadith.
+        corpus_vectors (array-like, optional): Corpus embeddings. Defaults to the query vectors,
+            in which case each hadith is excluded from its own neighbours.
+        measure (str, optional): "cosine", "euclidean" or "manhattan". Defaults to "cosine".
+        k (int, optional): Number of neighbours kept per hadith, or None to keep every neighbour
+            passing the threshold. Defaults to 10.
+        threshold (float, optional): Minimum similarity (cosine) or maximum distance (euclidean and
+            manhattan) of a neighbour. Defaults to None.
+        block_size (int, optional): Size of the tiles of the similarity matrix. Defaults to DEFAULT_BLOCK_SIZE.
+
+    Returns:
+        tuple: Sparse result as arrays of query indices, corpus indices and values, ordered by query
+            and then from the most to the least similar neighbour.
+    """
+    if k is None and threshold is None:
+        raise ValueError("Either k or threshold must be given")
+
+    from sklearn.metrics import pairwise as pairwise_metrics
+    function_name, higher_is_better = PAIRWISE_MEASURES[measure]
+    pairwise = getattr(pairwise_metrics, function_name)
+    same_corpus = corpus_vectors is None
+    if same_corpus:
+        corpus_vectors = query_vectors
+    worst = -np.inf if higher_is_better else np.inf
+    n_queries, n_corpus = len(query_vectors), len(corpus_vectors)
+
+    all_rows, all_cols, all_values = [], [], []
+    with tqdm.tqdm(total=n_queries, desc=f'Searching similar hadith ({measure})') as pbar:
+        for row_start in range(0, n_queries, block_size):
+            row_stop = min(row_start + block_size, n_queries)
+            query_block = np.asarray(query_vectors[row_start:row_stop])
+            n_rows = row_stop - row_start
+
+            best_values = np.empty((n_rows, 0))
+            best_cols = np.empty((n_rows, 0), dtype=np.int64)
+            block_rows, block_cols, block_values = [], [], []
+
+            for col_start in range(0, n_corpus, block_size):
+                col_stop = min(col_start + block_size, n_corpus)
+                tile = pairwise(query_block, np.asarray(corpus_vectors[col_start:col_stop]))
+
+                # A hadith is not its own neighbour
+                if same_corpus and col_start < row_stop and row_start < col_stop:
+                    diagonal = np.arange(max(row_start, col_start), min(row_stop, col_stop))
+                    tile[diagonal - row_start, diagonal - col_start] = worst
+
+                if k is None:
+                    mask = tile >= threshold if higher_is_better else tile <= threshold
+                    rows, cols = np.nonzero(mask)
+                    block_rows.append(rows + row_start)
+                    block_cols.append(cols + col_start)
+                    block_values.append(tile[rows, cols])
+                    continue
+
+                # Merge the tile into the running top-k of the row block
+                tile_cols = np.broadcast_to(np.arange(col_start, col_stop), tile.shape)
+                best_values = np.hstack([best_values, tile])
+                best_cols = np.hstack([best_cols, tile_cols])
+                if best_values.shape[1] > k:
+                    keys = -best_values if higher_is_better else best_values
+                    keep = np.argpartition(keys, k - 1, axis=1)[:, :k]
+                    best_values = np.take_along_axis(best_values, keep, axis=1)
+                    best_cols = np.take_along_axis(best_cols, keep, axis=1)
+
+            if k is None:
+                rows = np.concatenate(block_rows)
+                cols = np.concatenate(block_cols)
+                values = np.concatenate(block_values)
+            else:
+                rows = np.repeat(np.arange(row_start, row_stop), best_values.shape[1])
+                cols = best_cols.ravel()
+                values = best_values.ravel()
+                mask = np.isfinite(values)
+                if threshold is not None:
+                    mask &= values >= threshold if higher_is_better else values <= threshold
+                rows, cols, values = rows[mask], cols[mask], values[mask]
+
+            # Order by query, then from the most to the least similar neighbour
+            order = np.lexsort((cols, -values if higher_is_better else values, rows))
+            all_rows.append(rows[order])
+            all_cols.append(cols[order])
+            all_values.append(values[order])
+            pbar.update(n_rows)
+
+    return np.concatenate(all_rows), np.concatenate(all_cols), np.concatenate(all_values)
+
+
+def search_similar_hadith(query_dir, corpus_dir=None, language="ar", measure="cosine", k=10, threshold=None,
+                          block_size=DEFAULT_BLOCK_SIZE, save_path=""):
+    """
+    Finds the nearest neighbours of every hadith of a vector store, within the same collection
+    or across collections.
+
+    Args:
+        query_dir (str): Vector store of the query collection.
+        corpus_dir (str, optional): Vector store of the searched collection. Defaults to the query collection.
+        language (str, optional): "ar" or "en". Defaults to "ar".
+        measure (str, optional): "cosine", "euclidean" or "manhattan". Defaults to "cosine".
+        k (int, optional): Number of neighbours kept per hadith. Defaults to 10.
+        threshold (float, optional): Similarity or distance threshold of a neighbour. Defaults to None.
+        block_size (int, optional): Size of the tiles of the similarity matrix. Defaults to DEFAULT_BLOCK_SIZE.
+        save_path (str, optional): File path of a compressed .npz to save the sparse result to. Defaults to "".
+
+    Returns:
+        pd.DataFrame: One row per neighbour with 'hadith_number', 'similar' and 'value' columns.
+    """
+    vector_index = 0 if language == "ar" else 1
+    query = load_vector_store(query_dir)
+    corpus = query if corpus_dir is None else load_vector_store(corpus_dir)
+
+    rows, cols, values = blocked_similarity_search(query[vector_index],
+                                                   None if corpus_dir is None else corpus[vector_index],
+                                                   measure=measure, k=k, threshold=threshold,
+                                                   block_size=block_size)
+    hadith_numbers = np.asarray(query[2])[rows]
+    similar_numbers = np.asarray(corpus[2])[cols]
+
+    if save_path:
+        np.savez_compressed(save_path, hadith_number=hadith_numbers, similar=similar_numbers, value=values)
+        print(f"Results saved to {save_path}")
+
+    return pd.DataFrame({
+        "hadith_number": hadith_numbers,
+        "similar": similar_numbers,
+        "value": values,
+    })
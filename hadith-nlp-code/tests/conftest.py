@@ -0,0 +1,54 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+# The modules are flat scripts run from hadith-nlp-code
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import model_registry
+from benchmark import use_stub_models
+
+# Collection sampled by the tests; it has Arabic and English texts
+SAMPLE_COLLECTION = "ms"
+SAMPLE_SOURCE_PATH = os.path.join(REPO_DIR, "data", f"simplified_{SAMPLE_COLLECTION}_db.xlsx")
+SAMPLE_SIZE = 300
+
+
+@pytest.fixture(scope="session", autouse=True)
+def scratch_dir(tmp_path_factory):
+    """
+    Runs the tests in a scratch directory linked to the dictionaries, as the benchmarks do, so
+    that the caches and results written by the code under test stay out of the repository.
+    """
+    directory = tmp_path_factory.mktemp("scratch")
+    os.symlink(os.path.join(REPO_DIR, "dictionaries"), directory / "dictionaries")
+    working_dir = os.getcwd()
+    os.chdir(directory)
+    try:
+        yield directory
+    finally:
+        os.chdir(working_dir)
+
+
+@pytest.fixture(scope="session")
+def hadith_sample():
+    """
+    The first hadith of the sample collection, as read from its source spreadsheet.
+    """
+    return pd.read_excel(SAMPLE_SOURCE_PATH, nrows=SAMPLE_SIZE)
+
+
+@pytest.fixture
+def stub_models():
+    """
+    Registers the stub models of the benchmarks, and restores the registry afterwards.
+    """
+    models, versions = dict(model_registry._models), dict(model_registry._versions)
+    use_stub_models()
+    yield
+    model_registry._models.clear()
+    model_registry._models.update(models)
+    model_registry._versions.clear()
+    model_registry._versions.update(versions)
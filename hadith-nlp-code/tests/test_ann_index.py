@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from ann_index import IVFIndex, measure_recall
+from benchmark import StubSentenceModel, STUB_EMBEDDING_SIZES
+from normalization import normalize_arabic
+from utility import tarabic_name
+
+
+@pytest.fixture(scope="module")
+def embeddings():
+    # Clustered embeddings, as sentence embeddings of hadith on the same topics are
+    rng = np.random.default_rng(0)
+    topics = rng.normal(size=(25, 32))
+    vectors = topics[rng.integers(len(topics), size=1000)] + rng.normal(size=(1000, 32))
+    hadith_ids = np.array([f"SB-HD{i:04d}" for i in range(1, len(vectors) + 1)])
+    return vectors, hadith_ids
+
+
+@pytest.fixture(scope="module")
+def index(embeddings):
+    return IVFIndex.build(*embeddings)
+
+
+def test_recall_is_exact_when_probing_every_list(index):
+    assert measure_recall(index, n_probe=len(index.centroids)) == 1.0
+
+
+def test_recall_with_default_probes(index):
+    assert measure_recall(index) >= 0.9
+
+
+def test_query_excludes_the_hadith_itself(index, embeddings):
+    vectors, hadith_ids = embeddings
+    neighbours = index.query("SB-HD0001", k=5, n_probe=len(index.centroids))
+    assert len(neighbours) == 5
+    assert "SB-HD0001" not in [hadith_id for hadith_id, _ in neighbours]
+    scores = [score for _, score in neighbours]
+    assert scores == sorted(scores, reverse=True)
+
+    # A text query returns the hadith whose embedding it is encoded to
+    assert index.query("text", k=1, encoder=lambda text: vectors[41])[0][0] == hadith_ids[41]
+    # Without a language, the index cannot encode a text by itself
+    with pytest.raises(ValueError):
+        index.query("text")
+
+
+@pytest.mark.parametrize("hadith_id", ["SB-HD001", "SB-HD1001", "SM-HD0001"])
+def test_unknown_hadith_ids_are_not_encoded_as_text(index, hadith_id):
+    with pytest.raises(KeyError):
+        index.query(hadith_id, encoder=lambda text: pytest.fail("the hadith ID was encoded"))
+
+
+def test_save_and_load(index, tmp_path):
+    index.save(str(tmp_path))
+    loaded = IVFIndex.load(str(tmp_path))
+    assert loaded.n_probe == index.n_probe
+    for hadith_id in ["SB-HD0001", "SB-HD0500", "SB-HD1000"]:
+        assert loaded.query(hadith_id) == index.query(hadith_id)
+
+
+def test_text_queries_use_the_sentence_model_of_the_index_language(hadith_sample, stub_models, tmp_path):
+    texts = hadith_sample[tarabic_name].tolist()
+    # The corpus is encoded after normalization, as by encode_all_hadith_batched
+    vectors = StubSentenceModel(STUB_EMBEDDING_SIZES["ar"]).encode([normalize_arabic(text) for text in texts])
+    hadith_ids = np.array([f"SM-HD{i:04d}" for i in range(1, len(texts) + 1)])
+    IVFIndex.build(vectors, hadith_ids, language="ar").save(str(tmp_path))
+
+    loaded = IVFIndex.load(str(tmp_path))
+    assert loaded.language == "ar"
+    hadith_id, score = loaded.query(texts[41], k=1)[0]
+    assert hadith_id == "SM-HD0042"
+    assert score == pytest.approx(1.0)
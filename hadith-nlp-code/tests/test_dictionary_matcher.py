@@ -0,0 +1,187 @@
+import os
+import random
+import pandas as pd
+import pytest
+from animals import find_animals_in_one_hadith, ANIMALS_DICTIONARY_PATH
+from caliphs import find_caliphs_in_one_hadith, CALIPHS_DICTIONARY_PATH
+from concepts import find_concepts_in_one_hadith, CONCEPTS_DICTIONARY_PATH
+from dictionary_matcher import AhoCorasick, TokenIndex, load_dictionary, read_dictionary, token_key, \
+    MATCH_AR, MATCH_EN, MATCH_AR_AND_EN, MATCH_AR_OR_EN
+from groupofpeople import find_clans_in_one_hadith, CLAN_DICTIONARY_PATHS
+from holybooks import find_holybooks_in_one_hadith, HOLYBOOKS_DICTIONARY_PATH
+from normalization import strip_punctuation, strip_tashkeel, clean_arabic_text
+from pillarsofislam import find_pillars_in_one_hadith, PILLARS_DICTIONARY_PATH
+from plants import find_plants_in_one_hadith, PLANTS_DICTIONARY_PATH
+from prophets import find_prophets_in_one_hadith, PROPHETS_DICTIONARY_PATH
+from utility import tarabic_name, english_name
+
+
+# Reference extractors: the per-row loops the compiled dictionaries replaced
+def contains_any(patterns, text):
+    return any(pattern in text for pattern in patterns)
+
+
+def contains_any_english(patterns, text):
+    return any(pattern.lower() in text.lower() for pattern in patterns)
+
+
+def reference_animals(ar_text, en_text, df):
+    en_text = strip_punctuation(en_text)
+    return [row['ID'] for _, row in df.iterrows() if contains_any_english(row['en'].split('-'), en_text)]
+
+
+def reference_plants(ar_text, en_text, df):
+    return reference_animals(ar_text, en_text, df)
+
+
+def reference_caliphs(ar_text, en_text, df):
+    ar_text = strip_tashkeel(strip_punctuation(ar_text))
+    return [row['ID'] for _, row in df.iterrows()
+            if contains_any_english(row['en'].split(','), en_text)
+            and contains_any(strip_tashkeel(row['ar']).split(','), ar_text)]
+
+
+def reference_clans(ar_text, en_text, df):
+    return reference_caliphs(ar_text, en_text, df)
+
+
+def reference_concepts(ar_text, en_text, df):
+    ar_text = strip_tashkeel(strip_punctuation(ar_text))
+    en_text = strip_punctuation(en_text)
+    concepts = []
+    for _, row in df.iterrows():
+        # Rows without Arabic patterns ('-') only match on English
+        is_match_ar = row['ar'] != '-' and contains_any(strip_tashkeel(row['ar']).split(','), ar_text)
+        if is_match_ar or contains_any_english(row['en'].split(','), en_text):
+            concepts.append(row['ID'])
+    return concepts
+
+
+def reference_arabic_only(ar_text, en_text, df):
+    ar_text = clean_arabic_text(strip_tashkeel(strip_punctuation(ar_text)))
+    return [row['ID'] for _, row in df.iterrows() if contains_any(strip_tashkeel(row['ar']).split(','), ar_text)]
+
+
+def reference_prophets(ar_text, en_text, df, collection):
+    ar_text = strip_tashkeel(strip_punctuation(ar_text))
+    prophets = []
+    for _, row in df.iterrows():
+        ar_patterns = strip_tashkeel(row['ar']).split(',')
+        if collection == "sb":
+            flag = contains_any_english(row['en'].split(','), en_text) and contains_any(ar_patterns, ar_text)
+        else:
+            flag = row['ID'] != "Adam" and contains_any(ar_patterns, ar_text)
+        if flag:
+            prophets.append(row['ID'])
+    return prophets
+
+
+# Extractor, reference and dictionary files of each dictionary based extractor
+EXTRACTORS = {
+    "animals": (find_animals_in_one_hadith, reference_animals, [ANIMALS_DICTIONARY_PATH]),
+    "plants": (find_plants_in_one_hadith, reference_plants, [PLANTS_DICTIONARY_PATH]),
+    "caliphs": (find_caliphs_in_one_hadith, reference_caliphs, [CALIPHS_DICTIONARY_PATH]),
+    "clans": (find_clans_in_one_hadith, reference_clans, CLAN_DICTIONARY_PATHS),
+    "concepts": (find_concepts_in_one_hadith, reference_concepts, [CONCEPTS_DICTIONARY_PATH]),
+    "holybooks": (lambda ar_text, en_text: find_holybooks_in_one_hadith(ar_text), reference_arabic_only,
+                  [HOLYBOOKS_DICTIONARY_PATH]),
+    "pillars": (find_pillars_in_one_hadith, reference_arabic_only, [PILLARS_DICTIONARY_PATH]),
+}
+
+
+# Options the dictionaries of the extractors are compiled with
+MATCH_OPTIONS = {
+    "animals": {"policy": MATCH_EN, "separator": "-"},
+    "caliphs": {"policy": MATCH_AR_AND_EN},
+    "concepts": {"policy": MATCH_AR_OR_EN},
+}
+
+
+@pytest.mark.parametrize("name", sorted(EXTRACTORS))
+def test_extractor_matches_reference(name, hadith_sample):
+    extract, reference, file_paths = EXTRACTORS[name]
+    df = pd.concat([read_dictionary(file_path) for file_path in file_paths], ignore_index=True)
+    found = 0
+    for ar_text, en_text in zip(hadith_sample[tarabic_name], hadith_sample[english_name]):
+        expected = reference(ar_text, en_text, df)
+        assert extract(ar_text, en_text) == expected
+        found += len(expected)
+    assert found
+
+
+@pytest.mark.parametrize("collection", ["sb", "nis"])
+def test_prophets_match_reference(collection, hadith_sample):
+    df = read_dictionary(PROPHETS_DICTIONARY_PATH)
+    for ar_text, en_text in zip(hadith_sample[tarabic_name], hadith_sample[english_name]):
+        expected = reference_prophets(ar_text, en_text, df, collection)
+        assert find_prophets_in_one_hadith(ar_text, en_text, collection) == expected
+
+
+def test_aho_corasick_matches_substring_search():
+    rng = random.Random(0)
+    for _ in range(200):
+        # A small alphabet gives many overlapping and nested patterns
+        patterns = ["".join(rng.choice("abc") for _ in range(rng.randint(0, 4))) for _ in range(rng.randint(1, 12))]
+        automaton = AhoCorasick(patterns)
+        for _ in range(10):
+            text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 30)))
+            assert automaton.find(text) == {i for i, pattern in enumerate(patterns) if pattern in text}
+
+
+def test_load_dictionary_reuses_and_refreshes_cache(tmp_path, hadith_sample):
+    cache_dir = str(tmp_path)
+    compiled = load_dictionary(CALIPHS_DICTIONARY_PATH, cache_dir=cache_dir)
+    cache_files = os.listdir(cache_dir)
+    assert len(cache_files) == 1
+
+    cached = load_dictionary(CALIPHS_DICTIONARY_PATH, cache_dir=cache_dir)
+    refreshed = load_dictionary(CALIPHS_DICTIONARY_PATH, cache_dir=cache_dir, refresh=True)
+    assert os.listdir(cache_dir) == cache_files
+    for ar_text, en_text in zip(hadith_sample[tarabic_name], hadith_sample[english_name]):
+        expected = compiled.match(ar_text, en_text)
+        assert cached.match(ar_text, en_text) == expected
+        assert refreshed.match(ar_text, en_text) == expected
+
+    # Other options are cached separately
+    load_dictionary(CALIPHS_DICTIONARY_PATH, policy=MATCH_AR, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 2
+
+
+# Function to check whole-word occurrence the slow way, on the space-joined words of both texts
+def contains_words(pattern, text):
+    return f" {' '.join(token_key(pattern))} " in f" {' '.join(token_key(text))} "
+
+
+def test_token_index_matches_whole_words():
+    rng = random.Random(0)
+    words = ["abu", "bakr", "ab", "umar", "bakra"]
+    for _ in range(500):
+        text = "".join(rng.choice(words) + rng.choice([" ", ", ", "  ", "-", ""]) for _ in range(rng.randint(0, 8)))
+        index = TokenIndex(text)
+        for _ in range(5):
+            pattern = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+            assert (token_key(pattern) in index) == contains_words(pattern, text)
+
+
+@pytest.mark.parametrize("name", ["animals", "caliphs", "concepts"])
+def test_token_matching_finds_whole_word_matches(name, hadith_sample):
+    file_paths = EXTRACTORS[name][2]
+    df = pd.concat([read_dictionary(file_path) for file_path in file_paths], ignore_index=True)
+    compiled = load_dictionary(file_paths[0], **MATCH_OPTIONS[name])
+    ar_patterns = [strip_tashkeel(cell).split(',') if cell != '-' else [] for cell in df['ar']]
+    en_patterns = [cell.lower().split(MATCH_OPTIONS[name].get("separator", ",")) for cell in df['en']]
+    for ar_text, en_text in zip(hadith_sample[tarabic_name], hadith_sample[english_name]):
+        ar_text = strip_tashkeel(strip_punctuation(ar_text))
+        en_text = strip_punctuation(en_text).lower()
+        ar_rows = [any(contains_words(pattern, ar_text) for pattern in patterns) for patterns in ar_patterns]
+        en_rows = [any(contains_words(pattern, en_text) for pattern in patterns) for patterns in en_patterns]
+        if name == "animals":
+            expected = [row_id for row_id, en_match in zip(df['ID'], en_rows) if en_match]
+        elif name == "caliphs":
+            expected = [row_id for row_id, ar_match, en_match in zip(df['ID'], ar_rows, en_rows) if ar_match and en_match]
+        else:
+            expected = [row_id for row_id, ar_match, en_match in zip(df['ID'], ar_rows, en_rows) if ar_match or en_match]
+        tokens = compiled.match(TokenIndex(ar_text), TokenIndex(en_text, lowercase=True))
+        assert tokens == expected
+        # A whole-word match is also a substring match
+        assert set(tokens) <= set(compiled.match(ar_text, en_text))
@@ -0,0 +1,90 @@
+import random
+import numpy as np
+import pytest
+from conftest import SAMPLE_COLLECTION
+from corpus import normalize_corpus
+from entity_index import EntityIndex, build_entity_index
+from generate_rdf import LABEL_MAPPING
+from pipeline import run_collection, save_stage_results
+
+COLLECTIONS = ["sb", "maj", "ms"]
+ENTITIES = [f"E{i}" for i in range(12)]
+
+
+@pytest.fixture(scope="module")
+def mentions():
+    # Entities of 300 hadith in three collections, with entities of very different frequencies
+    rng = random.Random(0)
+    return [{entity for i, entity in enumerate(ENTITIES) if rng.random() < 0.6 / (i + 1)} for _ in range(300)]
+
+
+@pytest.fixture(scope="module")
+def index(mentions):
+    hadith_ids = np.array([f"{LABEL_MAPPING[COLLECTIONS[hadith // 100]]}-HD{hadith % 100 + 1:04d}"
+                           for hadith in range(len(mentions))])
+    postings = [[hadith for hadith, entities in enumerate(mentions) if entity in entities] for entity in ENTITIES]
+    offsets = np.concatenate([[0], np.cumsum([len(entity_postings) for entity_postings in postings])])
+    return EntityIndex(hadith_ids, np.array(COLLECTIONS), np.array([0, 100, 200, 300]), np.array(ENTITIES),
+                       offsets, np.array([hadith for entity_postings in postings for hadith in entity_postings],
+                                         dtype=np.uint32))
+
+
+# Function to answer a query the slow way, with Python sets
+def reference_query(mentions, all_of=(), any_of=(), none_of=(), collections=None):
+    return [hadith for hadith, entities in enumerate(mentions)
+            if all(entity in entities for entity in all_of)
+            and (not any_of or any(entity in entities for entity in any_of))
+            and not any(entity in entities for entity in none_of)
+            and (collections is None or COLLECTIONS[hadith // 100] in collections)]
+
+
+def test_query_matches_set_algebra(index, mentions):
+    rng = random.Random(1)
+    entities = ENTITIES + ["Unknown"]
+    for _ in range(500):
+        query = {"all_of": rng.sample(entities, rng.randint(0, 2)), "any_of": rng.sample(entities, rng.randint(0, 3)),
+                 "none_of": rng.sample(entities, rng.randint(0, 2))}
+        if rng.random() < 0.5:
+            query["collections"] = rng.sample(COLLECTIONS + ["tir"], rng.randint(0, 3))
+        result = index.query(**query)
+        assert result.dtype == np.uint32
+        assert result.tolist() == reference_query(mentions, **query)
+
+
+def test_restrict_to_collections(index):
+    assert index.restrict_to_collections(None, ["ms", "sb"]).tolist() == list(range(100)) + list(range(200, 300))
+    hadith = np.array([5, 150, 250, 299], dtype=np.uint32)
+    assert index.restrict_to_collections(hadith, ["maj", "tir"]).tolist() == [150]
+    assert index.restrict_to_collections(hadith, ["tir"]).tolist() == []
+    assert index.get_hadith_ids(index.query(collections=["maj"]))[:2] == ["IM-HD0001", "IM-HD0002"]
+
+
+def test_save_and_load(index, tmp_path):
+    file_path = str(tmp_path / "entity_index.npz")
+    index.save(file_path)
+    loaded = EntityIndex.load(file_path)
+    assert loaded.collections == COLLECTIONS
+    for entity in ENTITIES + ["Unknown"]:
+        assert loaded.postings(entity).tolist() == index.postings(entity).tolist()
+    assert "E0" in loaded and "Unknown" not in loaded
+
+
+def test_build_from_entity_tables(hadith_sample, stub_models, tmp_path):
+    stages = ["locations", "animals", "caliphs", "concepts"]
+    results = run_collection(normalize_corpus(hadith_sample), SAMPLE_COLLECTION, stages)
+    tables_dir = str(tmp_path / "{collection}")
+    save_stage_results(results, SAMPLE_COLLECTION, tables_dir)
+    index = build_entity_index([SAMPLE_COLLECTION, "sb"], tables_dir)
+    assert index.collections == [SAMPLE_COLLECTION]
+
+    label = LABEL_MAPPING[SAMPLE_COLLECTION]
+    for stage in stages:
+        result_df = results[stage]
+        # Unresolved NER mentions (None) are not indexed, as they are not in the RDF graph
+        entities = {entity for row_entities in result_df[stage] for entity in row_entities if entity is not None}
+        assert entities
+        for entity in entities:
+            expected = {f"{label}-HD{int(hadith_number):04d}"
+                        for hadith_number, row_entities in zip(result_df["hadith_number"], result_df[stage])
+                        if entity in row_entities}
+            assert set(index.get_hadith_ids(index.postings(entity))) == expected
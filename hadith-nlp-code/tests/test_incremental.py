@@ -0,0 +1,92 @@
+import os
+import pandas as pd
+from conftest import SAMPLE_COLLECTION
+from corpus import normalize_corpus
+from dictionary_matcher import MATCH_TOKENS
+from incremental import IncrementalState, INCREMENTAL_STATE_SUBDIR
+from pipeline import run_collection, run_collection_incremental
+from utility import english_name
+
+# Dictionary stages, which run without the NER model
+STAGES = ["animals", "caliphs", "concepts"]
+
+
+def test_stale_rows(tmp_path):
+    state = IncrementalState("sb", str(tmp_path / "{collection}"))
+    dependencies = {"dictionary": "a"}
+    keys, fingerprints = [1, 2, 3], ["x", "y", "z"]
+    result_df = pd.DataFrame({"hadith_number": [1, 2, 3], "animals": [["Ant"], [], []]})
+
+    # First run: every hadith is stale
+    assert state.stale_rows("animals", dependencies, keys, fingerprints) == ([0, 1, 2], {})
+    state.save("animals", dependencies, keys, fingerprints, result_df)
+    assert os.listdir(tmp_path / "sb") == ["animals.pkl"]
+
+    stale, up_to_date = state.stale_rows("animals", dependencies, keys, fingerprints)
+    assert stale == []
+    assert up_to_date == {1: (1, ["Ant"]), 2: (2, []), 3: (3, [])}
+
+    # A changed text and a new hadith
+    stale, up_to_date = state.stale_rows("animals", dependencies, [1, 2, 3, 4], ["x", "changed", "z", "w"])
+    assert stale == [1, 3]
+    assert sorted(up_to_date) == [1, 3]
+
+    # A changed dictionary makes every hadith stale, as does another stage
+    assert state.stale_rows("animals", {"dictionary": "b"}, keys, fingerprints) == ([0, 1, 2], {})
+    assert state.stale_rows("plants", dependencies, keys, fingerprints) == ([0, 1, 2], {})
+
+
+def assert_same_results(results, expected):
+    assert sorted(results) == sorted(expected)
+    for stage, result_df in results.items():
+        assert result_df.columns.tolist() == expected[stage].columns.tolist()
+        assert result_df.values.tolist() == expected[stage].values.tolist()
+
+
+def recomputed_counts(output):
+    return [line.split(": ")[1] for line in output.splitlines() if " hadith to recompute" in line]
+
+
+def test_incremental_run_matches_full_run(hadith_sample, tmp_path, capsys):
+    output_dir = str(tmp_path / "{collection}")
+    hadith_df = normalize_corpus(hadith_sample)
+    n = len(hadith_df)
+
+    results = run_collection_incremental(hadith_df, SAMPLE_COLLECTION, STAGES, save_result=False,
+                                         output_dir=output_dir)
+    assert_same_results(results, run_collection(hadith_df, SAMPLE_COLLECTION, STAGES))
+    assert recomputed_counts(capsys.readouterr().out) == [f"{n} of {n} hadith to recompute"] * 3
+    assert os.path.isdir(os.path.join(output_dir.format(collection=SAMPLE_COLLECTION), INCREMENTAL_STATE_SUBDIR))
+
+    # Edit one hadith, drop another and move the last one first
+    edited = hadith_sample.copy()
+    edited.loc[0, english_name] = "The Caliph Umar saw a camel and an ant in Paradise."
+    edited = edited.drop(index=1)
+    edited = pd.concat([edited.tail(1), edited.head(-1)], ignore_index=True)
+    edited_df = normalize_corpus(edited)
+    results = run_collection_incremental(edited_df, SAMPLE_COLLECTION, STAGES, save_result=False,
+                                         output_dir=output_dir)
+    expected = run_collection(edited_df, SAMPLE_COLLECTION, STAGES)
+    assert_same_results(results, expected)
+    # The edited hadith, now second, mentions animals
+    assert expected["animals"]["animals"].iloc[1]
+    assert recomputed_counts(capsys.readouterr().out) == [f"1 of {n - 1} hadith to recompute"] * 3
+
+    # Nothing to recompute when nothing changed
+    run_collection_incremental(edited_df, SAMPLE_COLLECTION, STAGES, save_result=False, output_dir=output_dir)
+    assert recomputed_counts(capsys.readouterr().out) == [f"0 of {n - 1} hadith to recompute"] * 3
+
+    # Another match mode is another dependency
+    results = run_collection_incremental(edited_df, SAMPLE_COLLECTION, STAGES[:1], save_result=False,
+                                         output_dir=output_dir, match_mode=MATCH_TOKENS)
+    assert_same_results(results, run_collection(edited_df, SAMPLE_COLLECTION, STAGES[:1], match_mode=MATCH_TOKENS))
+    assert recomputed_counts(capsys.readouterr().out) == [f"{n - 1} of {n - 1} hadith to recompute"]
+
+
+def test_state_is_kept_per_output_dir(hadith_sample, tmp_path, capsys):
+    hadith_df = normalize_corpus(hadith_sample.head(20))
+    for output_dir in [tmp_path / "first", tmp_path / "second"]:
+        run_collection_incremental(hadith_df, SAMPLE_COLLECTION, STAGES[:1], save_result=False,
+                                   output_dir=str(output_dir))
+        assert recomputed_counts(capsys.readouterr().out) == ["20 of 20 hadith to recompute"]
+    assert sorted(os.listdir(tmp_path / "first" / INCREMENTAL_STATE_SUBDIR)) == ["animals.pkl"]
@@ -0,0 +1,54 @@
+import json
+import os
+import pytest
+from afterlife import find_heaven_and_hell_mentioned_in_all_hadith
+from crimes import find_crimes_mentioned_in_all_hadith
+from locations import find_locations_mentioned_in_all_hadith
+from ner_annotations import NERAnnotationStore, normalize_for_ner
+from persons import find_persons_mentioned_in_all_hadith
+from utility import tarabic_name, hadith_number_name
+from conftest import SAMPLE_COLLECTION
+
+# NER extractors over a whole collection, called with the extra keyword arguments they need
+NER_EXTRACTORS = {
+    "persons": (find_persons_mentioned_in_all_hadith, {}),
+    "crimes": (find_crimes_mentioned_in_all_hadith, {"collection": SAMPLE_COLLECTION}),
+    "afterlife": (find_heaven_and_hell_mentioned_in_all_hadith, {"collection": SAMPLE_COLLECTION}),
+    "locations": (find_locations_mentioned_in_all_hadith, {"collection": SAMPLE_COLLECTION}),
+}
+
+
+@pytest.mark.parametrize("name", sorted(NER_EXTRACTORS))
+def test_store_and_direct_paths_agree(name, hadith_sample, stub_models, tmp_path):
+    extract, kwargs = NER_EXTRACTORS[name]
+    store = NERAnnotationStore(SAMPLE_COLLECTION, path=str(tmp_path / "ner_annotations.json"))
+
+    direct = extract(hadith_sample, **kwargs)
+    from_store = extract(hadith_sample, annotation_store=store, **kwargs)
+
+    assert direct.columns.tolist() == from_store.columns.tolist()
+    for column in direct.columns:
+        assert direct[column].tolist() == from_store[column].tolist()
+
+
+def test_store_round_trip(hadith_sample, stub_models, tmp_path):
+    path = str(tmp_path / "ner_annotations.json")
+    store = NERAnnotationStore(SAMPLE_COLLECTION, path=path)
+    entities = store.annotate(hadith_sample)
+    assert any(entities)
+
+    reopened = NERAnnotationStore(SAMPLE_COLLECTION, path=path)
+    texts = [normalize_for_ner(text) for text in hadith_sample[tarabic_name]]
+    assert [reopened.get(hnum, text) for hnum, text in zip(hadith_sample[hadith_number_name], texts)] == entities
+    # The store is written under a temporary name and then moved into place
+    assert os.listdir(tmp_path) == ["ner_annotations.json"]
+
+
+def test_store_discards_other_model_versions(hadith_sample, stub_models, tmp_path):
+    path = str(tmp_path / "ner_annotations.json")
+    NERAnnotationStore(SAMPLE_COLLECTION, path=path).annotate(hadith_sample.head(10))
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file)["model_version"] == "stub"
+
+    assert NERAnnotationStore(SAMPLE_COLLECTION, path=path, model_version="stub").annotations
+    assert not NERAnnotationStore(SAMPLE_COLLECTION, path=path, model_version="stub-int8").annotations
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+import pytest
+import model_registry
+from ner_quantization import quantize_ner_pipeline, quantized_ner_model_version, transformer_shims
+
+
+# Fake spaCy pipeline with the structure spacy-transformers gives the transformer component: a thinc
+# model whose HFShim holds the PyTorch module in _model and again in _hfmodel.transformer
+def fake_pipeline(module):
+    shim = SimpleNamespace(_model=module, _hfmodel=SimpleNamespace(transformer=module, tokenizer=None))
+    transformer = SimpleNamespace(model=SimpleNamespace(walk=lambda: [SimpleNamespace(shims=[shim]),
+                                                                      SimpleNamespace(shims=[shim])]))
+    # Components without a model or with a model without PyTorch shims are skipped
+    ner = SimpleNamespace(model=SimpleNamespace(walk=lambda: [SimpleNamespace(shims=[])]))
+    return SimpleNamespace(pipeline=[("transformer", transformer), ("ner", ner), ("sentencizer", object())]), shim
+
+
+def test_quantize_ner_pipeline_replaces_linear_layers():
+    torch = pytest.importorskip("torch")
+    torch.manual_seed(0)
+    module = torch.nn.Sequential(torch.nn.Linear(16, 32), torch.nn.ReLU(), torch.nn.Linear(32, 4))
+    inputs = torch.randn(8, 16)
+    expected = module(inputs).detach()
+
+    nlp, shim = fake_pipeline(module)
+    assert transformer_shims(nlp) == [shim]
+    assert quantize_ner_pipeline(nlp) is nlp
+
+    quantized = shim._model
+    assert not any(type(layer) is torch.nn.Linear for layer in quantized.modules())
+    assert sum(type(layer).__name__ == "Linear" and "quantized" in type(layer).__module__
+               for layer in quantized.modules()) == 2
+    assert shim._hfmodel.transformer is quantized
+    assert torch.allclose(quantized(inputs), expected, atol=0.1)
+
+
+def test_quantize_ner_pipeline_requires_a_transformer():
+    pytest.importorskip("torch")
+    nlp = SimpleNamespace(pipeline=[("ner", SimpleNamespace(model=SimpleNamespace(walk=lambda: [])))])
+    with pytest.raises(ValueError):
+        quantize_ner_pipeline(nlp)
+
+
+def test_quantized_version_is_idempotent(stub_models):
+    assert quantized_ner_model_version() == "stub-int8"
+    model_registry.set_model("ner", None, version=quantized_ner_model_version())
+    assert quantized_ner_model_version() == "stub-int8"
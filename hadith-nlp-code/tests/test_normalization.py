@@ -0,0 +1,58 @@
+import re
+import string
+import pandas as pd
+import pytest
+from pyarabic import araby
+from normalization import strip_punctuation, strip_tashkeel, clean_arabic_text, normalize_arabic, \
+    normalize_clean_arabic, normalize_english, clean_english_text, normalize_series
+from utility import tarabic_name, english_name
+
+
+# Reference normalizations: the functions normalization.py replaced
+def reference_strip_punctuation(text):
+    return text.translate(str.maketrans("", "", string.punctuation + '،' + '~'))
+
+
+def reference_clean_arabic_text(text):
+    text = re.sub(r'[a-zA-Z]', '', text)
+    return re.sub(r'\s+', ' ', text)
+
+
+def reference_clean_english_text(text):
+    return re.sub(r'[^a-zA-Z0-9\s]', '', reference_strip_punctuation(text))
+
+
+# Texts mixing Arabic with diacritics, English, punctuation and runs of whitespace
+EDGE_CASES = ["", " ", "~", "،", "abc", "ABC xyz", "بِسْمِ اللَّهِ", "قَالَ: «نَعَمْ»، Prophet ﷺ!",
+              "a\t\tb\n\nc", "ـــ", "١٢٣ 123", "(Narrated Abu Huraira) ~"]
+
+
+@pytest.fixture(scope="module")
+def texts(hadith_sample):
+    return EDGE_CASES + list(hadith_sample[tarabic_name]) + list(hadith_sample[english_name])
+
+
+def test_strip_functions_match_reference(texts):
+    for text in texts:
+        assert strip_punctuation(text) == reference_strip_punctuation(text)
+        assert strip_tashkeel(text) == araby.strip_tashkeel(text)
+        assert clean_arabic_text(text) == reference_clean_arabic_text(text)
+
+
+def test_combined_forms_match_composition(texts):
+    for text in texts:
+        ar_text = araby.strip_tashkeel(reference_strip_punctuation(text))
+        assert normalize_arabic(text) == ar_text
+        assert normalize_clean_arabic(text) == reference_clean_arabic_text(ar_text)
+        assert normalize_english(text) == reference_strip_punctuation(text).lower()
+        assert clean_english_text(text) == reference_clean_english_text(text)
+
+
+def test_normalize_series(texts):
+    series = pd.Series(texts, index=range(10, 10 + len(texts)))
+    ar_series = normalize_series(series)
+    assert ar_series.index.equals(series.index)
+    assert ar_series.tolist() == [normalize_arabic(text) for text in texts]
+    assert normalize_series(series, "en_clean").tolist() == [clean_english_text(text) for text in texts]
+    with pytest.raises(ValueError):
+        normalize_series(series, "fr")
@@ -0,0 +1,121 @@
+import json
+import pytest
+import profiling
+from profiling import timed, timed_iter, enable_profiling, reset_profile, profile_summary, dump_profile
+
+
+class FakeClock:
+    """
+    Clock advanced by hand, so that the recorded timings are exact.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Enables profiling on a fake clock, and restores the global profiling state afterwards.
+    """
+    fake_clock = FakeClock()
+    monkeypatch.setattr(profiling.time, "perf_counter", fake_clock)
+    enabled = profiling.profiling_enabled()
+    reset_profile()
+    enable_profiling()
+    yield fake_clock
+    enable_profiling(enabled)
+    reset_profile()
+    profiling._stack.clear()
+
+
+def totals():
+    return {row["stage"]: (row["calls"], row["total_seconds"]) for row in profile_summary()}
+
+
+def test_nested_stages_only_count_their_own_time(clock):
+    with timed("outer"):
+        clock.advance(1)
+        with timed("inner"):
+            clock.advance(2)
+        clock.advance(3)
+    assert totals() == {"outer": (1, 4.0), "inner": (1, 2.0)}
+    assert profiling._stack == []
+
+
+def test_reentrant_stage_is_timed_once(clock):
+    @timed("match")
+    def match(depth):
+        clock.advance(1)
+        if depth:
+            match(depth - 1)
+
+    with timed("outer"):
+        match(2)
+        clock.advance(1)
+    assert totals() == {"match": (1, 3.0), "outer": (1, 1.0)}
+    assert profiling._stack == []
+
+
+def test_switching_profiling_inside_a_block(clock):
+    with timed("outer"):
+        clock.advance(1)
+        enable_profiling(False)
+        with timed("ignored"):
+            clock.advance(1)
+    assert profiling._stack == []
+    assert "ignored" not in totals()
+
+    with timed("late"):
+        enable_profiling(True)
+        with timed("inner"):
+            clock.advance(2)
+    # Only the stage started while profiling was enabled is recorded
+    assert profiling._stack == []
+    assert totals()["inner"] == (1, 2.0)
+    assert "late" not in totals()
+
+
+def test_stage_is_stopped_on_exception(clock):
+    with pytest.raises(ValueError):
+        with timed("failing"):
+            clock.advance(1)
+            raise ValueError
+    assert totals() == {"failing": (1, 1.0)}
+    assert profiling._stack == []
+
+
+def test_timed_iter(clock):
+    def produce():
+        for item in range(3):
+            clock.advance(1)
+            yield item
+
+    assert list(timed_iter("inference", produce())) == [0, 1, 2]
+    assert totals() == {"inference": (4, 3.0)}
+
+    enable_profiling(False)
+    items = produce()
+    assert timed_iter("inference", items) is items
+
+
+def test_summary_and_dump(clock, tmp_path):
+    with timed("a"):
+        clock.advance(3)
+    with timed("b"):
+        clock.advance(1)
+    summary = profile_summary()
+    assert [row["stage"] for row in summary] == ["a", "b"]
+    assert [row["percent"] for row in summary] == [75.0, 25.0]
+    assert summary[0]["mean_ms"] == 3000.0
+
+    file_path = str(tmp_path / "profile" / "profile.json")
+    dump_profile(file_path)
+    with open(file_path, encoding="utf-8") as file:
+        assert json.load(file) == summary
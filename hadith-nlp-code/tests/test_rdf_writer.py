@@ -0,0 +1,113 @@
+import gzip
+import random
+import pytest
+from generate_rdf import append_ttl_string, append_afterlife_ttl, append_ayat_ttl, append_similarity_ttl
+from rdf_writer import TurtleWriter, open_rdf_writer, load_binary_triples, parse_prefixes, turtle_triples
+
+# Directives written first by turtlfy_collection
+PREFIXES = """@base <http://semantichadith.com/ontology> .
+@prefix : <http://www.semantichadith.com/ontology/> .
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix qur: <http://quranontology.com/Resource/> .
+@prefix wiki: <https://www.wikidata.org/wiki/> ."""
+
+
+@pytest.fixture(scope="module")
+def statements():
+    # Statements of a small collection, built with the helpers of turtlfy_collection
+    rng = random.Random(0)
+    entities = ["Makkah", "Madinah", "Ant", "Camel", "Abu_Bakr", "Zakat", None]
+    ttl_strings = [PREFIXES]
+    for hnum in range(1, 51):
+        hid = f"SB-HD{hnum:04d}"
+        append_ttl_string(hid, rng.sample(entities, rng.randint(0, 3)), ttl_strings)
+        append_ttl_string(hid, rng.sample(entities, rng.randint(0, 2)), ttl_strings, objprop="discussesTopic")
+        append_afterlife_ttl(hid, rng.random() < 0.3, rng.random() < 0.3, ttl_strings)
+        append_ayat_ttl(hid, [(rng.randint(1, 114), rng.randint(1, 200)) for _ in range(rng.randint(0, 2))],
+                        ttl_strings)
+        row = {column: rng.sample(range(1, 51), rng.randint(0, 2))
+               for column in ['ar_0.9', 'ar_0.8', 'ar_0.7', 'ar_rest']}
+        append_similarity_ttl(hid, row, ttl_strings, "SB")
+    return ttl_strings
+
+
+def expected_triples(statements):
+    prefixes = parse_prefixes(PREFIXES)
+    return [triple for statement in statements[1:] for triple in turtle_triples(statement, prefixes)]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_turtle_output_equals_joined_strings(statements, compress, tmp_path):
+    with open_rdf_writer(str(tmp_path / "SB"), "ttl", compress) as writer:
+        for statement in statements:
+            writer.append(statement)
+    expected = "\n\n".join(statements).encode("utf-8")
+    if compress:
+        assert writer.file_path == str(tmp_path / "SB.ttl.gz")
+        with gzip.open(writer.file_path, "rb") as file:
+            assert file.read() == expected
+    else:
+        with open(writer.file_path, "rb") as file:
+            assert file.read() == expected
+
+
+def test_empty_turtle_output(tmp_path):
+    with TurtleWriter(str(tmp_path / "empty.ttl")) as writer:
+        pass
+    assert (tmp_path / "empty.ttl").read_bytes() == b""
+    assert writer.statement_count == 0
+
+
+def read_ntriples(file_paths, compress=False):
+    lines = []
+    for file_path in file_paths:
+        open_file = gzip.open(file_path, "rt", encoding="utf-8") if compress else open(file_path, encoding="utf-8")
+        with open_file as file:
+            lines.extend(file.read().splitlines())
+    return lines
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_ntriples_and_binary_hold_the_same_triples(statements, compress, tmp_path):
+    triples = expected_triples(statements)
+    ntriples = [f"{subject} {predicate} {obj} ." for subject, predicate, obj in triples]
+
+    with open_rdf_writer(str(tmp_path / "SB"), "nt", compress) as writer:
+        for statement in statements:
+            writer.append(statement)
+    assert len(writer.file_paths) == 1
+    assert read_ntriples(writer.file_paths, compress) == ntriples
+
+    with open_rdf_writer(str(tmp_path / "SB"), "npz", compress) as writer:
+        for statement in statements:
+            writer.append(statement)
+    terms, binary_triples = load_binary_triples(str(tmp_path / "SB.npz"))
+    assert [tuple(f"<{terms[term_id]}>" for term_id in triple) for triple in binary_triples] == triples
+
+
+def test_sharded_ntriples_equal_single_file(statements, tmp_path):
+    n_triples = len(expected_triples(statements))
+    with open_rdf_writer(str(tmp_path / "single"), "nt") as single:
+        for statement in statements:
+            single.append(statement)
+    with open_rdf_writer(str(tmp_path / "SB"), "nt", shard_size=40) as sharded:
+        for statement in statements:
+            sharded.append(statement)
+
+    assert n_triples > 80
+    assert sharded.file_paths == [str(tmp_path / f"SB-{i:04d}.nt") for i in range((n_triples + 39) // 40)]
+    assert all(len(read_ntriples([file_path])) <= 40 for file_path in sharded.file_paths)
+    assert read_ntriples(sharded.file_paths) == read_ntriples(single.file_paths)
+
+
+def test_turtle_triples_expands_prefixed_names():
+    prefixes = parse_prefixes(PREFIXES)
+    assert prefixes[""] == "http://www.semantichadith.com/ontology/"
+    assert turtle_triples(":SB-HD0001 :containsMentionOf :Makkah, qur:CH002 .", prefixes) == [
+        ("<http://www.semantichadith.com/ontology/SB-HD0001>",
+         "<http://www.semantichadith.com/ontology/containsMentionOf>",
+         "<http://www.semantichadith.com/ontology/Makkah>"),
+        ("<http://www.semantichadith.com/ontology/SB-HD0001>",
+         "<http://www.semantichadith.com/ontology/containsMentionOf>",
+         "<http://quranontology.com/Resource/CH002>"),
+    ]
@@ -0,0 +1,36 @@
+import os
+import numpy as np
+from similarities import find_similarity_values_all_hadith, save_similarity_matrix
+from utility import SIMILARITY_MEASURES_DIR
+
+# Files written by find_similarity_values_all_hadith
+SIMILARITY_OUTPUT_FILES = ["results/sb/all_9_8_7_r_similarity-2.csv", "results/sb/all_similarity_frequency_m_ar-2.txt",
+                           "results/sb/all_similarity_frequency_m_en-2.txt"]
+
+
+# Function to build a cosine similarity matrix as calculate_cosine_similarity does, with many values on bin edges
+def similarity_matrix(rng, size=300):
+    values = np.where(rng.random((size, size)) < 0.5, rng.integers(0, 11, (size, size)) / 10, rng.random((size, size)))
+    return np.round(np.triu(values, 1) + np.triu(values, 1).T + np.eye(size), 5)
+
+
+def run_similarity_values(directory, matrix_format, matrices, monkeypatch):
+    os.makedirs(directory / SIMILARITY_MEASURES_DIR)
+    monkeypatch.chdir(directory)
+    for language, matrix in matrices.items():
+        save_similarity_matrix(matrix, f"cosine_similarity_{language}.csv", matrix_format)
+    find_similarity_values_all_hadith("cosine")
+    outputs = {}
+    for file_path in SIMILARITY_OUTPUT_FILES:
+        with open(file_path, encoding="utf-8") as file:
+            outputs[file_path] = file.read()
+    return outputs
+
+
+def test_npy_and_csv_matrices_give_the_same_frequencies(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    matrices = {"arabic": similarity_matrix(rng), "english": similarity_matrix(rng)}
+    csv_outputs = run_similarity_values(tmp_path / "csv", "csv", matrices, monkeypatch)
+    npy_outputs = run_similarity_values(tmp_path / "npy", "npy", matrices, monkeypatch)
+    assert os.path.exists(os.path.join(SIMILARITY_MEASURES_DIR, "cosine_similarity_arabic.npy"))
+    assert npy_outputs == csv_outputs
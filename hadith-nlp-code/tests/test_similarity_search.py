@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from sklearn.metrics import pairwise as pairwise_metrics
+from similarity_search import blocked_similarity_search, PAIRWISE_MEASURES
+
+
+# Function to search the full similarity matrix at once, as the blocked search should
+def brute_force_search(query_vectors, corpus_vectors=None, measure="cosine", k=10, threshold=None):
+    function_name, higher_is_better = PAIRWISE_MEASURES[measure]
+    same_corpus = corpus_vectors is None
+    matrix = getattr(pairwise_metrics, function_name)(query_vectors,
+                                                      query_vectors if same_corpus else corpus_vectors)
+    rows, cols, values = [], [], []
+    for row, row_values in enumerate(matrix):
+        neighbours = sorted(range(len(row_values)),
+                            key=lambda col: (-row_values[col] if higher_is_better else row_values[col], col))
+        if same_corpus:
+            neighbours.remove(row)
+        if threshold is not None:
+            neighbours = [col for col in neighbours
+                          if (row_values[col] >= threshold if higher_is_better else row_values[col] <= threshold)]
+        if k is not None:
+            neighbours = neighbours[:k]
+        rows += [row] * len(neighbours)
+        cols += neighbours
+        values += [row_values[col] for col in neighbours]
+    return np.array(rows), np.array(cols), np.array(values)
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(53, 16)), rng.normal(size=(41, 16))
+
+
+def assert_same_result(result, expected):
+    assert np.array_equal(result[0], expected[0])
+    assert np.array_equal(result[1], expected[1])
+    assert np.allclose(result[2], expected[2])
+
+
+@pytest.mark.parametrize("measure", sorted(PAIRWISE_MEASURES))
+@pytest.mark.parametrize("block_size", [7, 16, 100])
+def test_top_k_matches_brute_force(measure, block_size, vectors):
+    queries, corpus = vectors
+    for k in [1, 5, 60]:
+        assert_same_result(blocked_similarity_search(queries, measure=measure, k=k, block_size=block_size),
+                           brute_force_search(queries, measure=measure, k=k))
+        assert_same_result(blocked_similarity_search(queries, corpus, measure=measure, k=k, block_size=block_size),
+                           brute_force_search(queries, corpus, measure=measure, k=k))
+
+
+@pytest.mark.parametrize("measure, threshold", [("cosine", 0.3), ("euclidean", 5.0), ("manhattan", 14.0)])
+def test_threshold_matches_brute_force(measure, threshold, vectors):
+    queries, corpus = vectors
+    expected = brute_force_search(queries, measure=measure, k=None, threshold=threshold)
+    assert len(expected[0])
+    assert_same_result(blocked_similarity_search(queries, measure=measure, k=None, threshold=threshold,
+                                                 block_size=10), expected)
+    assert_same_result(blocked_similarity_search(queries, corpus, measure=measure, k=3, threshold=threshold,
+                                                 block_size=10),
+                       brute_force_search(queries, corpus, measure=measure, k=3, threshold=threshold))
+
+
+def test_requires_k_or_threshold(vectors):
+    with pytest.raises(ValueError):
+        blocked_similarity_search(vectors[0], k=None, threshold=None)
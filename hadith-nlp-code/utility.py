@@ -1,26 +1,17 @@
-import re
-import string
+import os
+import numpy as np
 import pandas as pd
 import subprocess
+# Text normalization lives in normalization.py; re-exported for the extractors
+from normalization import strip_punctuation, clean_arabic_text
 
 # Constants for column names
 hadith_number_name = '~hadith_number_roman~'
 tarabic_name = '~arabic_t~'
 english_name = '~english~'
 
-# Function to clean Arabic text
-def clean_arabic_text(text):
-    """
-    Removes English characters and extra spaces from Arabic text.
-    Args:
-        text (str): Input Arabic text.
-    Returns:
-        str: Cleaned Arabic text.
-    """
-    text = re.sub(r'[a-zA-Z]', '', text)  # Remove English characters
-    text = re.sub(r'\s+', ' ', text)      # Remove extra spaces
-    return text
-
+# Directory the similarity and distance matrices are written to and read from
+SIMILARITY_MEASURES_DIR = "results/sb/similarity_measures"
 
 # Function to save a matrix to a CSV file
 def save_matrix_to_csv(matrix, filename):
@@ -30,7 +21,32 @@ def save_matrix_to_csv(matrix, filename):
         matrix (list): List of lists representing the matrix.
         filename (str): Filename for the CSV file.
     """
-    pd.DataFrame(matrix).to_csv(f"results/similarity_measures/{filename}", index=False, header=False)
+    pd.DataFrame(matrix).to_csv(os.path.join(SIMILARITY_MEASURES_DIR, filename), index=False, header=False)
+
+
+# Function to save a matrix to a binary NumPy file
+def save_matrix_to_npy(matrix, filename, dtype=np.float32):
+    """
+    Saves a matrix as a binary .npy file that can be memory-mapped for random access.
+    Args:
+        matrix (array-like): The matrix to save.
+        filename (str): Filename for the .npy file.
+        dtype (type): Data type of the stored values, e.g. np.float32 or np.float16.
+    """
+    np.save(os.path.join(SIMILARITY_MEASURES_DIR, filename), np.asarray(matrix, dtype=dtype))
+
+
+# Function to load a matrix from a binary NumPy file
+def load_matrix_from_npy(file_path, mmap_mode="r"):
+    """
+    Loads a matrix saved with save_matrix_to_npy without reading it into memory.
+    Args:
+        file_path (str): Path of the .npy file.
+        mmap_mode (str): Memory-map mode passed to np.load, or None to read the whole matrix.
+    Returns:
+        np.ndarray: The (memory-mapped) matrix.
+    """
+    return np.load(file_path, mmap_mode=mmap_mode)
 
 
 # Function to play a default sound
@@ -44,17 +60,22 @@ def play_default_sound():
         print(f"Error: {e}")
 
 
-# Function to remove punctuation and unwanted characters
-def strip_punctuation(text):
+# Function to convert hadith numbers written in Eastern Arabic numerals
+def arabic_to_int(arabic_numeral):
     """
-    Removes punctuation and specific unwanted characters from the text.
+    Converts Eastern Arabic numerals to integers.
+
     Args:
-        text (str): Input text.
+        arabic_numeral (str): The Arabic numeral string.
+
     Returns:
-        str: Text without punctuation.
+        int: The integer equivalent.
     """
-    translator = str.maketrans("", "", string.punctuation + '،' + '~')
-    return text.translate(translator)
+    numeral_dict = {'۰': 0, '۱': 1, '۲': 2, '۳': 3, '۴': 4, '۵': 5, '۶': 6, '۷': 7, '۸': 8, '۹': 9}
+    if any(ch in arabic_numeral for ch in ['م', 'b', 'm']):
+        return -1
+    arabic_numeral = arabic_numeral[1:-1]
+    return int(''.join(str(numeral_dict[ch]) for ch in arabic_numeral))
 
 
 # Function to display resolved entities
@@ -0,0 +1,45 @@
+import os
+import numpy as np
+
+# Default location of the Sahih Bukhari sentence embeddings
+VECTOR_STORE_DIR = "results/sb/encodings"
+
+# Files making up a vector store
+IDS_FILE = "ids.npy"
+ARABIC_VECTORS_FILE = "ar_vectors.npy"
+ENGLISH_VECTORS_FILE = "eng_vectors.npy"
+
+
+def save_vector_store(store_dir, hadith_ids, ar_vectors, eng_vectors):
+    """
+    Saves hadith embeddings as a binary float32 vector store.
+
+    Args:
+        store_dir (str): Directory of the vector store.
+        hadith_ids (array-like): Hadith number of each row of the vectors.
+        ar_vectors (array-like): Arabic embeddings, one row per hadith.
+        eng_vectors (array-like): English embeddings, one row per hadith.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(os.path.join(store_dir, IDS_FILE), np.asarray(hadith_ids, dtype=np.int64))
+    np.save(os.path.join(store_dir, ARABIC_VECTORS_FILE), np.asarray(ar_vectors, dtype=np.float32))
+    np.save(os.path.join(store_dir, ENGLISH_VECTORS_FILE), np.asarray(eng_vectors, dtype=np.float32))
+    print(f"Encodings saved to {store_dir}")
+
+
+def load_vector_store(store_dir=VECTOR_STORE_DIR, mmap_mode="r"):
+    """
+    Loads a binary vector store, memory-mapping the vectors by default.
+
+    Args:
+        store_dir (str, optional): Directory of the vector store. Defaults to VECTOR_STORE_DIR.
+        mmap_mode (str, optional): Memory-map mode passed to np.load, or None to read into memory.
+            Defaults to "r".
+
+    Returns:
+        tuple: Arabic vectors, English vectors and hadith IDs.
+    """
+    ar_vectors = np.load(os.path.join(store_dir, ARABIC_VECTORS_FILE), mmap_mode=mmap_mode)
+    eng_vectors = np.load(os.path.join(store_dir, ENGLISH_VECTORS_FILE), mmap_mode=mmap_mode)
+    hadith_ids = np.load(os.path.join(store_dir, IDS_FILE), mmap_mode=mmap_mode)
+    return ar_vectors, eng_vectors, hadith_ids